@@ -10,35 +10,45 @@ from .models import (
     ConversationContext, ContactInfo, BotConfiguration,
     State, BusinessIntent, FitPrimario,
 )
-from ..services.openai_client import OpenAIClient
+from ..services.openai_client import OpenAIClient, format_history
+from ..services.prompt_budget import estimate_tokens
+from ..services.transcripts import ConversationSummary, transcript_store
+from app.core.settings import settings
 
 logger = logging.getLogger(__name__)
 
+
+def bot_configuration_from_env() -> BotConfiguration:
+    """Configuração padrão do bot a partir das variáveis de ambiente"""
+    return BotConfiguration(
+        welcome_message=os.getenv(
+            "BOT_WELCOME_MESSAGE", 
+            "Olá! 👋 Sou o assistente virtual da MrDom. Como posso ajudá-lo hoje?"
+        ),
+        escalation_keywords=json.loads(
+            os.getenv("ESCALATION_KEYWORDS", '["falar com humano", "atendente", "supervisor"]')
+        ),
+        auto_response_enabled=os.getenv("AUTO_RESPONSE_ENABLED", "true").lower() == "true",
+        qualification_questions=json.loads(
+            os.getenv("QUALIFICATION_QUESTIONS", '["Qual é o seu principal desafio?", "Qual o tamanho da sua empresa?"]')
+        ),
+        business_hours=json.loads(
+            os.getenv("BUSINESS_HOURS", '{"start": "09:00", "end": "18:00"}')
+        ),
+        timezone=os.getenv("TIMEZONE", "America/Sao_Paulo")
+    )
+
+
 class BotLogic:
     def __init__(self):
         self.openai_client = OpenAIClient()
         self.config = self._load_configuration()
         self.conversation_contexts: Dict[int, ConversationContext] = {}
+        self.transcripts = transcript_store
 
     def _load_configuration(self) -> BotConfiguration:
         """Carregar configuração do bot"""
-        return BotConfiguration(
-            welcome_message=os.getenv(
-                "BOT_WELCOME_MESSAGE", 
-                "Olá! 👋 Sou o assistente virtual da MrDom. Como posso ajudá-lo hoje?"
-            ),
-            escalation_keywords=json.loads(
-                os.getenv("ESCALATION_KEYWORDS", '["falar com humano", "atendente", "supervisor"]')
-            ),
-            auto_response_enabled=os.getenv("AUTO_RESPONSE_ENABLED", "true").lower() == "true",
-            qualification_questions=json.loads(
-                os.getenv("QUALIFICATION_QUESTIONS", '["Qual é o seu principal desafio?", "Qual o tamanho da sua empresa?"]')
-            ),
-            business_hours=json.loads(
-                os.getenv("BUSINESS_HOURS", '{"start": "09:00", "end": "18:00"}')
-            ),
-            timezone=os.getenv("TIMEZONE", "America/Sao_Paulo")
-        )
+        return bot_configuration_from_env()
 
     async def analyze_message(self, message_content: str) -> MessageAnalysis:
         """Analisar mensagem do cliente"""
@@ -198,6 +208,30 @@ class BotLogic:
         """Obter mensagem de boas-vindas"""
         return self.config.welcome_message
 
+    def _qualification_from(self, qualification_data: Dict[str, Any]) -> LeadQualification:
+        return LeadQualification(
+            qualification_score=qualification_data.get("qualification_score", 0),
+            budget_indication=qualification_data.get("budget_indication", "unknown"),
+            authority_level=qualification_data.get("authority_level", "unknown"),
+            need_level=qualification_data.get("need_level", "unknown"),
+            timeline=qualification_data.get("timeline", "unknown"),
+            next_best_action=qualification_data.get("next_best_action", "follow_up"),
+            risk_factors=qualification_data.get("risk_factors", []),
+            opportunity_size=qualification_data.get("opportunity_size", "unknown")
+        )
+
+    def _failed_qualification(self) -> LeadQualification:
+        return LeadQualification(
+            qualification_score=50,
+            budget_indication="unknown",
+            authority_level="unknown",
+            need_level="unknown",
+            timeline="unknown",
+            next_best_action="manual_review",
+            risk_factors=["qualification_failed"],
+            opportunity_size="unknown"
+        )
+
     async def qualify_lead(
         self, 
         conversation_history: List[Dict[str, str]]
@@ -205,30 +239,95 @@ class BotLogic:
         """Qualificar lead baseado no histórico"""
         try:
             qualification_data = await self.openai_client.qualify_lead(conversation_history)
-            
-            return LeadQualification(
-                qualification_score=qualification_data.get("qualification_score", 0),
-                budget_indication=qualification_data.get("budget_indication", "unknown"),
-                authority_level=qualification_data.get("authority_level", "unknown"),
-                need_level=qualification_data.get("need_level", "unknown"),
-                timeline=qualification_data.get("timeline", "unknown"),
-                next_best_action=qualification_data.get("next_best_action", "follow_up"),
-                risk_factors=qualification_data.get("risk_factors", []),
-                opportunity_size=qualification_data.get("opportunity_size", "unknown")
-            )
+            return self._qualification_from(qualification_data)
             
         except Exception as e:
             logger.error(f"Erro ao qualificar lead: {str(e)}")
-            return LeadQualification(
-                qualification_score=50,
-                budget_indication="unknown",
-                authority_level="unknown",
-                need_level="unknown",
-                timeline="unknown",
-                next_best_action="manual_review",
-                risk_factors=["qualification_failed"],
-                opportunity_size="unknown"
+            return self._failed_qualification()
+
+    async def qualify_lead_incremental(
+        self,
+        account_id: Any,
+        conversation_id: int
+    ) -> LeadQualification:
+        """Qualificar lead enviando só o resumo acumulado e as mensagens novas.
+
+        O resumo e a última qualificação ficam no transcript local. As
+        mensagens posteriores ao resumo são enviadas inteiras até somarem
+        ``QUALIFY_SUMMARY_THRESHOLD_TOKENS`` (ou ``QUALIFY_MAX_NEW_MESSAGES``); aí o modelo devolve também um
+        resumo novo que as incorpora, e o cursor do resumo avança. Assim o
+        prompt fica limitado, independente do tamanho da conversa. Um
+        backlog maior que ``QUALIFY_MAX_NEW_MESSAGES`` é resumido em lotes,
+        das mensagens mais antigas para as mais novas, até alcançar a
+        última; só então a qualificação é devolvida.
+        """
+        current = await self.transcripts.summary(account_id, conversation_id) or ConversationSummary()
+        limit = settings.QUALIFY_MAX_NEW_MESSAGES
+        while True:
+            rows = await self.transcripts.since(account_id, conversation_id, current.last_message_id, limit)
+            if current.qualification is not None and (not rows or rows[-1][0] <= current.qualified_id):
+                return self._qualification_from(current.qualification)
+
+            new_messages = [{"role": role, "content": content} for _, role, content in rows]
+            # Lote cheio: pode haver mais mensagens depois dele, então o resumo precisa avançar
+            backlog = len(rows) >= limit
+            refresh = (
+                backlog
+                or estimate_tokens(format_history(new_messages)) >= settings.QUALIFY_SUMMARY_THRESHOLD_TOKENS
+            )
+            try:
+                qualification_data = await self.openai_client.qualify_lead_incremental(
+                    current.summary, current.qualification, new_messages, refresh_summary=refresh
+                )
+                qualification = self._qualification_from(qualification_data)
+            except Exception as e:
+                logger.error(f"Erro ao requalificar lead: {str(e)}")
+                return self._failed_qualification()
+
+            summary = qualification_data.get("conversation_summary") if refresh else None
+            current = ConversationSummary(
+                summary=summary or current.summary,
+                qualification=qualification.model_dump(),
+                last_message_id=rows[-1][0] if summary else current.last_message_id,
+                qualified_id=rows[-1][0] if rows else current.qualified_id,
             )
+            try:
+                await self.transcripts.save_summary(account_id, conversation_id, current)
+            except Exception as e:
+                logger.error(f"Erro ao gravar resumo da conversa {conversation_id}: {str(e)}")
+                return qualification
+            if not backlog:
+                return qualification
+            if not summary:
+                # Sem resumo novo o cursor não anda: parar em vez de reenviar o mesmo lote
+                logger.warning(f"Qualificação da conversa {conversation_id} sem resumo; backlog fica para a próxima")
+                return qualification
+
+    async def conversation_history(
+        self,
+        account_id: Any,
+        conversation_id: int,
+        limit: int = 20
+    ) -> List[Dict[str, str]]:
+        """Histórico recente da conversa a partir do transcript local (sem chamada de rede)"""
+        if self.transcripts is None:
+            return []
+        try:
+            return await self.transcripts.tail(account_id, conversation_id, limit)
+        except Exception as e:
+            logger.error(f"Erro ao ler transcript da conversa {conversation_id}: {str(e)}")
+            return []
+
+    async def qualify_conversation(
+        self,
+        account_id: Any,
+        conversation_id: int,
+        limit: int = 20
+    ) -> LeadQualification:
+        """Qualificar lead usando o transcript local (incremental com ``QUALIFY_INCREMENTAL``)"""
+        if self.transcripts is not None and settings.QUALIFY_INCREMENTAL:
+            return await self.qualify_lead_incremental(account_id, conversation_id)
+        return await self.qualify_lead(await self.conversation_history(account_id, conversation_id, limit))
 
     async def handle_objection(self, objection: str, product_context: str) -> str:
         """Lidar com objeção específica"""
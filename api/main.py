@@ -1,5 +1,8 @@
 
+import asyncio
+import importlib
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI
@@ -14,20 +17,111 @@ if _env_path.exists():
 # Import routers
 from .routers.chatwoot_agentbot import router as chatwoot_router
 from .routers.health import router as health_router
+from .routers.debug import router as debug_router
 from .routers.assistant_preview import router as assistant_router
+from .routers.exports import router as exports_router
+from .services.health_prober import health_prober
+from .services.state_store import state_syncer
+from .services.lead_store import lead_writer
+from .services.follow_up_scheduler import follow_up_scheduler
+from .services.tenants import tenant_registry
+from .services.transcripts import transcript_store
 
 # Import core configuration
-from app.core.logging import configure_logging
+from app.core.admission import agentbot_admission
+from app.core.log_sampling import LogSampler
+from app.core.logging import configure_logging, shutdown_logging
+from app.core.loop_monitor import LoopMonitor
 from app.core.middlewares import add_middlewares
+from app.core.settings import settings
+from app.core.tracing import build_exporter, tracer
 
 # Configure logging
-configure_logging()
+configure_logging(
+    async_mode=settings.LOG_ASYNC,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    overflow=settings.LOG_QUEUE_OVERFLOW,
+    block_timeout=settings.LOG_QUEUE_BLOCK_TIMEOUT,
+    sampler=(
+        LogSampler.from_json(settings.LOG_SAMPLING_RULES, slow_ms=settings.LOG_SLOW_MS)
+        if settings.LOG_SAMPLING_RULES
+        else None
+    ),
+)
+
+# SDKs imported lazily by the services; loaded off the startup path once the
+# app is already serving so the first OpenAI call does not pay the import.
+WARM_IMPORTS = ("openai",)
+
+
+def _warm_imports() -> None:
+    for module in WARM_IMPORTS:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start/stop process-wide resources around the app lifetime."""
+    tracer.configure(
+        build_exporter(
+            settings.TRACING_EXPORTER,
+            jsonl_path=settings.TRACING_JSONL_PATH,
+            ring_size=settings.TRACING_RING_SIZE,
+            otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+        ),
+        sample_rate=settings.TRACING_SAMPLE_RATE,
+    )
+    agentbot_admission.configure(
+        initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+        min_limit=settings.ADMISSION_MIN_LIMIT,
+        max_limit=settings.ADMISSION_MAX_LIMIT,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        max_queue=settings.ADMISSION_MAX_QUEUE,
+    )
+    loop_monitor = LoopMonitor(
+        interval=settings.LOOP_MONITOR_INTERVAL,
+        slow_threshold=settings.LOOP_SLOW_CALLBACK_SECONDS,
+    )
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    health_prober.start()
+    if state_syncer is not None:
+        state_syncer.start()
+    if lead_writer is not None:
+        await lead_writer.start()
+    if transcript_store is not None:
+        transcript_store.start()
+    if follow_up_scheduler is not None:
+        await follow_up_scheduler.start()
+    warm_up = asyncio.create_task(asyncio.to_thread(_warm_imports)) if settings.WARM_IMPORTS else None
+    yield
+    if warm_up is not None:
+        await warm_up
+    if lead_writer is not None:
+        await lead_writer.stop()
+    if state_syncer is not None:
+        await state_syncer.stop()
+    if follow_up_scheduler is not None:
+        await follow_up_scheduler.stop()
+    if transcript_store is not None:
+        await asyncio.to_thread(transcript_store.close)
+    await health_prober.stop()
+    await tenant_registry.aclose()
+    await loop_monitor.stop()
+    tracer.shutdown()
+    # Flush queued log records before the process exits
+    shutdown_logging()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Mr. DOM SDR API",
     version="1.0.0",
-    description="SDR Automation API with Chatwoot and OpenAI integration"
+    description="SDR Automation API with Chatwoot and OpenAI integration",
+    lifespan=lifespan,
 )
 
 # Add middlewares
@@ -39,12 +133,25 @@ app.include_router(
     prefix="/api/v1",
     tags=["platform"]
 )
+app.include_router(
+    debug_router,
+    prefix="/api/v1",
+    tags=["platform"],
+    include_in_schema=False
+)
 app.include_router(
     chatwoot_router,
     prefix="/api/v1/webhooks",
     tags=["webhooks"]
 )
 
+app.include_router(
+    exports_router,
+    prefix="/api/v1",
+    tags=["platform"],
+    include_in_schema=False
+)
+
 # Assistant preview (UAT)
 app.include_router(
     assistant_router,
@@ -1,20 +1,38 @@
 
+from contextlib import nullcontext
+from typing import Optional
 from fastapi import APIRouter, Request, HTTPException
 import os
 import hmac
 import hashlib
-from ..services.chatwoot_client import chatwoot_client
 from ..services.n8n_client import trigger as n8n_trigger
-from ..domain.models import State
-from ..domain.bot_logic import step_transition_v2, classify_intent, compute_fit_primary
+from ..services.state_store import state_store
+from ..services.lead_store import lead_row, lead_writer
+from ..services.tenants import Tenant, tenant_registry, tenant_scheduler
+from ..services.debounce import combine_messages, message_debouncer
+from ..services.transcripts import transcript_store
+from ..services.follow_up_scheduler import follow_up_scheduler
+from ..domain.models import LeadQualification, State
+from ..domain.bot_logic import (
+	BotLogic, step_transition, step_transition_v2, classify_intent, compute_fit_primary, should_handoff,
+)
+from app.core.admission import PRIORITY_HANDOFF, PRIORITY_NORMAL, Shed, agentbot_admission
+from app.core.flight_recorder import note
+from app.core.settings import settings
+from app.core.tracing import span, stage
 
 router = APIRouter()
 
-# Use environment variable names consistent with config/env files
+# Defaults of the single-tenant setup; per-account values come from tenant_registry
 HMAC_SECRET = os.getenv("CHATWOOT_HMAC_SECRET", os.getenv("HMAC_SECRET", "changeme"))
 ACCOUNT_ID = os.getenv("CHATWOOT_ACCOUNT_ID", os.getenv("ACCOUNT_ID", "changeme"))
 
-async def verify_request(req: Request) -> bool:
+FLOWS = {"v1": step_transition, "v2": step_transition_v2}
+
+# Qualificação do lead (LLM) gravada na tabela leads; criada no primeiro uso
+_qualifier: Optional[BotLogic] = None
+
+async def verify_request(req: Request, secret: Optional[str] = None) -> bool:
 	body = await req.body()
 	sig = req.headers.get("X-Chatwoot-Signature", "")
 	# Accept raw hex or prefixed form like "sha256=<hex>"
@@ -24,46 +42,124 @@ async def verify_request(req: Request) -> bool:
 			# handle case-insensitive algo prefix
 			parts = provided.split("=", 1)
 			provided = parts[1].strip() if len(parts) == 2 else provided
-		mac = hmac.new(HMAC_SECRET.encode(), msg=body, digestmod=hashlib.sha256)
+		mac = hmac.new((secret or HMAC_SECRET).encode(), msg=body, digestmod=hashlib.sha256)
 		expected = mac.hexdigest()
 		return hmac.compare_digest(provided, expected)
 	except Exception:
 		return False
 
+def _account_of(payload: dict):
+	return (payload.get("account") or {}).get("id", ACCOUNT_ID)
+
+def _turn_priority(user_text: str, tenant: Tenant) -> int:
+	# Pedidos de atendimento humano passam na frente na fila de admissão
+	if should_handoff(user_text, tenant.bot_config.escalation_keywords):
+		return PRIORITY_HANDOFF
+	return PRIORITY_NORMAL
+
 @router.post("/agentbot")
 async def agentbot(req: Request):
-	if not await verify_request(req):
-		raise HTTPException(status_code=401, detail="invalid signature")
-
-	payload = await req.json()
+	# Span raiz do turno; chamadas a Chatwoot/n8n geram spans filhos via track_dependency
+	with span("agentbot.webhook"):
+		# O corpo é lido antes da assinatura só para escolher o tenant (secret, fila, prioridade)
+		with stage("parse_json"):
+			try:
+				payload = await req.json()
+			except Exception:
+				payload = {}
+		if not isinstance(payload, dict):
+			payload = {}
+		tenant = tenant_registry.get(_account_of(payload))
+		note("tenant", tenant.account_id)
+
+		with stage("verify_request"):
+			valid = await verify_request(req, tenant.hmac_secret)
+		if not valid:
+			raise HTTPException(status_code=401, detail="invalid signature")
+
+		# Eventos aceitos
+		event = payload.get("event")
+		note("event", event)
+		note("conversation_id", (payload.get("conversation") or {}).get("id"))
+		if event not in {"message_created", "message_updated", "widget_triggered"}:
+			return {"ignored": True}
+
+		# Ignora mensagens que já são do tipo "outgoing"
+		message = payload.get("message") or {}
+		if message.get("message_type") == "outgoing":
+			return {"ignored": True}
+
+		user_text = (message.get("content") or "").strip()
+
+		# Rajadas de mensagens viram um turno só; a espera fica fora da admissão para não ocupar vaga
+		if event == "message_created" and user_text and message_debouncer.enabled:
+			key = (_account_of(payload), (payload.get("conversation") or {}).get("id"))
+
+			async def merged_turn(texts):
+				note("merged_messages", len(texts))
+				return await _admitted_turn(payload, tenant, combine_messages(texts))
+
+			# As mensagens anexadas esperam o turno combinado e respondem com o mesmo status (503 inclusive)
+			result = await message_debouncer.run(key, user_text, merged_turn)
+			return {"ok": True, "merged": True} if result is None else result
+
+		return await _admitted_turn(payload, tenant, user_text)
+
+async def _admitted_turn(payload: dict, tenant: Tenant, user_text: str):
+	admission = agentbot_admission.admit(_turn_priority(user_text, tenant)) if settings.ADMISSION_ENABLED else nullcontext()
+	try:
+		async with admission:
+			async with tenant_scheduler.slot(tenant.account_id, tenant.weight):
+				return await _handle_turn(payload, tenant, user_text)
+	except Shed as e:
+		note("shed", e.retry_after)
+		raise HTTPException(status_code=503, detail="overloaded", headers={"Retry-After": str(e.retry_after)})
+
+async def _qualify(account_id, conversation_id) -> Optional[LeadQualification]:
+	"""Qualificação do lead pelo transcript local (incremental); None quando não há transcript ou ela falha"""
+	global _qualifier
+	if transcript_store is None or conversation_id is None:
+		return None
+	if _qualifier is None:
+		_qualifier = BotLogic()
+	qualification = await _qualifier.qualify_conversation(account_id, conversation_id)
+	# Qualificação de fallback (erro no modelo) não vai para o banco
+	return None if "qualification_failed" in qualification.risk_factors else qualification
+
+async def _handle_turn(payload: dict, tenant: Tenant, user_text: str):
+	chatwoot_client = tenant.chatwoot
+	step = FLOWS[tenant.flow]
 
 	# Extrai IDs
-	account_id = payload.get("account", {}).get("id", ACCOUNT_ID)
-	conv = payload.get("conversation", {})
-	conversation_id = conv.get("id")
+	account_id = _account_of(payload)
+	conversation_id = (payload.get("conversation") or {}).get("id")
 
-	# Eventos aceitos
-	event = payload.get("event")
-	if event not in {"message_created", "message_updated", "widget_triggered"}:
-		return {"ignored": True}
+	# O usuário respondeu: o follow-up pendente da conversa perde o sentido
+	if follow_up_scheduler is not None and conversation_id is not None:
+		follow_up_scheduler.cancel(account_id, conversation_id)
 
-	# Ignora mensagens que já são do tipo "outgoing"
-	message = payload.get("message", {})
-	if message.get("message_type") == "outgoing":
-		return {"ignored": True}
+	async def load_state() -> State:
+		conv_data = await chatwoot_client.get_conversation(account_id, conversation_id)
+		attrs = conv_data.get("custom_attributes") or {}
+		return State(**attrs) if attrs else State()
 
-	user_text = (message.get("content") or "").strip()
+	def transition(current: State):
+		with stage("step_transition"):
+			new_state, reply, next_action = step(current, user_text)
+		return new_state, (reply, next_action)
 
-	# Carrega estado atual da conversa
-	conv_data = await chatwoot_client.get_conversation(account_id, conversation_id)
-	attrs = conv_data.get("custom_attributes") or {}
-	state = State(**attrs) if attrs else State()
+	if state_store is not None:
+		# Estado no Redis com CAS; o Chatwoot é atualizado em background pelo state_syncer
+		state, (reply_text, action) = await state_store.update(account_id, conversation_id, transition, loader=load_state)
+	else:
+		# Carrega estado atual da conversa
+		state = await load_state()
 
-	# Lógica de passo → próxima mensagem e ação
-	state, reply_text, action = step_transition_v2(state, user_text)
+		# Lógica de passo → próxima mensagem e ação
+		state, (reply_text, action) = transition(state)
 
-	# Persiste novo estado
-	await chatwoot_client.set_attributes(account_id, conversation_id, **state.model_dump())
+		# Persiste novo estado
+		await chatwoot_client.set_attributes(account_id, conversation_id, **state.model_dump())
 
 	# Ações integradas
 	if action == "handoff":
@@ -88,6 +184,30 @@ async def agentbot(req: Request):
 	if reply_text:
 		await chatwoot_client.reply(account_id, conversation_id, reply_text)
 
+	# Transcript local para qualificação/follow-up sem consultar o Chatwoot
+	if transcript_store is not None and conversation_id is not None:
+		transcript_store.append(account_id, conversation_id, "user", user_text)
+		transcript_store.append(account_id, conversation_id, "assistant", reply_text)
+
 	intent = classify_intent(user_text).value
 	fit = compute_fit_primary(state).value
+
+	# Persistência de leads em lote (não bloqueia o turno)
+	if lead_writer is not None:
+		qualification = None
+		if action in ("create_lead", "schedule") and settings.LEAD_QUALIFICATION_ENABLED:
+			with stage("qualify_lead"):
+				qualification = await _qualify(account_id, conversation_id)
+		lead_writer.submit(lead_row(account_id, conversation_id, state, action=action, fit=fit, qualification=qualification))
+
+	# Follow-up se o lead parar de responder (handoff e reunião agendada dispensam)
+	if follow_up_scheduler is not None and conversation_id is not None and reply_text and action not in ("handoff", "schedule"):
+		follow_up_scheduler.schedule(
+			account_id,
+			conversation_id,
+			settings.FOLLOW_UP_DELAY_SECONDS,
+			settings.FOLLOW_UP_TYPE,
+			lead_info={**state.model_dump(mode="json", exclude_none=True), "fit_primario": fit, "intent": intent},
+			contact_id=(payload.get("sender") or {}).get("id"),
+		)
 	return {"ok": True, "intent": intent, "fit_primario": fit}
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict, List, Optional
+import asyncio
+import hmac
+import threading
+
+from app.core.flight_recorder import recorder
+from app.core.profiling import MemoryProfiler, ProfilerBusy, SamplingProfiler
+from app.core.settings import settings
+
+router = APIRouter()
+
+profiler = SamplingProfiler(max_seconds=settings.PROFILING_MAX_SECONDS)
+memory_profiler = MemoryProfiler(max_seconds=settings.TRACEMALLOC_MAX_SECONDS)
+
+
+async def require_debug_token(x_debug_token: Optional[str] = Header(default=None)) -> None:
+    """Protege os endpoints de debug: desativados (404) sem DEBUG_TOKEN configurado"""
+    expected = settings.DEBUG_TOKEN
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_debug_token or not hmac.compare_digest(x_debug_token, expected):
+        raise HTTPException(status_code=401, detail="invalid debug token")
+
+
+async def require_profiling_enabled() -> None:
+    """Profiling exige DEBUG_PROFILING_ENABLED=true além do token"""
+    if not settings.DEBUG_PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+profiling_guard = [Depends(require_debug_token), Depends(require_profiling_enabled)]
+
+
+@router.get("/debug/slow", dependencies=[Depends(require_debug_token)])
+async def slow_requests(route: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Requisições mais lentas recentes por rota (ex.: route=POST /api/v1/webhooks/agentbot)"""
+    return recorder.snapshot(route)
+
+
+@router.post("/debug/profile", dependencies=profiling_guard, response_class=PlainTextResponse)
+async def profile_event_loop(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, gt=0),
+) -> PlainTextResponse:
+    """Amostra a pilha da thread do event loop e retorna collapsed stacks (flamegraph)"""
+    loop_thread_id = threading.get_ident()
+    try:
+        collapsed = await asyncio.to_thread(profiler.profile, loop_thread_id, seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'},
+    )
+
+
+@router.post("/debug/memory/snapshot", dependencies=profiling_guard)
+async def memory_snapshot(
+    limit: int = Query(25, ge=1, le=500),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+) -> Dict[str, Any]:
+    """Snapshot tracemalloc com o diff em relação ao snapshot anterior"""
+    try:
+        return await asyncio.to_thread(memory_profiler.snapshot, limit, key_type)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.delete("/debug/memory", dependencies=profiling_guard)
+async def memory_stop() -> Dict[str, bool]:
+    """Para o tracemalloc e descarta snapshots"""
+    memory_profiler.stop()
+    return {"tracing": memory_profiler.active}
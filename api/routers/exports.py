@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Any, Optional
+import asyncio
+import hmac
+
+from app.core.settings import settings
+from ..services.lead_export import (
+    LeadFilter,
+    chatwoot_source,
+    export_filename,
+    export_leads,
+    export_media_type,
+    make_encoder,
+    store_source,
+)
+from ..services.lead_store import lead_writer
+from ..services.tenants import tenant_registry
+
+router = APIRouter()
+
+# Um backfill do Chatwoot por vez neste worker: cada exportação prende a
+# requisição até o fim e dispara várias chamadas em paralelo à API
+_chatwoot_exports = asyncio.Semaphore(1)
+
+
+async def require_export_token(x_export_token: Optional[str] = Header(default=None)) -> None:
+    """Protege a exportação: desativada (404) sem EXPORT_TOKEN configurado"""
+    expected = settings.EXPORT_TOKEN
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_export_token or not hmac.compare_digest(x_export_token, expected):
+        raise HTTPException(status_code=401, detail="invalid export token")
+
+
+class _ExclusiveStreamingResponse(StreamingResponse):
+    """Libera o semáforo quando a resposta termina, falha ou o cliente desconecta"""
+
+    def __init__(self, *args: Any, semaphore: asyncio.Semaphore, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._semaphore = semaphore
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._semaphore.release()
+
+
+@router.get("/exports/leads", dependencies=[Depends(require_export_token)])
+async def export_leads_file(
+    source: str = Query("chatwoot", pattern="^(chatwoot|store)$"),
+    format: str = Query("csv", pattern="^(csv|jsonl|parquet)$"),
+    compression: Optional[str] = Query(None, pattern="^(gzip|zstd)$"),
+    account: Optional[str] = None,
+    fit: Optional[str] = Query(None, pattern="^(elegivel|inelegivel)$"),
+    dor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> StreamingResponse:
+    """Arquivo de leads em fluxo (origem: conversas do Chatwoot ou o Postgres do LeadStore)"""
+    try:
+        encoder = make_encoder(format, compression)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    lead_filter = LeadFilter(fit=fit, dor=dor, since=since, until=until)
+    if source == "store":
+        if lead_writer is None or lead_writer.store is None:
+            raise HTTPException(status_code=404, detail="lead store desativado")
+        records = store_source(lead_writer.store, lead_filter, settings.EXPORT_BATCH_SIZE)
+    else:
+        if _chatwoot_exports.locked():
+            raise HTTPException(
+                status_code=429, detail="exportação do Chatwoot já em andamento", headers={"Retry-After": "60"}
+            )
+        tenant = tenant_registry.get(account) if account else tenant_registry.default
+        records = chatwoot_source(tenant.chatwoot, tenant.account_id)
+
+    filename = export_filename(format, compression)
+    response_args = dict(
+        content=export_leads(records, encoder, lead_filter, settings.EXPORT_BATCH_SIZE),
+        media_type=export_media_type(format, compression),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+    if source == "store":
+        return StreamingResponse(**response_args)
+    await _chatwoot_exports.acquire()  # livre: nenhum await desde a checagem acima
+    return _ExclusiveStreamingResponse(**response_args, semaphore=_chatwoot_exports)
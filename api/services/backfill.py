@@ -0,0 +1,437 @@
+"""Backfill das conversas do Chatwoot para um store local.
+
+Pagina ``GET /conversations`` (25 conversas por página, já com
+``custom_attributes``) com concorrência limitada e rate limit, grava cada
+página no destino assim que chega e salva um checkpoint das páginas
+concluídas para retomar depois de uma interrupção:
+
+    python -m api.services.backfill --sink jsonl:conversas.jsonl --checkpoint .backfill/conta-1.json
+    python -m api.services.backfill --sink sqlite:data/conversas.db --concurrency 16 --rate 20
+    python -m api.services.backfill --sink redis   # reconstrói o RedisStateStore
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from ..domain.models import State
+from app.core.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 25
+
+
+def conversation_record(account_id: Any, conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos da conversa que interessam ao backfill"""
+    return {
+        "account_id": str(account_id),
+        "conversation_id": conversation.get("id"),
+        "status": conversation.get("status"),
+        "custom_attributes": conversation.get("custom_attributes") or {},
+        "last_activity_at": conversation.get("last_activity_at"),
+    }
+
+
+# Destinos
+
+
+class JsonlSink:
+    """Uma linha JSON por conversa (append; uma retomada pode repetir a última página)"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def describe(self) -> str:
+        return f"jsonl:{os.path.abspath(self.path)}"
+
+    async def write(self, account_id: Any, conversations: List[Dict[str, Any]]) -> int:
+        self._file.writelines(
+            json.dumps(conversation_record(account_id, c), ensure_ascii=False) + "\n" for c in conversations
+        )
+        return len(conversations)
+
+    async def flush(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def close(self) -> None:
+        await self.flush()
+        self._file.close()
+
+
+class SqliteSink:
+    """Tabela ``conversations`` com upsert por ``(account_id, conversation_id)``"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        account_id        TEXT    NOT NULL,
+        conversation_id   INTEGER NOT NULL,
+        status            TEXT,
+        custom_attributes TEXT    NOT NULL,
+        last_activity_at  INTEGER,
+        synced_at         REAL    NOT NULL,
+        PRIMARY KEY (account_id, conversation_id)
+    )
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self.SCHEMA)
+
+    def describe(self) -> str:
+        return f"sqlite:{os.path.abspath(self.path)}"
+
+    async def write(self, account_id: Any, conversations: List[Dict[str, Any]]) -> int:
+        now = time.time()
+        rows = [
+            (
+                r["account_id"],
+                r["conversation_id"],
+                r["status"],
+                json.dumps(r["custom_attributes"], ensure_ascii=False),
+                r["last_activity_at"],
+                now,
+            )
+            for r in (conversation_record(account_id, c) for c in conversations)
+        ]
+        self._conn.executemany(
+            "INSERT INTO conversations VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (account_id, conversation_id) DO UPDATE SET status = excluded.status, "
+            "custom_attributes = excluded.custom_attributes, last_activity_at = excluded.last_activity_at, "
+            "synced_at = excluded.synced_at",
+            rows,
+        )
+        return len(rows)
+
+    async def flush(self) -> None:
+        return None  # cada executemany já é uma transação (autocommit)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+class RedisStateSink:
+    """Grava os ``custom_attributes`` como ``State`` no ``RedisStateStore`` (pipeline por página)"""
+
+    def __init__(self, store: Any, url: str = ""):
+        self.store = store
+        self.url = url
+        self.skipped = 0
+
+    def describe(self) -> str:
+        return f"redis:{self.url}"
+
+    async def write(self, account_id: Any, conversations: List[Dict[str, Any]]) -> int:
+        items = []
+        for conversation in conversations:
+            try:
+                items.append((account_id, conversation["id"], State(**(conversation.get("custom_attributes") or {}))))
+            except Exception as e:
+                self.skipped += 1
+                logger.warning(f"Conversa {conversation.get('id')} ignorada no backfill: {str(e)}")
+        if items:
+            await self.store.set_many(items)
+        return len(items)
+
+    async def flush(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+# Checkpoint
+
+
+@dataclass
+class Checkpoint:
+    """Páginas já gravadas no destino; só vale para a mesma conta/filtro/destino"""
+
+    path: Optional[str]
+    key: str
+    total_pages: Optional[int] = None
+    done: Set[int] = field(default_factory=set)
+    conversations: int = 0
+
+    @classmethod
+    def load(cls, path: Optional[str], key: str) -> "Checkpoint":
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("key") == key:
+                return cls(path, key, data.get("total_pages"), set(data.get("done", [])), data.get("conversations", 0))
+            logger.warning(f"Checkpoint {path} é de outro backfill ({data.get('key')}); começando do zero")
+        return cls(path, key)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            state = {
+                "key": self.key,
+                "total_pages": self.total_pages,
+                "done": sorted(self.done),
+                "conversations": self.conversations,
+            }
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+
+@dataclass
+class BackfillReport:
+    pages: int = 0
+    conversations: int = 0
+    resumed_pages: int = 0
+    total_pages: Optional[int] = None
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Conversas por segundo nesta execução"""
+        return self.conversations / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _retry_after(response: httpx.Response, attempt: int) -> float:
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return min(2.0 ** attempt, 30.0)
+
+
+async def run_backfill(
+    client: Any,
+    sink: Any,
+    account_id: Any,
+    *,
+    status: str = "all",
+    sort_by: Optional[str] = "created_at_asc",
+    concurrency: int = 8,
+    rate: float = 10.0,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: float = 2.0,
+    progress_every: float = 5.0,
+    on_progress: Optional[Callable[[BackfillReport], None]] = None,
+    max_retries: int = 5,
+) -> BackfillReport:
+    """Copiar as conversas de ``account_id`` para ``sink`` página a página.
+
+    A página 1 informa o total (``meta.all_count``); as demais são buscadas
+    por ``concurrency`` workers, limitados a ``rate`` requisições/s. 429
+    pausa todos os workers pelo ``Retry-After``; 5xx e erros de rede são
+    repetidos com backoff. Uma página só entra no checkpoint depois de
+    gravada no destino, e o checkpoint só é salvo depois de ``sink.flush()``.
+    Ao final, páginas além do total são sondadas até vir uma incompleta
+    (conversas criadas durante o backfill).
+    """
+    limiter = RateLimiter(rate, burst=concurrency)
+    key = f"{account_id}|{status}|{sort_by}|{sink.describe()}"
+    checkpoint = Checkpoint.load(checkpoint_path, key)
+    report = BackfillReport(resumed_pages=len(checkpoint.done), total_pages=checkpoint.total_pages)
+    started = time.perf_counter()
+    last_page_size: Dict[int, int] = {}
+
+    async def fetch(page: int) -> List[Dict[str, Any]]:
+        for attempt in range(max_retries + 1):
+            async with limiter:
+                try:
+                    body = await client.list_conversations(account_id, page=page, status=status, sort_by=sort_by)
+                    break
+                except httpx.HTTPStatusError as e:
+                    code = e.response.status_code
+                    if attempt == max_retries or (code < 500 and code != 429):
+                        raise
+                    delay = _retry_after(e.response, attempt)
+                    if code == 429:
+                        limiter.pause(delay)
+                except httpx.TransportError:
+                    if attempt == max_retries:
+                        raise
+                    delay = min(2.0 ** attempt, 30.0)
+            report.retries += 1
+            await asyncio.sleep(delay)
+        data = body.get("data", body)
+        if checkpoint.total_pages is None:
+            all_count = (data.get("meta") or {}).get("all_count")
+            if all_count is not None:
+                checkpoint.total_pages = max(1, math.ceil(all_count / PAGE_SIZE))
+        return data.get("payload") or []
+
+    async def process(page: int) -> int:
+        conversations = await fetch(page)
+        written = await sink.write(account_id, conversations) if conversations else 0
+        checkpoint.done.add(page)
+        checkpoint.conversations += written
+        report.pages += 1
+        report.conversations += written
+        last_page_size[page] = len(conversations)
+        return len(conversations)
+
+    async def save() -> None:
+        await sink.flush()
+        checkpoint.save()
+
+    def progress() -> None:
+        report.elapsed = time.perf_counter() - started
+        report.total_pages = checkpoint.total_pages
+        done, total = len(checkpoint.done), checkpoint.total_pages or 0
+        eta = (total - done) * report.elapsed / report.pages if report.pages and total > done else 0.0
+        logger.info(
+            f"Backfill conta {account_id}: {done}/{total} páginas, {checkpoint.conversations} conversas, "
+            f"{report.throughput:.1f} conversas/s, ETA {eta:.0f}s"
+        )
+        if on_progress is not None:
+            on_progress(report)
+
+    async def ticker() -> None:
+        next_save = next_progress = time.perf_counter()
+        while True:
+            await asyncio.sleep(min(checkpoint_every, progress_every))
+            now = time.perf_counter()
+            if now >= next_save + checkpoint_every:
+                await save()
+                next_save = now
+            if now >= next_progress + progress_every:
+                progress()
+                next_progress = now
+
+    async def worker(queue: "asyncio.Queue[int]") -> None:
+        while True:
+            try:
+                page = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await process(page)
+
+    background = asyncio.create_task(ticker())
+    try:
+        if 1 not in checkpoint.done or checkpoint.total_pages is None:
+            await process(1)
+        queue: "asyncio.Queue[int]" = asyncio.Queue()
+        for page in range(2, (checkpoint.total_pages or 1) + 1):
+            if page not in checkpoint.done:
+                queue.put_nowait(page)
+        workers = [asyncio.create_task(worker(queue)) for _ in range(max(1, concurrency))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+
+        # Conversas novas durante o backfill empurram a listagem para além do total inicial
+        last = max(checkpoint.total_pages or 1, max(checkpoint.done, default=1))
+        if last_page_size.get(last, PAGE_SIZE) >= PAGE_SIZE:
+            page = last + 1
+            while await process(page) >= PAGE_SIZE:
+                page += 1
+    finally:
+        background.cancel()
+        await save()
+        progress()
+    return report
+
+
+def _sink_from_spec(spec: str) -> Any:
+    kind, _, target = spec.partition(":")
+    if kind == "jsonl":
+        return JsonlSink(target or "conversations.jsonl")
+    if kind == "sqlite":
+        return SqliteSink(target or "data/conversations.db")
+    if kind == "redis":
+        from app.core.settings import settings
+        from .state_store import RedisStateStore
+
+        url = target or settings.REDIS_URL
+        return RedisStateSink(RedisStateStore.from_url(url, ttl_seconds=settings.STATE_STORE_TTL_SECONDS), url)
+    raise SystemExit(f"destino inválido: {spec!r} (use jsonl:<arquivo>, sqlite:<arquivo> ou redis[:<url>])")
+
+
+async def _main(args: argparse.Namespace) -> BackfillReport:
+    from .tenants import tenant_registry
+
+    tenant = tenant_registry.get(args.account) if args.account else tenant_registry.default
+    sink = _sink_from_spec(args.sink)
+    checkpoint = args.checkpoint or os.path.join(".backfill", f"{tenant.account_id}.json")
+
+    def show(report: BackfillReport) -> None:
+        print(
+            f"\r{report.pages + report.resumed_pages}/{report.total_pages or '?'} páginas  "
+            f"{report.conversations} conversas  {report.throughput:.1f}/s",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    try:
+        return await tenant.chatwoot.backfill_conversations(
+            sink,
+            tenant.account_id,
+            status=args.status,
+            sort_by=args.sort_by or None,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            checkpoint_path=checkpoint,
+            progress_every=args.progress_every,
+            on_progress=show,
+        )
+    finally:
+        await sink.close()
+        await tenant.aclose()
+        print(file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sink", default="jsonl:conversations.jsonl", help="jsonl:<arquivo>, sqlite:<arquivo> ou redis[:<url>]"
+    )
+    parser.add_argument("--account", help="account_id (padrão: tenant padrão, CHATWOOT_ACCOUNT_ID)")
+    parser.add_argument("--status", default="all")
+    parser.add_argument(
+        "--sort-by", default="created_at_asc", help="ordenação estável da listagem ('' para o padrão do Chatwoot)"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0, help="requisições por segundo")
+    parser.add_argument("--checkpoint", help="arquivo de checkpoint (padrão: .backfill/<conta>.json)")
+    parser.add_argument("--progress-every", type=float, default=2.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(_main(args))
+    print(json.dumps({
+        "pages": report.pages,
+        "resumed_pages": report.resumed_pages,
+        "conversations": report.conversations,
+        "retries": report.retries,
+        "elapsed_s": round(report.elapsed, 2),
+        "conversations_per_s": round(report.throughput, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,37 @@
 import os
 import logging
-from typing import Dict, Any
+from contextlib import nullcontext
+from typing import Dict, Any, Optional
 
 import httpx
 
+from app.core.metrics import instrument_dependency
+
 logger = logging.getLogger(__name__)
 
 
 class ChatwootClient:
-    def __init__(self):
-        # Load config lazily so app can boot without Chatwoot vars
-        self.base_url = os.getenv("CHATWOOT_BASE_URL", "https://app.chatwoot.com").rstrip("/")
-        self.access_token = os.getenv("CHATWOOT_ACCESS_TOKEN")
-        self.account_id = os.getenv("CHATWOOT_ACCOUNT_ID")
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        *,
+        base_url: Optional[str] = None,
+        access_token: Optional[str] = None,
+        account_id: Optional[str] = None,
+    ):
+        # Explicit credentials (per tenant) or env; validated lazily so app can boot without Chatwoot vars
+        self.base_url = (base_url or os.getenv("CHATWOOT_BASE_URL", "https://app.chatwoot.com")).rstrip("/")
+        self.access_token = access_token or os.getenv("CHATWOOT_ACCESS_TOKEN")
+        self.account_id = account_id or os.getenv("CHATWOOT_ACCOUNT_ID")
         self.headers = None  # built on demand
+        # Optional shared (pooled) client, owned by the caller
+        self.http_client = http_client
+
+    def _client(self):
+        # Shared pooled client when configured, otherwise one client per call
+        if self.http_client is not None:
+            return nullcontext(self.http_client)
+        return httpx.AsyncClient()
 
     def _ensure_config(self) -> None:
         if not self.base_url or not self.access_token or not self.account_id:
@@ -28,9 +46,10 @@ class ChatwootClient:
                 "Accept": "application/json",
             }
 
+    @instrument_dependency("chatwoot")
     async def test_connection(self) -> Dict[str, Any]:
         self._ensure_config()
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             response = await client.get(
                 f"{self.base_url}/api/v1/accounts/{self.account_id}",
                 headers=self.headers,
@@ -39,23 +58,51 @@ class ChatwootClient:
             response.raise_for_status()
             return {"status": "connected", "account": response.json()}
 
+    @instrument_dependency("chatwoot")
     async def get_conversation(self, account_id: str, conversation_id: int) -> Dict[str, Any]:
         self._ensure_config()
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/api/v1/accounts/{account_id}/conversations/{conversation_id}"
             r = await client.get(url, headers=self.headers, timeout=15.0)
             r.raise_for_status()
             return r.json()
 
+    @instrument_dependency("chatwoot")
+    async def list_conversations(
+        self,
+        account_id: str,
+        page: int = 1,
+        status: str = "all",
+        sort_by: Optional[str] = "created_at_asc",
+    ) -> Dict[str, Any]:
+        """Uma página (25 conversas) da listagem; inclui ``custom_attributes`` de cada conversa"""
+        self._ensure_config()
+        params: Dict[str, Any] = {"page": page, "status": status}
+        if sort_by:
+            params["sort_by"] = sort_by
+        async with self._client() as client:
+            url = f"{self.base_url}/api/v1/accounts/{account_id}/conversations"
+            r = await client.get(url, headers=self.headers, params=params, timeout=30.0)
+            r.raise_for_status()
+            return r.json()
+
+    async def backfill_conversations(self, sink: Any, account_id: Optional[str] = None, **options: Any) -> Any:
+        """Copiar todas as conversas da conta para ``sink`` (ver ``api/services/backfill.py``)"""
+        from .backfill import run_backfill
+
+        return await run_backfill(self, sink, account_id or self.account_id, **options)
+
+    @instrument_dependency("chatwoot")
     async def set_attributes(self, account_id: str, conversation_id: int, **attributes: Any) -> Dict[str, Any]:
         self._ensure_config()
         payload = {"custom_attributes": attributes}
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/api/v1/accounts/{account_id}/conversations/{conversation_id}"
             r = await client.patch(url, headers=self.headers, json=payload, timeout=15.0)
             r.raise_for_status()
             return r.json()
 
+    @instrument_dependency("chatwoot")
     async def reply(self, account_id: str, conversation_id: int, content: str, private: bool = False) -> Dict[str, Any]:
         self._ensure_config()
         payload = {
@@ -63,19 +110,20 @@ class ChatwootClient:
             "message_type": "outgoing",
             "private": private,
         }
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/api/v1/accounts/{account_id}/conversations/{conversation_id}/messages"
             r = await client.post(url, headers=self.headers, json=payload, timeout=15.0)
             r.raise_for_status()
             return r.json()
 
+    @instrument_dependency("chatwoot")
     async def set_status(self, account_id: str, conversation_id: int, status: str) -> Dict[str, Any]:
         self._ensure_config()
         allowed = {"open", "resolved", "snoozed", "pending"}
         if status not in allowed:
             raise ValueError(f"status inválido: {status}")
         payload = {"status": status}
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/api/v1/accounts/{account_id}/conversations/{conversation_id}"
             r = await client.patch(url, headers=self.headers, json=payload, timeout=15.0)
             r.raise_for_status()
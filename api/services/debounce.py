@@ -0,0 +1,125 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from app.core.metrics import DEBOUNCE_WAIT, TURN_MESSAGES
+from app.core.settings import settings
+from app.core.tracing import stage
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Burst:
+    first_at: float
+    last_at: float
+    outcome: "asyncio.Future[None]"
+    texts: List[str] = field(default_factory=list)
+    full: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class MessageDebouncer:
+    """Agrupa mensagens em rajada da mesma conversa em um único turno.
+
+    A primeira mensagem vira a "líder": espera até ``window`` segundos sem
+    mensagem nova (cada mensagem que chega reinicia a janela), limitado a
+    ``max_wait`` segundos desde a primeira ou a ``max_messages`` mensagens.
+    As seguintes são anexadas à rajada; a líder executa o turno com todos os
+    textos, na ordem de chegada. As seguintes esperam o turno da líder e
+    terminam com o mesmo status: se a líder for descartada (503) ou falhar,
+    elas levantam a mesma exceção e o Chatwoot reenvia também os textos
+    delas, em vez de recebê-los como entregues e perdê-los.
+
+    O agrupamento é por processo: com vários workers, mensagens da mesma
+    rajada que caem em workers diferentes viram turnos separados.
+    """
+
+    def __init__(
+        self,
+        window: float = 0.0,
+        max_wait: float = 5.0,
+        max_messages: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.max_wait = max_wait
+        self.max_messages = max_messages
+        self.clock = clock
+        self._bursts: Dict[Hashable, _Burst] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def _deadline(self, burst: _Burst) -> float:
+        return min(burst.last_at + self.window, burst.first_at + self.max_wait)
+
+    async def _wait(self, key: Hashable, burst: _Burst) -> None:
+        try:
+            while not burst.full.is_set():
+                remaining = self._deadline(burst) - self.clock()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(burst.full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Mensagens que chegarem daqui em diante abrem uma nova rajada
+            del self._bursts[key]
+
+    async def run(self, key: Hashable, text: str, turn: Callable[[List[str]], Awaitable[T]]) -> Optional[T]:
+        """Executa ``turn`` com os textos da rajada (líder) ou espera o turno da líder (seguidoras).
+
+        A líder devolve o resultado de ``turn``; as seguidoras devolvem ``None``
+        quando ele termina bem, ou levantam a exceção dele.
+        """
+        if not self.enabled:
+            TURN_MESSAGES.observe(1)
+            return await turn([text])
+
+        now = self.clock()
+        burst = self._bursts.get(key)
+        if burst is not None:
+            burst.texts.append(text)
+            burst.last_at = now
+            if len(burst.texts) >= self.max_messages:
+                burst.full.set()
+            # shield: se esta requisição cair, o turno das outras segue
+            with stage("debounce"):
+                await asyncio.shield(burst.outcome)
+            return None
+
+        burst = self._bursts[key] = _Burst(
+            first_at=now, last_at=now, outcome=asyncio.get_running_loop().create_future(), texts=[text]
+        )
+        try:
+            with stage("debounce"):
+                await self._wait(key, burst)
+            TURN_MESSAGES.observe(len(burst.texts))
+            DEBOUNCE_WAIT.observe(self.clock() - burst.first_at)
+            result = await turn(burst.texts)
+        except asyncio.CancelledError:
+            burst.outcome.set_exception(RuntimeError("turno da rajada cancelado"))
+            burst.outcome.exception()  # sem seguidoras ninguém lê a exceção
+            raise
+        except Exception as e:
+            burst.outcome.set_exception(e)
+            burst.outcome.exception()
+            raise
+        burst.outcome.set_result(None)
+        return result
+
+
+def combine_messages(texts: List[str]) -> str:
+    """Junta os textos da rajada no texto único passado ao fluxo (ex.: "João" + "Silva")."""
+    return " ".join(t for t in texts if t)
+
+
+# Instância global (configuração em app/core/settings.py)
+message_debouncer = MessageDebouncer(
+    window=settings.DEBOUNCE_WINDOW_MS / 1000,
+    max_wait=settings.DEBOUNCE_MAX_WAIT_MS / 1000,
+    max_messages=settings.DEBOUNCE_MAX_MESSAGES,
+)
@@ -0,0 +1,531 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.metrics import FOLLOW_UP_LAG, FOLLOW_UPS, FOLLOW_UPS_PENDING
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, int]
+
+
+@dataclass(slots=True)
+class FollowUpJob:
+    """Follow-up pendente de uma conversa (no máximo um por conversa)"""
+
+    account_id: str
+    conversation_id: int
+    due_at: float
+    follow_up_type: str
+    lead_info: Dict[str, Any] = field(default_factory=dict)
+    contact_id: Optional[int] = None
+    attempt: int = 0
+    id: str = field(default_factory=lambda: os.urandom(8).hex())
+    # Só em memória: o usuário respondeu enquanto o follow-up estava sendo gerado
+    cancelled: bool = field(default=False, compare=False)
+
+    @property
+    def key(self) -> Key:
+        return self.account_id, self.conversation_id
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        del data["cancelled"]
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: Any) -> "FollowUpJob":
+        return cls(**json.loads(raw))
+
+
+class TimingWheel:
+    """Timing wheel hierárquica: inserir e cancelar em O(1), avançar em O(1) por tick.
+
+    ``levels`` rodas de ``slots`` posições; cada posição do nível ``n`` cobre
+    ``slots**n`` ticks. Um job entra no nível mais baixo que alcança o seu
+    vencimento e desce de nível (cascata) quando a roda de baixo dá a volta.
+    Com os padrões (tick de 1s, 64 posições, 4 níveis) o horizonte é de ~194
+    dias; o que passa disso fica em ``overflow`` e é redistribuído a cada volta
+    completa. Cada posição é um dict por chave, e ``_index`` aponta a posição
+    de cada chave: cancelar não percorre nada.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: Optional[float] = None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels: List[List[Dict[Key, FollowUpJob]]] = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._overflow: Dict[Key, FollowUpJob] = {}
+        self._ready: Dict[Key, FollowUpJob] = {}
+        self._index: Dict[Key, Dict[Key, FollowUpJob]] = {}
+        self.current = math.floor((time.time() if now is None else now) / tick)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: Key) -> Optional[FollowUpJob]:
+        bucket = self._index.get(key)
+        return bucket[key] if bucket is not None else None
+
+    def _place(self, job: FollowUpJob) -> None:
+        due = math.ceil(job.due_at / self.tick)
+        delta = due - self.current
+        if delta <= 0:
+            bucket = self._ready
+        else:
+            for level in range(self.levels):
+                if delta < self._spans[level + 1]:
+                    bucket = self._wheels[level][(due // self._spans[level]) % self.slots]
+                    break
+            else:
+                bucket = self._overflow
+        bucket[job.key] = job
+        self._index[job.key] = bucket
+
+    def add(self, job: FollowUpJob) -> Optional[FollowUpJob]:
+        """Agenda ``job``; devolve o job que ele substituiu na mesma conversa"""
+        previous = self.remove(job.key)
+        self._place(job)
+        return previous
+
+    def remove(self, key: Key) -> Optional[FollowUpJob]:
+        bucket = self._index.pop(key, None)
+        return bucket.pop(key) if bucket is not None else None
+
+    def _cascade(self, bucket: Dict[Key, FollowUpJob]) -> None:
+        jobs = list(bucket.values())
+        bucket.clear()
+        for job in jobs:
+            self._place(job)
+
+    def advance(self, now: float) -> List[FollowUpJob]:
+        """Avança até ``now`` e devolve os jobs vencidos (nunca antes de ``due_at``)"""
+        target = math.floor(now / self.tick)
+        while self.current < target:
+            self.current += 1
+            if self._overflow and self.current % self._spans[self.levels] == 0:
+                self._cascade(self._overflow)
+            for level in range(self.levels - 1, 0, -1):
+                if self.current % self._spans[level] == 0:
+                    self._cascade(self._wheels[level][(self.current // self._spans[level]) % self.slots])
+            self._cascade(self._wheels[0][self.current % self.slots])
+        due = list(self._ready.values())
+        self._ready.clear()
+        for job in due:
+            del self._index[job.key]
+        return due
+
+
+# Persistência
+
+
+class SqliteFollowUpStore:
+    """Follow-ups pendentes num arquivo SQLite (WAL), uma linha por conversa"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS follow_ups (
+        account_id      TEXT    NOT NULL,
+        conversation_id INTEGER NOT NULL,
+        id              TEXT    NOT NULL,
+        due_at          REAL    NOT NULL,
+        job             TEXT    NOT NULL,
+        PRIMARY KEY (account_id, conversation_id)
+    )
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Aberta no primeiro uso, já dentro do worker: uma conexão SQLite não
+        # pode atravessar o fork do master (preload_app)
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def open_sync(self) -> None:
+        with self._lock:
+            self._connection()
+
+    def apply_sync(self, upserts: List[FollowUpJob], deletes: List[Key]) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "DELETE FROM follow_ups WHERE account_id = ? AND conversation_id = ?", deletes
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO follow_ups VALUES (?, ?, ?, ?, ?)",
+                    [(j.account_id, j.conversation_id, j.id, j.due_at, j.to_json()) for j in upserts],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def apply(self, upserts: List[FollowUpJob], deletes: List[Key]) -> None:
+        await asyncio.to_thread(self.apply_sync, upserts, deletes)
+
+    def claim_sync(self, job: FollowUpJob) -> bool:
+        with self._lock:
+            return self._connection().execute(
+                "DELETE FROM follow_ups WHERE account_id = ? AND conversation_id = ? AND id = ?",
+                (job.account_id, job.conversation_id, job.id),
+            ).rowcount == 1
+
+    async def claim(self, job: FollowUpJob) -> bool:
+        """Remove o job se ele ainda for o pendente da conversa; só quem remove envia"""
+        return await asyncio.to_thread(self.claim_sync, job)
+
+    async def load(self, batch_size: int = 10000) -> AsyncIterator[List[FollowUpJob]]:
+        await asyncio.to_thread(self.open_sync)  # cria o arquivo e a tabela se ainda não existem
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            cursor = conn.execute("SELECT job FROM follow_ups")
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield [FollowUpJob.from_json(raw) for (raw,) in rows]
+        finally:
+            conn.close()
+
+    async def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Remove só se o job gravado ainda for o mesmo (outra resposta pode ter reagendado)
+_CLAIM_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if raw and cjson.decode(raw)['id'] == ARGV[2] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class RedisFollowUpStore:
+    """Follow-ups pendentes num hash do Redis (``follow_ups``: ``account:conversation`` → job)"""
+
+    hash_key = "follow_ups"
+
+    def __init__(self, redis: Any = None, url: Optional[str] = None):
+        self._redis = redis
+        self._url = url
+        self._script: Any = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisFollowUpStore":
+        # Cliente criado no primeiro uso, já dentro do worker
+        return cls(url=url)
+
+    @property
+    def redis(self) -> Any:
+        if self._redis is None:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(self._url)
+        return self._redis
+
+    @staticmethod
+    def member(key: Key) -> str:
+        return f"{key[0]}:{key[1]}"
+
+    async def apply(self, upserts: List[FollowUpJob], deletes: List[Key]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if deletes:
+                pipe.hdel(self.hash_key, *(self.member(k) for k in deletes))
+            if upserts:
+                pipe.hset(self.hash_key, mapping={self.member(j.key): j.to_json() for j in upserts})
+            await pipe.execute()
+
+    async def claim(self, job: FollowUpJob) -> bool:
+        if self._script is None:
+            self._script = self.redis.register_script(_CLAIM_SCRIPT)
+        return bool(await self._script(keys=[self.hash_key], args=[self.member(job.key), job.id]))
+
+    async def load(self, batch_size: int = 10000) -> AsyncIterator[List[FollowUpJob]]:
+        batch: List[FollowUpJob] = []
+        async for _, raw in self.redis.hscan_iter(self.hash_key, count=batch_size):
+            batch.append(FollowUpJob.from_json(raw))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+# Agendador
+
+
+class FollowUpScheduler:
+    """Agenda, cancela e dispara follow-ups a partir de uma ``TimingWheel``.
+
+    ``schedule``/``cancel`` só mexem na roda em memória; as mudanças vão para
+    o store em lote a cada tick (ou em ``flush``). A cada tick os jobs
+    vencidos são disparados em lotes de ``batch_size``, no máximo
+    ``concurrency`` ao mesmo tempo. Antes de chamar ``handler`` o job é
+    reivindicado no store (``claim``): com vários workers carregando o mesmo
+    store, só um envia, e um job cancelado ou reagendado por outro worker não
+    é enviado. Envio é no máximo uma vez: se o processo cair depois do claim,
+    o follow-up se perde. Falhas do ``handler`` são repetidas com backoff até
+    ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[FollowUpJob], Awaitable[bool]],
+        store: Any = None,
+        tick: float = 1.0,
+        slots: int = 64,
+        levels: int = 4,
+        batch_size: int = 100,
+        concurrency: int = 10,
+        max_attempts: int = 3,
+        retry_delay: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.handler = handler
+        self.store = store
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.wheel = TimingWheel(tick, slots, levels, now=clock())
+        self._dirty: Dict[Key, Optional[FollowUpJob]] = {}
+        self._firing: Dict[Key, FollowUpJob] = {}
+        self._slots = asyncio.Semaphore(concurrency)
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.wheel)
+
+    def _add(self, job: FollowUpJob) -> None:
+        if self.wheel.add(job) is None:
+            FOLLOW_UPS_PENDING.inc()
+        self._dirty[job.key] = job
+
+    def schedule(
+        self,
+        account_id: Any,
+        conversation_id: int,
+        delay: float,
+        follow_up_type: str,
+        lead_info: Optional[Dict[str, Any]] = None,
+        contact_id: Optional[int] = None,
+    ) -> FollowUpJob:
+        """Agendar (ou reagendar) o follow-up da conversa para daqui a ``delay`` segundos"""
+        job = FollowUpJob(
+            str(account_id), int(conversation_id), self.clock() + delay, follow_up_type, lead_info or {}, contact_id
+        )
+        self._add(job)
+        FOLLOW_UPS.labels("scheduled").inc()
+        return job
+
+    def cancel(self, account_id: Any, conversation_id: int) -> bool:
+        """Cancelar o follow-up pendente (ou em envio) da conversa; remove também do store"""
+        key = (str(account_id), int(conversation_id))
+        job = self.wheel.remove(key)
+        firing = self._firing.get(key)
+        if firing is not None:
+            firing.cancelled = True
+        # Mesmo sem job aqui: outro worker pode ter agendado esta conversa
+        if self.store is not None:
+            self._dirty[key] = None
+        if job is None and firing is None:
+            return False
+        if job is not None:
+            FOLLOW_UPS_PENDING.dec()
+        FOLLOW_UPS.labels("cancelled").inc()
+        return True
+
+    def pending(self, account_id: Any, conversation_id: int) -> Optional[FollowUpJob]:
+        return self.wheel.get((str(account_id), int(conversation_id)))
+
+    async def flush(self) -> int:
+        """Gravar no store as mudanças acumuladas desde o último flush"""
+        if not self._dirty or self.store is None:
+            self._dirty.clear()
+            return 0
+        batch, self._dirty = self._dirty, {}
+        upserts = [job for job in batch.values() if job is not None]
+        deletes = [key for key, job in batch.items() if job is None]
+        try:
+            await self.store.apply(upserts, deletes)
+        except Exception as e:
+            logger.error(f"Erro ao gravar {len(batch)} follow-ups: {str(e)}")
+            # Mudanças feitas durante o flush têm prioridade
+            for key, job in batch.items():
+                self._dirty.setdefault(key, job)
+            raise
+        return len(batch)
+
+    async def load(self) -> int:
+        """Carregar os follow-ups pendentes do store (vencidos saem no próximo tick)"""
+        if self.store is None:
+            return 0
+        loaded = 0
+        async for jobs in self.store.load():
+            for job in jobs:
+                if self.wheel.add(job) is None:
+                    loaded += 1
+        FOLLOW_UPS_PENDING.inc(loaded)
+        logger.info(f"{loaded} follow-ups pendentes carregados")
+        return loaded
+
+    async def _fire(self, job: FollowUpJob, now: float) -> bool:
+        async with self._slots:
+            if self.store is not None and not await self.store.claim(job):
+                FOLLOW_UPS.labels("skipped").inc()
+                return False
+            FOLLOW_UP_LAG.observe(max(0.0, now - job.due_at))
+            self._firing[job.key] = job
+            try:
+                sent = await self.handler(job)
+            except Exception as e:
+                logger.error(f"Erro ao enviar follow-up da conversa {job.conversation_id}: {str(e)}")
+                sent = False
+                if job.cancelled or self.wheel.get(job.key) is not None:
+                    FOLLOW_UPS.labels("skipped").inc()
+                elif job.attempt + 1 < self.max_attempts:
+                    retry_at = self.clock() + self.retry_delay * 2 ** job.attempt
+                    self._add(FollowUpJob(
+                        job.account_id, job.conversation_id, retry_at, job.follow_up_type,
+                        job.lead_info, job.contact_id, job.attempt + 1,
+                    ))
+                    FOLLOW_UPS.labels("retried").inc()
+                else:
+                    FOLLOW_UPS.labels("failed").inc()
+            else:
+                FOLLOW_UPS.labels("sent" if sent else "skipped").inc()
+            finally:
+                if self._firing.get(job.key) is job:
+                    del self._firing[job.key]
+            return sent
+
+    async def run_due(self, now: Optional[float] = None) -> int:
+        """Disparar os follow-ups vencidos até ``now``; devolve quantos foram enviados"""
+        await self.flush()  # o claim precisa ver os jobs agendados neste processo
+        now = self.clock() if now is None else now
+        due = self.wheel.advance(now)
+        if not due:
+            return 0
+        FOLLOW_UPS_PENDING.dec(len(due))
+        sent = 0
+        for start in range(0, len(due), self.batch_size):
+            results = await asyncio.gather(*(self._fire(job, now) for job in due[start:start + self.batch_size]))
+            sent += sum(results)
+        return sent
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.warning(f"Erro no disparo de follow-ups: {e}")
+
+    async def start(self) -> None:
+        await self.load()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="follow-up-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            pass
+        if self.store is not None:
+            await self.store.close()
+
+
+class FollowUpDelivery:
+    """Gera o texto com ``BotLogic.generate_follow_up_message`` e responde na conversa.
+
+    O histórico recente do transcript local (quando ligado) vai junto com o
+    ``lead_info``. Com ``notify_n8n``, o workflow ``follow-up`` do n8n é
+    avisado depois do envio (``N8NClient.trigger_follow_up``).
+    """
+
+    def __init__(self, bot: Any = None, notify_n8n: bool = False, history_limit: int = 20):
+        self._bot = bot
+        self.notify_n8n = notify_n8n
+        self.history_limit = history_limit
+
+    @property
+    def bot(self) -> Any:
+        if self._bot is None:
+            from ..domain.bot_logic import BotLogic
+
+            self._bot = BotLogic()
+        return self._bot
+
+    async def __call__(self, job: FollowUpJob) -> bool:
+        from .openai_client import format_history
+        from .tenants import tenant_registry
+
+        bot = self.bot
+        lead_info = dict(job.lead_info)
+        history = await bot.conversation_history(job.account_id, job.conversation_id, self.history_limit)
+        if history:
+            lead_info["historico"] = format_history(history)
+        message = await bot.generate_follow_up_message(lead_info, job.follow_up_type)
+        if job.cancelled or not message:
+            return False
+        await tenant_registry.get(job.account_id).chatwoot.reply(job.account_id, job.conversation_id, message)
+        if bot.transcripts is not None:
+            bot.transcripts.append(job.account_id, job.conversation_id, "assistant", message)
+        if self.notify_n8n and job.contact_id is not None:
+            from .n8n_client import N8NClient
+
+            try:
+                scheduled = datetime.fromtimestamp(job.due_at, timezone.utc).isoformat()
+                await N8NClient().trigger_follow_up(job.contact_id, job.follow_up_type, scheduled_time=scheduled)
+            except Exception as e:
+                logger.warning(f"Follow-up da conversa {job.conversation_id} enviado, mas o n8n falhou: {e}")
+        return True
+
+
+# Instância global (None quando FOLLOW_UP_ENABLED=false)
+follow_up_scheduler: Optional[FollowUpScheduler] = None
+if settings.FOLLOW_UP_ENABLED:
+    follow_up_scheduler = FollowUpScheduler(
+        FollowUpDelivery(notify_n8n=settings.FOLLOW_UP_NOTIFY_N8N),
+        RedisFollowUpStore.from_url(settings.REDIS_URL)
+        if settings.FOLLOW_UP_STORE == "redis"
+        else SqliteFollowUpStore(settings.FOLLOW_UP_PATH),
+        batch_size=settings.FOLLOW_UP_BATCH_SIZE,
+        concurrency=settings.FOLLOW_UP_CONCURRENCY,
+        max_attempts=settings.FOLLOW_UP_MAX_ATTEMPTS,
+    )
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.core.metrics import DEPENDENCY_PROBE_LATENCY, DEPENDENCY_UP
+from app.core.settings import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProbeResult:
+    status: str  # connected | error | not_configured | unavailable
+    latency_ms: float = 0.0
+    checked_at: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["age_s"] = round(time.time() - self.checked_at, 3) if self.checked_at else None
+        return data
+
+
+class HealthProber:
+    """Checa Chatwoot, n8n e Redis em background e guarda o último resultado.
+
+    Cada dependência tem seu próprio intervalo; as checagens usam um cliente
+    HTTP com pool e um cliente Redis assíncrono, então o readiness responde
+    da memória sem abrir conexões nem bloquear o event loop.
+    """
+
+    def __init__(
+        self,
+        interval: float = 10.0,
+        intervals: Optional[Dict[str, Optional[float]]] = None,
+        timeout: float = 5.0,
+        chatwoot_url: Optional[str] = None,
+        chatwoot_token: Optional[str] = None,
+        n8n_url: Optional[str] = None,
+        n8n_key: Optional[str] = None,
+        redis_url: Optional[str] = None,
+    ):
+        overrides = intervals or {}
+        self.intervals = {name: overrides.get(name) or interval for name in ("chatwoot", "n8n", "redis")}
+        self.timeout = timeout
+        self.chatwoot_url = chatwoot_url
+        self.chatwoot_token = chatwoot_token
+        self.n8n_url = n8n_url
+        self.n8n_key = n8n_key
+        self.redis_url = redis_url
+        self._results: Dict[str, ProbeResult] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+        self._redis: Any = None
+        self._redis_available = True
+        self._tasks: list = []
+
+    @classmethod
+    def from_settings(cls, config: Settings) -> "HealthProber":
+        return cls(
+            interval=config.HEALTH_PROBE_INTERVAL,
+            intervals={
+                "chatwoot": config.HEALTH_PROBE_INTERVAL_CHATWOOT,
+                "n8n": config.HEALTH_PROBE_INTERVAL_N8N,
+                "redis": config.HEALTH_PROBE_INTERVAL_REDIS,
+            },
+            chatwoot_url=config.CHATWOOT_BASE_URL,
+            chatwoot_token=config.CHATWOOT_ACCESS_TOKEN,
+            n8n_url=config.N8N_BASE_URL,
+            n8n_key=config.N8N_API_KEY,
+            redis_url=config.REDIS_URL,
+        )
+
+    def _http_client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout)
+        return self._http
+
+    def _redis_client(self) -> Any:
+        if self._redis is None:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError:
+                self._redis_available = False
+                return None
+            self._redis = aioredis.from_url(
+                self.redis_url, socket_timeout=self.timeout, socket_connect_timeout=self.timeout
+            )
+        return self._redis
+
+    async def _check_chatwoot(self) -> Optional[str]:
+        if not (self.chatwoot_url and self.chatwoot_token):
+            return "not_configured"
+        headers = {"Authorization": f"Bearer {self.chatwoot_token}"}
+        response = await self._http_client().get(f"{self.chatwoot_url}/api/v1/profile", headers=headers)
+        response.raise_for_status()
+        return None
+
+    async def _check_n8n(self) -> Optional[str]:
+        if not (self.n8n_url and self.n8n_key):
+            return "not_configured"
+        headers = {"X-N8N-API-KEY": self.n8n_key}
+        response = await self._http_client().get(f"{self.n8n_url}/api/v1/workflows", headers=headers)
+        response.raise_for_status()
+        return None
+
+    async def _check_redis(self) -> Optional[str]:
+        if not self.redis_url:
+            return "not_configured"
+        client = self._redis_client()
+        if client is None:
+            return "unavailable"
+        await client.ping()
+        return None
+
+    def _checks(self) -> Dict[str, Callable[[], Awaitable[Optional[str]]]]:
+        return {"chatwoot": self._check_chatwoot, "n8n": self._check_n8n, "redis": self._check_redis}
+
+    async def probe(self, name: str) -> ProbeResult:
+        """Executar uma checagem e atualizar cache e métricas"""
+        start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(self._checks()[name](), timeout=self.timeout) or "connected"
+            error = None
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start
+        result = ProbeResult(status=status, latency_ms=round(latency * 1000, 3), checked_at=time.time(), error=error)
+        previous = self._results.get(name)
+        self._results[name] = result
+        if status != "not_configured":
+            DEPENDENCY_UP.labels(name).set(1 if status == "connected" else 0)
+            DEPENDENCY_PROBE_LATENCY.labels(name).set(latency)
+        if error and (previous is None or previous.status != "error"):
+            logger.warning(f"Health probe de {name} falhou: {error}")
+        return result
+
+    async def refresh(self) -> Dict[str, ProbeResult]:
+        """Checar todas as dependências agora (usado enquanto o cache está vazio)"""
+        await asyncio.gather(*(self.probe(name) for name in self._checks()))
+        return self.results()
+
+    def results(self) -> Dict[str, ProbeResult]:
+        return dict(self._results)
+
+    def max_age(self, name: str) -> float:
+        """Idade a partir da qual um resultado é considerado obsoleto"""
+        return 3 * self.intervals[name] + self.timeout
+
+    async def _loop(self, name: str) -> None:
+        while True:
+            await self.probe(name)
+            await asyncio.sleep(self.intervals[name])
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._loop(name), name=f"probe-{name}") for name in self._checks()]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+health_prober = HealthProber.from_settings(settings)
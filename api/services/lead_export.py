@@ -0,0 +1,508 @@
+"""Exportação de leads em lotes (CSV, JSONL ou Parquet).
+
+Lê os leads de uma origem (Chatwoot, o SQLite do backfill ou o Postgres do
+``LeadStore``) como um fluxo, calcula ``fit`` (``compute_fit_primary``) e
+``intent`` (``classify_intent`` sobre a ``dor_principal``), aplica os
+filtros e grava em lotes de tamanho fixo: a memória não depende do número
+de leads.
+
+    python -m api.services.lead_export --source chatwoot -o leads.csv.gz --compression gzip
+    python -m api.services.lead_export --source sqlite:data/conversas.db --format parquet -o leads.parquet
+    python -m api.services.lead_export --source postgres --fit elegivel --since 2026-01-01 -o - > leads.csv
+"""
+import argparse
+import asyncio
+import csv
+import importlib.util
+import io
+import json
+import logging
+import sqlite3
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..domain.bot_logic import classify_intent, compute_fit_primary
+from ..domain.models import State
+from .lead_store import STATE_COLUMNS
+
+# pyarrow (Parquet) e zstandard são opcionais e só são importados ao exportar
+has_pyarrow = importlib.util.find_spec("pyarrow") is not None
+has_zstandard = importlib.util.find_spec("zstandard") is not None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ("account_id", "conversation_id", *STATE_COLUMNS, "fit", "intent", "updated_at")
+FORMATS = ("csv", "jsonl", "parquet")
+COMPRESSIONS = ("gzip", "zstd")
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet", "gzip": ".gz", "zstd": ".zst"}
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "gzip": "application/gzip",
+    "zstd": "application/zstd",
+}
+
+
+def _utc(value: Any) -> Optional[datetime]:
+    """Datas da origem (epoch do Chatwoot, ISO ou datetime) em UTC"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def lead_export_row(
+    account_id: Any, conversation_id: Any, attributes: Dict[str, Any], updated_at: Any = None
+) -> Dict[str, Any]:
+    """Linha exportada: campos do ``State`` + fit + intenção da dor principal.
+
+    Os atributos não passam pela validação completa do ``State`` (o
+    ``EmailStr`` custa ~0,5ms por lead e um e-mail malformado não deve tirar
+    o lead do arquivo): só ``time_vendas`` vira inteiro e os horários, UTC.
+    """
+    values = {c: attributes.get(c) for c in STATE_COLUMNS}
+    values["time_vendas"] = int(values["time_vendas"]) if values["time_vendas"] not in (None, "") else None
+    values["horario1"], values["horario2"] = _utc(values["horario1"]), _utc(values["horario2"])
+    state = State.model_construct(**values)
+    row: Dict[str, Any] = {"account_id": str(account_id), "conversation_id": int(conversation_id)}
+    row.update((c, getattr(state, c)) for c in STATE_COLUMNS)
+    row["fit"] = compute_fit_primary(state).value
+    row["intent"] = classify_intent(state.dor_principal).value if state.dor_principal else None
+    row["updated_at"] = _utc(updated_at)
+    return row
+
+
+@dataclass
+class LeadFilter:
+    """Filtros por fit, trecho da dor principal (sem diferenciar maiúsculas) e período de ``updated_at``"""
+
+    fit: Optional[str] = None
+    dor: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    def __post_init__(self) -> None:
+        self.dor = self.dor.lower() if self.dor else None
+        self.since, self.until = _utc(self.since), _utc(self.until)
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        if self.fit and row["fit"] != self.fit:
+            return False
+        if self.dor and self.dor not in (row["dor_principal"] or "").lower():
+            return False
+        if self.since or self.until:
+            updated = row["updated_at"]
+            if updated is None or (self.since and updated < self.since) or (self.until and updated >= self.until):
+                return False
+        return True
+
+
+# Formatos
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class _Compressor:
+    """Compressão em fluxo: cada lote sai comprimido, o fim do arquivo sai em ``flush``"""
+
+    def __init__(self, compression: Optional[str]):
+        if compression == "gzip":
+            self._obj: Any = zlib.compressobj(6, zlib.DEFLATED, 31)
+        elif compression == "zstd":
+            if not has_zstandard:
+                raise RuntimeError("zstandard não está instalado")
+            import zstandard
+
+            self._obj = zstandard.ZstdCompressor(level=3).compressobj()
+        elif compression:
+            raise ValueError(f"compressão inválida: {compression!r} (use {', '.join(COMPRESSIONS)})")
+        else:
+            self._obj = None
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) if self._obj is not None else data
+
+    def flush(self) -> bytes:
+        return self._obj.flush() if self._obj is not None else b""
+
+
+class CsvEncoder:
+    def __init__(self, compression: Optional[str] = None):
+        self._compressor = _Compressor(compression)
+
+    def _encode(self, rows: List[List[Any]]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return self._compressor.compress(buffer.getvalue().encode("utf-8"))
+
+    def begin(self) -> bytes:
+        return self._encode([list(EXPORT_COLUMNS)])
+
+    def write(self, rows: List[Dict[str, Any]]) -> bytes:
+        return self._encode([[_plain(row[c]) for c in EXPORT_COLUMNS] for row in rows])
+
+    def end(self) -> bytes:
+        return self._compressor.flush()
+
+
+class JsonlEncoder:
+    def __init__(self, compression: Optional[str] = None):
+        self._compressor = _Compressor(compression)
+
+    def begin(self) -> bytes:
+        return b""
+
+    def write(self, rows: List[Dict[str, Any]]) -> bytes:
+        text = "".join(json.dumps(row, ensure_ascii=False, default=_plain) + "\n" for row in rows)
+        return self._compressor.compress(text.encode("utf-8"))
+
+    def end(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Chunks(io.RawIOBase):
+    """Arquivo só de escrita que entrega o que foi escrito desde o último ``drain``.
+
+    ``tell`` continua contando desde o início: o writer do Parquet grava os
+    offsets dos row groups no rodapé.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class ParquetEncoder:
+    """Um row group por lote; a compressão é a do próprio Parquet (por coluna)"""
+
+    def __init__(self, compression: Optional[str] = None):
+        if not has_pyarrow:
+            raise RuntimeError("pyarrow não está instalado")
+        if compression and compression not in COMPRESSIONS:
+            raise ValueError(f"compressão inválida: {compression!r} (use {', '.join(COMPRESSIONS)})")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {"conversation_id": pa.int64(), "time_vendas": pa.int64()}
+        for column in ("horario1", "horario2", "updated_at"):
+            types[column] = pa.timestamp("us", tz="UTC")
+        self._pa = pa
+        self._schema = pa.schema([(c, types.get(c, pa.string())) for c in EXPORT_COLUMNS])
+        self._sink = _Chunks()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression=compression or "none")
+
+    def begin(self) -> bytes:
+        return b""
+
+    def write(self, rows: List[Dict[str, Any]]) -> bytes:
+        columns = {c: [row[c] for row in rows] for c in EXPORT_COLUMNS}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+        return self._sink.drain()
+
+    def end(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+_ENCODERS = {"csv": CsvEncoder, "jsonl": JsonlEncoder, "parquet": ParquetEncoder}
+
+
+def make_encoder(fmt: str, compression: Optional[str] = None) -> Any:
+    """Encoder do formato; ``RuntimeError`` se a dependência opcional faltar, ``ValueError`` se for inválido"""
+    if fmt not in _ENCODERS:
+        raise ValueError(f"formato inválido: {fmt!r} (use {', '.join(FORMATS)})")
+    return _ENCODERS[fmt](compression)
+
+
+def export_filename(fmt: str, compression: Optional[str] = None) -> str:
+    suffix = EXTENSIONS[compression] if compression and fmt != "parquet" else ""
+    return f"leads{EXTENSIONS[fmt]}{suffix}"
+
+
+def export_media_type(fmt: str, compression: Optional[str] = None) -> str:
+    return MEDIA_TYPES[compression] if compression and fmt != "parquet" else MEDIA_TYPES[fmt]
+
+
+# Pipeline
+
+
+@dataclass
+class ExportStats:
+    rows: int = 0
+    skipped: int = 0
+    filtered: int = 0
+    batches: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Linhas exportadas por segundo"""
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+async def export_leads(
+    source: AsyncIterator[Dict[str, Any]],
+    encoder: Any,
+    lead_filter: Optional[LeadFilter] = None,
+    batch_size: int = 1000,
+    stats: Optional[ExportStats] = None,
+) -> AsyncIterator[bytes]:
+    """Gerar o arquivo em pedaços (um por lote) a partir dos registros da origem.
+
+    Cada registro tem ``account_id``, ``conversation_id``, ``attributes``
+    (campos do ``State``) e ``updated_at``. Registros com atributos
+    inválidos são ignorados (``stats.skipped``). O encoding do lote roda
+    numa thread para não segurar o event loop.
+    """
+    stats = stats if stats is not None else ExportStats()
+    started = time.perf_counter()
+    batch: List[Dict[str, Any]] = []
+
+    async def encode(rows: List[Dict[str, Any]]) -> bytes:
+        data = await asyncio.to_thread(encoder.write, rows)
+        stats.rows += len(rows)
+        stats.batches += 1
+        stats.bytes += len(data)
+        return data
+
+    try:
+        header = encoder.begin()
+        stats.bytes += len(header)
+        if header:
+            yield header
+        async for record in source:
+            try:
+                row = lead_export_row(
+                    record["account_id"], record["conversation_id"], record["attributes"], record.get("updated_at")
+                )
+            except Exception as e:
+                stats.skipped += 1
+                logger.warning(f"Lead da conversa {record.get('conversation_id')} ignorado na exportação: {str(e)}")
+                continue
+            if lead_filter is not None and not lead_filter.matches(row):
+                stats.filtered += 1
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                data = await encode(batch)
+                batch = []
+                if data:
+                    yield data
+        if batch:
+            data = await encode(batch)
+            if data:
+                yield data
+        tail = await asyncio.to_thread(encoder.end)
+        stats.bytes += len(tail)
+        if tail:
+            yield tail
+    finally:
+        stats.elapsed = time.perf_counter() - started
+
+
+# Origens
+
+
+class _QueueSink:
+    """Destino do backfill que entrega cada página à exportação (fila limitada = backpressure)"""
+
+    def __init__(self, queue: "asyncio.Queue[Any]"):
+        self.queue = queue
+
+    def describe(self) -> str:
+        return "export"
+
+    async def write(self, account_id: Any, conversations: List[Dict[str, Any]]) -> int:
+        await self.queue.put((account_id, conversations))
+        return len(conversations)
+
+    async def flush(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+_DONE = object()
+
+
+async def chatwoot_source(
+    client: Any, account_id: Any = None, status: str = "all", concurrency: int = 4, rate: float = 10.0
+) -> AsyncIterator[Dict[str, Any]]:
+    """Leads das conversas do Chatwoot, paginadas pelo backfill (concorrência, rate limit e retries)"""
+    from .backfill import run_backfill
+
+    queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=max(1, concurrency))
+    account_id = account_id or client.account_id
+
+    async def produce() -> None:
+        try:
+            await run_backfill(client, _QueueSink(queue), account_id, status=status, concurrency=concurrency, rate=rate)
+        except Exception:
+            await queue.put(_DONE)
+            raise
+        await queue.put(_DONE)
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            page_account, conversations = item
+            for conversation in conversations:
+                yield {
+                    "account_id": page_account,
+                    "conversation_id": conversation.get("id"),
+                    "attributes": conversation.get("custom_attributes") or {},
+                    "updated_at": conversation.get("last_activity_at"),
+                }
+        await task  # propaga erros do backfill
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def sqlite_source(path: str, account_id: Any = None, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+    """Leads da tabela ``conversations`` gravada pelo backfill (``--sink sqlite:<arquivo>``)"""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    try:
+        sql = "SELECT account_id, conversation_id, custom_attributes, last_activity_at FROM conversations"
+        args: tuple = ()
+        if account_id is not None:
+            sql, args = sql + " WHERE account_id = ?", (str(account_id),)
+        cursor = conn.execute(sql + " ORDER BY account_id, conversation_id", args)
+        while True:
+            rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+            if not rows:
+                break
+            for account, conversation_id, attributes, updated_at in rows:
+                yield {
+                    "account_id": account,
+                    "conversation_id": conversation_id,
+                    "attributes": json.loads(attributes),
+                    "updated_at": updated_at,
+                }
+    finally:
+        conn.close()
+
+
+async def store_source(
+    store: Any, lead_filter: Optional[LeadFilter] = None, batch_size: int = 1000
+) -> AsyncIterator[Dict[str, Any]]:
+    """Leads do Postgres (``LeadStore.iter_rows``); fit e período vão para o SQL"""
+    lead_filter = lead_filter or LeadFilter()
+    async for row in store.iter_rows(
+        fit=lead_filter.fit, since=lead_filter.since, until=lead_filter.until, batch_size=batch_size
+    ):
+        yield {
+            "account_id": row["account_id"],
+            "conversation_id": row["conversation_id"],
+            "attributes": {c: row[c] for c in STATE_COLUMNS if row[c] is not None},
+            "updated_at": row["updated_at"],
+        }
+
+
+# CLI
+
+
+async def _main(args: argparse.Namespace) -> ExportStats:
+    from app.core.settings import settings
+
+    lead_filter = LeadFilter(fit=args.fit, dor=args.dor, since=args.since, until=args.until)
+    encoder = make_encoder(args.format, args.compression)
+    cleanup = []
+    kind, _, target = args.source.partition(":")
+    if kind == "chatwoot":
+        from .tenants import tenant_registry
+
+        tenant = tenant_registry.get(args.account) if args.account else tenant_registry.default
+        source = chatwoot_source(tenant.chatwoot, tenant.account_id, concurrency=args.concurrency, rate=args.rate)
+        cleanup.append(tenant.aclose)
+    elif kind == "sqlite":
+        source = sqlite_source(target or "data/conversations.db", args.account, args.batch_size)
+    elif kind == "postgres":
+        from .lead_store import LeadStore
+
+        store = await LeadStore.connect(target or settings.database_dsn)
+        source = store_source(store, lead_filter, args.batch_size)
+        cleanup.append(store.close)
+    else:
+        raise SystemExit(f"origem inválida: {args.source!r} (use chatwoot, sqlite:<arquivo> ou postgres[:<dsn>])")
+
+    stats = ExportStats()
+    output = args.output or export_filename(args.format, args.compression)
+    out = sys.stdout.buffer if output == "-" else open(output, "wb")
+    try:
+        async for chunk in export_leads(source, encoder, lead_filter, args.batch_size, stats):
+            out.write(chunk)
+    finally:
+        out.flush()
+        if out is not sys.stdout.buffer:
+            out.close()
+        for close in cleanup:
+            await close()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default="chatwoot", help="chatwoot, sqlite:<arquivo> ou postgres[:<dsn>]")
+    parser.add_argument("--account", help="account_id (chatwoot: padrão é o tenant padrão; sqlite: filtra a conta)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--compression", choices=COMPRESSIONS)
+    parser.add_argument("-o", "--output", help="arquivo de saída ('-' para stdout; padrão: leads.<formato>)")
+    parser.add_argument("--fit", choices=("elegivel", "inelegivel"))
+    parser.add_argument("--dor", help="trecho da dor_principal")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="updated_at >= (ISO, UTC se sem fuso)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="updated_at < (ISO, UTC se sem fuso)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=10.0, help="requisições por segundo ao Chatwoot")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        stats = asyncio.run(_main(args))
+    except (RuntimeError, ValueError) as e:
+        raise SystemExit(str(e))
+    print(json.dumps({
+        "rows": stats.rows,
+        "filtered": stats.filtered,
+        "skipped": stats.skipped,
+        "batches": stats.batches,
+        "bytes": stats.bytes,
+        "elapsed_s": round(stats.elapsed, 2),
+        "rows_per_s": round(stats.throughput, 1),
+    }), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import asyncio
+import importlib.util
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from ..domain.models import LeadQualification, State
+from app.core.settings import settings
+
+# asyncpg é opcional e só é importado ao abrir o pool
+has_asyncpg = importlib.util.find_spec("asyncpg") is not None
+
+logger = logging.getLogger(__name__)
+
+# Status derivado da ação do turno (step_transition_v2)
+ACTION_STATUS = {
+    "create_lead": "qualificado",
+    "schedule": "agendado",
+    "handoff": "handoff",
+}
+DEFAULT_STATUS = "em_qualificacao"
+
+STATE_COLUMNS = (
+    "nome", "sobrenome", "empresa", "cargo", "email", "celular", "time_vendas",
+    "horario1", "horario2", "ferramentas", "dor_principal",
+)
+COLUMNS = ("account_id", "conversation_id", *STATE_COLUMNS, "status", "fit", "qualification_score", "qualification")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    account_id          text        NOT NULL,
+    conversation_id     bigint      NOT NULL,
+    nome                text,
+    sobrenome           text,
+    empresa             text,
+    cargo               text,
+    email               text,
+    celular             text,
+    time_vendas         integer,
+    horario1            timestamptz,
+    horario2            timestamptz,
+    ferramentas         text,
+    dor_principal       text,
+    status              text        NOT NULL DEFAULT 'em_qualificacao',
+    fit                 text,
+    qualification_score integer,
+    qualification       jsonb,
+    created_at          timestamptz NOT NULL DEFAULT now(),
+    updated_at          timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (account_id, conversation_id)
+);
+CREATE INDEX IF NOT EXISTS leads_status_updated_idx ON leads (status, updated_at DESC);
+CREATE INDEX IF NOT EXISTS leads_fit_updated_idx ON leads (fit, updated_at DESC);
+CREATE INDEX IF NOT EXISTS leads_created_idx ON leads (created_at);
+"""
+
+# Campos nulos no lote não apagam o que já está gravado; status só sai de
+# "em_qualificacao" (turnos sem ação não rebaixam um lead já qualificado)
+_MERGE = ",\n    ".join(
+    [f"{c} = COALESCE(EXCLUDED.{c}, leads.{c})" for c in COLUMNS[2:] if c != "status"]
+    + [
+        f"status = CASE WHEN EXCLUDED.status = '{DEFAULT_STATUS}' THEN leads.status ELSE EXCLUDED.status END",
+        "updated_at = now()",
+    ]
+)
+_UPSERT_FROM_STAGE = f"""
+INSERT INTO leads ({", ".join(COLUMNS)})
+SELECT {", ".join(COLUMNS)} FROM leads_stage
+ON CONFLICT (account_id, conversation_id) DO UPDATE SET
+    {_MERGE}
+"""
+
+
+def lead_row(
+    account_id: Any,
+    conversation_id: int,
+    state: State,
+    action: Optional[str] = None,
+    fit: Optional[str] = None,
+    qualification: Optional[LeadQualification] = None,
+) -> Dict[str, Any]:
+    """Montar a linha da tabela `leads` a partir do estado do turno"""
+    row: Dict[str, Any] = {c: getattr(state, c) for c in STATE_COLUMNS}
+    row.update(
+        account_id=str(account_id),
+        conversation_id=int(conversation_id),
+        status=ACTION_STATUS.get(action or "", DEFAULT_STATUS),
+        fit=fit,
+        qualification_score=qualification.qualification_score if qualification else None,
+        qualification=qualification.model_dump_json() if qualification else None,
+    )
+    return row
+
+
+def merge_rows(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """Combinar duas linhas da mesma conversa com a mesma regra do upsert"""
+    merged = dict(older)
+    for key, value in newer.items():
+        if key == "status":
+            if value != DEFAULT_STATUS:
+                merged[key] = value
+        elif value is not None:
+            merged[key] = value
+    return merged
+
+
+class LeadStore:
+    """Persistência de leads no Postgres (pool asyncpg)"""
+
+    def __init__(self, pool: Any):
+        self.pool = pool
+
+    @classmethod
+    async def connect(cls, dsn: str, min_size: int = 1, max_size: int = 10) -> "LeadStore":
+        if not has_asyncpg:
+            raise RuntimeError("asyncpg não está instalado")
+        import asyncpg
+
+        return cls(await asyncpg.create_pool(dsn, min_size=min_size, max_size=max_size))
+
+    async def init_schema(self) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.execute(SCHEMA)
+
+    async def upsert_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Gravar um lote: COPY para tabela temporária + um único INSERT ... ON CONFLICT.
+
+        As linhas devem ter chaves únicas (account_id, conversation_id) no lote.
+        """
+        records = [tuple(row.get(c) for c in COLUMNS) for row in rows]
+        if not records:
+            return 0
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "CREATE TEMP TABLE leads_stage (LIKE leads INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                await conn.copy_records_to_table("leads_stage", records=records, columns=COLUMNS)
+                await conn.execute(_UPSERT_FROM_STAGE)
+        return len(records)
+
+    @staticmethod
+    def _where(
+        status: Optional[str], fit: Optional[str], since: Optional[datetime], until: Optional[datetime]
+    ) -> Tuple[str, List[Any]]:
+        clauses, args = [], []
+        for column, op, value in (
+            ("status", "=", status),
+            ("fit", "=", fit),
+            ("updated_at", ">=", since),
+            ("updated_at", "<", until),
+        ):
+            if value is not None:
+                args.append(value)
+                clauses.append(f"{column} {op} ${len(args)}")
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), args
+
+    @staticmethod
+    def _decode(record: Any) -> Dict[str, Any]:
+        return {**dict(record), "qualification": json.loads(record["qualification"]) if record["qualification"] else None}
+
+    async def query(
+        self,
+        status: Optional[str] = None,
+        fit: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Buscar leads por status, fit e período de atualização (usa os índices)"""
+        where, args = self._where(status, fit, since, until)
+        args.append(limit)
+        sql = f"SELECT * FROM leads {where} ORDER BY updated_at DESC LIMIT ${len(args)}"
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(sql, *args)
+        return [self._decode(r) for r in rows]
+
+    async def iter_rows(
+        self,
+        status: Optional[str] = None,
+        fit: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Percorrer todos os leads do filtro com um cursor no servidor (``batch_size`` linhas por ida ao banco)"""
+        where, args = self._where(status, fit, since, until)
+        sql = f"SELECT * FROM leads {where} ORDER BY account_id, conversation_id"
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                async for record in conn.cursor(sql, *args, prefetch=batch_size):
+                    yield self._decode(record)
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+class LeadWriter:
+    """Acumula linhas do webhook e grava em lotes no Postgres.
+
+    `submit` não bloqueia: linhas da mesma conversa são combinadas em memória
+    e um loop em background faz o flush a cada `flush_interval` segundos ou
+    quando o lote atinge `batch_size`. Em erro, o lote volta para a fila.
+    """
+
+    def __init__(
+        self,
+        store: Optional[LeadStore] = None,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[tuple, Dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        key = (row["account_id"], row["conversation_id"])
+        if key not in self._pending and len(self._pending) >= self.max_pending:
+            logger.warning(f"Fila de leads cheia; descartando conversa {key[1]}")
+            return False
+        previous = self._pending.get(key)
+        self._pending[key] = merge_rows(previous, row) if previous else row
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> int:
+        if not self._pending or self.store is None:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            return await self.store.upsert_many(batch.values())
+        except Exception as e:
+            logger.error(f"Erro ao gravar {len(batch)} leads: {str(e)}")
+            # Linhas novas que chegaram durante o flush têm prioridade
+            for key, row in batch.items():
+                newer = self._pending.get(key)
+                self._pending[key] = merge_rows(row, newer) if newer else row
+            raise
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                await asyncio.sleep(self.flush_interval)
+
+    async def start(self, dsn: Optional[str] = None) -> None:
+        """Abrir o pool (se necessário), criar o schema e iniciar o loop de flush"""
+        if self.store is None:
+            self.store = await LeadStore.connect(
+                dsn or settings.database_dsn,
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+            )
+            await self.store.init_schema()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="lead-writer")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            pass
+        if self.store is not None:
+            await self.store.close()
+
+
+# Instância global (None quando LEAD_STORE_ENABLED=false)
+lead_writer: Optional[LeadWriter] = LeadWriter() if settings.LEAD_STORE_ENABLED else None
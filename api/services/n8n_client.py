@@ -1,21 +1,29 @@
 import httpx
 import os
+from contextlib import nullcontext
+from typing import Optional
+
+from app.core.metrics import instrument_dependency, track_dependency
 
 BASE = os.getenv("N8N_BASE_URL", "").rstrip("/")
 USER = os.getenv("N8N_BASIC_AUTH_USER")
 PASS = os.getenv("N8N_BASIC_AUTH_PASSWORD")
 AUTH = (USER, PASS) if USER else None
 
-async def trigger(slug: str, payload: dict):
-    """Dispara um webhook público/privado do n8n e retorna JSON quando houver."""
+async def trigger(slug: str, payload: dict, client: Optional[httpx.AsyncClient] = None):
+    """Dispara um webhook público/privado do n8n e retorna JSON quando houver.
+
+    `client` permite reutilizar um cliente HTTP compartilhado (pool de conexões).
+    """
     if not BASE:
         raise RuntimeError("N8N_BASE_URL não definido")
     url = f"{BASE}/webhook/{slug}"
-    async with httpx.AsyncClient(timeout=30.0) as c:
-        r = await c.post(url, json=payload, auth=AUTH)
-        r.raise_for_status()
-        ct = r.headers.get("content-type", "")
-        return r.json() if "application/json" in ct else {"status": r.status_code}
+    async with track_dependency("n8n", f"webhook:{slug}"):
+        async with (nullcontext(client) if client is not None else httpx.AsyncClient(timeout=30.0)) as c:
+            r = await c.post(url, json=payload, auth=AUTH, timeout=30.0)
+            r.raise_for_status()
+            ct = r.headers.get("content-type", "")
+            return r.json() if "application/json" in ct else {"status": r.status_code}
 import logging
 from typing import Dict, Any, Optional
 import asyncio
@@ -34,6 +42,7 @@ class N8NClient:
         if self.api_key:
             self.headers["X-N8N-API-KEY"] = self.api_key
 
+    @instrument_dependency("n8n")
     async def test_connection(self) -> Dict[str, Any]:
         """Testar conexão com N8N"""
         async with httpx.AsyncClient() as client:
@@ -48,6 +57,7 @@ class N8NClient:
                 logger.error(f"Erro ao testar conexão N8N: {str(e)}")
                 raise
 
+    @instrument_dependency("n8n")
     async def trigger_workflow(
         self, 
         workflow_name: str, 
@@ -81,6 +91,7 @@ class N8NClient:
                 logger.error(f"Erro ao disparar workflow: {str(e)}")
                 raise
 
+    @instrument_dependency("n8n")
     async def _get_workflow_id_by_name(self, workflow_name: str) -> Optional[str]:
         """Obter ID do workflow pelo nome"""
         async with httpx.AsyncClient() as client:
@@ -178,6 +189,7 @@ class N8NClient:
         
         return await self.trigger_workflow("email-sequence", data)
 
+    @instrument_dependency("n8n")
     async def get_workflow_status(self, execution_id: str) -> Dict[str, Any]:
         """Obter status de execução de um workflow"""
         async with httpx.AsyncClient() as client:
@@ -193,6 +205,7 @@ class N8NClient:
                 logger.error(f"Erro ao obter status do workflow: {str(e)}")
                 raise
 
+    @instrument_dependency("n8n")
     async def list_workflows(self) -> Dict[str, Any]:
         """Listar todos os workflows disponíveis"""
         async with httpx.AsyncClient() as client:
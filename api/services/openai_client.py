@@ -1,55 +1,104 @@
-from openai import AsyncOpenAI
 import os
 import logging
 from typing import Dict, Any, Optional, List
 import json
 
+from app.core.metrics import record_openai_usage, track_dependency
+from .prompt_budget import budget_for
+from .prompts import (
+    ANALYZE_MESSAGE_INTENT,
+    EXTRACT_CONTACT_INFO,
+    GENERATE_FOLLOW_UP_MESSAGE,
+    GENERATE_RESPONSE,
+    HANDLE_OBJECTION,
+    QUALIFY_LEAD,
+    QUALIFY_LEAD_INCREMENTAL,
+    QUALIFY_LEAD_INCREMENTAL_SUMMARY,
+    PromptTemplate,
+)
+
 logger = logging.getLogger(__name__)
 
+def format_history(conversation_history: List[Dict[str, str]]) -> str:
+    return "\n".join(
+        f"{msg.get('role', 'user')}: {msg.get('content', '')}"
+        for msg in conversation_history
+    )
+
+
 class OpenAIClient:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY é obrigatório")
         
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        self._client: Any = None
         self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        self.budget = budget_for(self.model)
 
-    async def analyze_message_intent(self, message: str) -> Dict[str, Any]:
-        """Analisar intenção de uma mensagem"""
-        try:
-            prompt = f"""
-            Analise a seguinte mensagem de um cliente e determine:
-            1. Intenção principal (interesse, objeção, pergunta, etc.)
-            2. Nível de interesse (alto, médio, baixo)
-            3. Tipo de objeção (se houver)
-            4. Próximos passos recomendados
-            5. Urgência (alta, média, baixa)
-            
-            Mensagem: "{message}"
-            
-            Responda em formato JSON:
-            {{
-                "intent": "string",
-                "interest_level": "string",
-                "objection_type": "string ou null",
-                "next_steps": "string",
-                "urgency": "string",
-                "confidence": "float entre 0 e 1"
-            }}
-            """
-            
+    @property
+    def client(self) -> Any:
+        """SDK da OpenAI importado só no primeiro uso (reduz o cold start da API)"""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(api_key=self.api_key)
+        return self._client
+
+    async def _chat(
+        self,
+        operation: str,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Chamar chat completions registrando latência e consumo de tokens.
+
+        O prompt passa pelo orçamento da operação (espaços normalizados, corte
+        se exceder) e ``max_tokens`` é ajustado pelo tamanho observado das
+        respostas anteriores.
+        """
+        system, prompt, _ = self.budget.prepare(operation, system, prompt)
+        max_tokens = self.budget.max_tokens(operation, max_tokens)
+        async with track_dependency("openai", operation):
             response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "Você é um especialista em análise de vendas e atendimento ao cliente."},
+                    {"role": "system", "content": system},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3,
-                max_tokens=500
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        usage = getattr(response, "usage", None)
+        record_openai_usage(operation, self.model, usage)
+        choice = response.choices[0]
+        self.budget.observe(
+            operation, getattr(usage, "completion_tokens", None), max_tokens, getattr(choice, "finish_reason", None)
+        )
+        return choice.message.content
+
+    async def _complete(self, template: PromptTemplate, **values: str) -> str:
+        """Renderizar o template (prefixo estático + variáveis) e chamar o modelo"""
+        return await self._chat(
+            template.operation,
+            template.system,
+            template.render(**values),
+            temperature=template.temperature,
+            max_tokens=template.max_tokens
+        )
+
+    async def analyze_message_intent(self, message: str) -> Dict[str, Any]:
+        """Analisar intenção de uma mensagem"""
+        try:
+            op = ANALYZE_MESSAGE_INTENT.operation
+            content = await self._complete(
+                ANALYZE_MESSAGE_INTENT,
+                message=self.budget.fit_text(op, "message", message, self.budget.share(op, 0.6))
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
             logger.info(f"Análise de intenção concluída: {result}")
             return result
             
@@ -64,35 +113,14 @@ class OpenAIClient:
     ) -> str:
         """Gerar resposta personalizada para o cliente"""
         try:
-            context_str = ""
-            if context:
-                context_str = f"Contexto: {json.dumps(context, ensure_ascii=False)}\n"
-            
-            prompt = f"""
-            {context_str}
-            
-            Cliente disse: "{message}"
-            
-            Gere uma resposta profissional, amigável e persuasiva que:
-            1. Reconheça a mensagem do cliente
-            2. Forneça valor ou informação útil
-            3. Faça uma pergunta para engajar
-            4. Mantenha tom conversacional e não muito comercial
-            
-            Resposta:
-            """
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Você é um assistente de vendas experiente e amigável."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=300
+            op = GENERATE_RESPONSE.operation
+            content = await self._complete(
+                GENERATE_RESPONSE,
+                context=self.budget.fit_json(op, "context", context, self.budget.share(op, 0.4)) if context else "(nenhum)",
+                message=self.budget.fit_text(op, "message", message, self.budget.share(op, 0.4))
             )
             
-            result = response.choices[0].message.content.strip()
+            result = content.strip()
             logger.info(f"Resposta gerada: {result}")
             return result
             
@@ -103,31 +131,14 @@ class OpenAIClient:
     async def handle_objection(self, objection: str, product_context: str) -> str:
         """Lidar com objeções específicas"""
         try:
-            prompt = f"""
-            Cliente apresentou a seguinte objeção: "{objection}"
-            
-            Contexto do produto/serviço: {product_context}
-            
-            Gere uma resposta que:
-            1. Valide a preocupação do cliente
-            2. Forneça uma solução ou benefício
-            3. Use prova social ou dados quando possível
-            4. Faça uma pergunta para continuar a conversa
-            
-            Resposta:
-            """
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Você é um especialista em lidar com objeções de vendas."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.6,
-                max_tokens=400
+            op = HANDLE_OBJECTION.operation
+            content = await self._complete(
+                HANDLE_OBJECTION,
+                product_context=self.budget.fit_text(op, "product_context", product_context, self.budget.share(op, 0.4)),
+                objection=self.budget.fit_text(op, "objection", objection, self.budget.share(op, 0.4))
             )
             
-            result = response.choices[0].message.content.strip()
+            result = content.strip()
             logger.info(f"Objeção tratada: {result}")
             return result
             
@@ -141,40 +152,11 @@ class OpenAIClient:
     ) -> Dict[str, Any]:
         """Qualificar lead baseado no histórico da conversa"""
         try:
-            history_str = "\n".join([
-                f"{msg.get('role', 'user')}: {msg.get('content', '')}"
-                for msg in conversation_history
-            ])
+            op = QUALIFY_LEAD.operation
+            history = self.budget.fit_history(op, "conversation_history", conversation_history, self.budget.share(op, 0.8))
+            content = await self._complete(QUALIFY_LEAD, history=format_history(history))
             
-            prompt = f"""
-            Baseado no histórico da conversa abaixo, qualifique o lead:
-            
-            {history_str}
-            
-            Analise e retorne em formato JSON:
-            {{
-                "qualification_score": "float entre 0 e 100",
-                "budget_indication": "string",
-                "authority_level": "string",
-                "need_level": "string",
-                "timeline": "string",
-                "next_best_action": "string",
-                "risk_factors": ["array de strings"],
-                "opportunity_size": "string"
-            }}
-            """
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Você é um especialista em qualificação de leads BANT (Budget, Authority, Need, Timeline)."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=600
-            )
-            
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
             logger.info(f"Lead qualificado: {result}")
             return result
             
@@ -182,6 +164,41 @@ class OpenAIClient:
             logger.error(f"Erro ao qualificar lead: {str(e)}")
             raise
 
+    async def qualify_lead_incremental(
+        self,
+        summary: str,
+        previous_qualification: Optional[Dict[str, Any]],
+        new_messages: List[Dict[str, str]],
+        refresh_summary: bool = False
+    ) -> Dict[str, Any]:
+        """Requalificar lead a partir do resumo acumulado e só das mensagens novas.
+
+        Com ``refresh_summary`` o modelo também devolve ``conversation_summary``,
+        o resumo atualizado incorporando as mensagens novas.
+        """
+        try:
+            template = QUALIFY_LEAD_INCREMENTAL_SUMMARY if refresh_summary else QUALIFY_LEAD_INCREMENTAL
+            op = template.operation
+            previous = (
+                self.budget.fit_json(op, "previous_qualification", previous_qualification, self.budget.share(op, 0.15))
+                if previous_qualification else "(nenhuma)"
+            )
+            new_messages = self.budget.fit_history(op, "new_messages", new_messages, self.budget.share(op, 0.45))
+            content = await self._complete(
+                template,
+                summary=self.budget.fit_text(op, "summary", summary, self.budget.share(op, 0.25)) or "(início da conversa)",
+                previous=previous,
+                new_messages=format_history(new_messages)
+            )
+
+            result = json.loads(content)
+            logger.info(f"Lead requalificado: {result}")
+            return result
+
+        except Exception as e:
+            logger.error(f"Erro ao requalificar lead: {str(e)}")
+            raise
+
     async def generate_follow_up_message(
         self, 
         lead_info: Dict[str, Any],
@@ -189,32 +206,14 @@ class OpenAIClient:
     ) -> str:
         """Gerar mensagem de follow-up personalizada"""
         try:
-            prompt = f"""
-            Gere uma mensagem de follow-up do tipo "{follow_up_type}" para o seguinte lead:
-            
-            Informações do lead: {json.dumps(lead_info, ensure_ascii=False)}
-            
-            A mensagem deve:
-            1. Ser personalizada baseada nas informações do lead
-            2. Fornecer valor adicional
-            3. Incluir uma call-to-action clara
-            4. Manter tom profissional mas amigável
-            5. Ser concisa (máximo 200 palavras)
-            
-            Mensagem:
-            """
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Você é um especialista em follow-up de vendas."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=300
+            op = GENERATE_FOLLOW_UP_MESSAGE.operation
+            content = await self._complete(
+                GENERATE_FOLLOW_UP_MESSAGE,
+                follow_up_type=follow_up_type,
+                lead_info=self.budget.fit_json(op, "lead_info", lead_info, self.budget.share(op, 0.6))
             )
             
-            result = response.choices[0].message.content.strip()
+            result = content.strip()
             logger.info(f"Mensagem de follow-up gerada: {result}")
             return result
             
@@ -225,33 +224,13 @@ class OpenAIClient:
     async def extract_contact_info(self, message: str) -> Dict[str, Any]:
         """Extrair informações de contato de uma mensagem"""
         try:
-            prompt = f"""
-            Extraia informações de contato da seguinte mensagem:
-            
-            "{message}"
-            
-            Retorne em formato JSON:
-            {{
-                "name": "string ou null",
-                "email": "string ou null",
-                "phone": "string ou null",
-                "company": "string ou null",
-                "position": "string ou null",
-                "website": "string ou null"
-            }}
-            """
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Você é um especialista em extração de informações de contato."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=200
+            op = EXTRACT_CONTACT_INFO.operation
+            content = await self._complete(
+                EXTRACT_CONTACT_INFO,
+                message=self.budget.fit_text(op, "message", message, self.budget.share(op, 0.7))
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
             logger.info(f"Informações extraídas: {result}")
             return result
             
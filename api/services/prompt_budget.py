@@ -0,0 +1,234 @@
+import importlib.util
+import json
+import logging
+import math
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.metrics import PROMPT_MAX_TOKENS, PROMPT_TOKENS_SAVED, PROMPT_TRUNCATIONS
+from app.core.settings import settings
+
+# tiktoken é opcional: sem ele a contagem usa a estimativa por caracteres
+has_tiktoken = importlib.util.find_spec("tiktoken") is not None
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARKER = " [...] "
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens (~4 caracteres por token em português)"""
+    return (len(text) + 3) // 4
+
+
+def normalize_whitespace(text: str) -> str:
+    """Remove a indentação dos templates e espaços repetidos, mantendo uma linha em branco entre blocos"""
+    lines: List[str] = []
+    for line in text.strip().splitlines():
+        line = " ".join(line.split())
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines).strip()
+
+
+class TokenCounter:
+    """Conta tokens com o tokenizer do modelo (tiktoken) ou por estimativa.
+
+    O encoding é carregado numa thread no primeiro uso (pode exigir download
+    do arquivo BPE); até lá, e sem tiktoken, vale ``estimate_tokens``.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding: Any = None
+        self._loading = False
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def warm(self) -> None:
+        try:
+            import tiktoken
+
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Tokenizer indisponível para {self.model}, usando estimativa: {str(e)}")
+
+    def _ensure_loading(self) -> None:
+        if has_tiktoken and not self._loading:
+            self._loading = True
+            threading.Thread(target=self.warm, name="tokenizer-load", daemon=True).start()
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            self._ensure_loading()
+            return estimate_tokens(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int, strategy: str = "head_tail") -> str:
+        """Corta ``text`` para ``max_tokens``: ``head`` (início), ``tail`` (fim) ou ``head_tail`` (2/3 início + 1/3 fim)"""
+        if max_tokens <= 0:
+            return ""
+        encoding = self._encoding
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            size, piece = len(tokens), lambda start, end: encoding.decode(tokens[start:end])
+            marker = len(encoding.encode(TRUNCATION_MARKER))
+        else:
+            size, piece = estimate_tokens(text), lambda start, end: text[start * 4:end * 4 if end is not None else None]
+            marker = estimate_tokens(TRUNCATION_MARKER)
+        if size <= max_tokens:
+            return text
+        if strategy == "head":
+            return piece(0, max_tokens)
+        if strategy == "tail":
+            return piece(size - max_tokens, None)
+        keep = max(max_tokens - marker, 2)
+        head = keep * 2 // 3
+        return piece(0, head) + TRUNCATION_MARKER + piece(size - (keep - head), None)
+
+
+class PromptBudget:
+    """Orçamento de tokens de entrada e saída por operação do ``OpenAIClient``.
+
+    - ``fit_text`` / ``fit_json`` / ``fit_history`` limitam campos variáveis
+      (texto do usuário, contexto, histórico) a uma fração do orçamento
+    - ``prepare`` normaliza espaços do template e garante o orçamento total
+    - ``max_tokens`` ajusta o limite de saída ao p99 das respostas observadas
+      (com folga), sem passar do valor pedido pelo método; respostas cortadas
+      por ``length`` empurram o limite de volta para cima
+    """
+
+    def __init__(
+        self,
+        model: str,
+        budgets: Optional[Dict[str, int]] = None,
+        default_budget: int = 2000,
+        dynamic_max_tokens: bool = True,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        self.counter = TokenCounter(model)
+        self.budgets = budgets or {}
+        self.default_budget = default_budget
+        self.dynamic_max_tokens = dynamic_max_tokens
+        self.window = window
+        self.min_samples = min_samples
+        self._completions: Dict[str, Deque[int]] = {}
+
+    def count(self, text: str) -> int:
+        return self.counter.count(text)
+
+    def input_budget(self, operation: str) -> int:
+        return self.budgets.get(operation, self.default_budget)
+
+    def share(self, operation: str, fraction: float) -> int:
+        return int(self.input_budget(operation) * fraction)
+
+    def _saved(self, operation: str, reason: str, tokens: int) -> None:
+        if tokens > 0:
+            PROMPT_TOKENS_SAVED.labels(operation, reason).inc(tokens)
+
+    # Campos
+
+    def fit_text(self, operation: str, field: str, text: Optional[str], max_tokens: int, strategy: str = "head_tail") -> str:
+        text = text or ""
+        tokens = self.count(text)
+        if tokens <= max_tokens:
+            return text
+        fitted = self.counter.truncate(text, max_tokens, strategy)
+        PROMPT_TRUNCATIONS.labels(operation, field).inc()
+        self._saved(operation, "truncation", tokens - self.count(fitted))
+        return fitted
+
+    def fit_json(self, operation: str, field: str, value: Any, max_tokens: int) -> str:
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+        return self.fit_text(operation, field, text, max_tokens, strategy="head")
+
+    def fit_history(
+        self,
+        operation: str,
+        field: str,
+        history: List[Dict[str, str]],
+        max_tokens: int,
+        per_message: Optional[int] = None,
+    ) -> List[Dict[str, str]]:
+        """Mantém as mensagens mais recentes que cabem em ``max_tokens`` (cada uma limitada a ``per_message``)"""
+        per_message = per_message or max(max_tokens // 4, 1)
+        kept: List[Dict[str, str]] = []
+        original = used = kept_tokens = 0
+        for msg in reversed(history):
+            content = msg.get("content", "") or ""
+            tokens = self.count(content)
+            original += tokens
+            if used >= max_tokens:
+                continue
+            if tokens > per_message:
+                content = self.counter.truncate(content, per_message)
+                tokens = self.count(content)
+            if used + tokens > max_tokens:
+                used = max_tokens  # as mensagens mais antigas ficam de fora
+                continue
+            kept.append({**msg, "content": content})
+            used += tokens
+            kept_tokens += tokens
+        if kept_tokens < original:
+            PROMPT_TRUNCATIONS.labels(operation, field).inc()
+            self._saved(operation, "truncation", original - kept_tokens)
+        return kept[::-1]
+
+    # Prompt completo
+
+    def prepare(self, operation: str, system: str, prompt: str) -> Tuple[str, str, int]:
+        """Normaliza ``system``/``prompt`` e corta o prompt ao orçamento; devolve também os tokens de entrada"""
+        raw = self.count(system) + self.count(prompt)
+        system, prompt = normalize_whitespace(system), normalize_whitespace(prompt)
+        system_tokens, prompt_tokens = self.count(system), self.count(prompt)
+        self._saved(operation, "whitespace", raw - system_tokens - prompt_tokens)
+
+        limit = self.input_budget(operation) - system_tokens
+        if prompt_tokens > limit:
+            fitted = self.counter.truncate(prompt, limit)
+            PROMPT_TRUNCATIONS.labels(operation, "prompt").inc()
+            fitted_tokens = self.count(fitted)
+            self._saved(operation, "truncation", prompt_tokens - fitted_tokens)
+            prompt, prompt_tokens = fitted, fitted_tokens
+        return system, prompt, system_tokens + prompt_tokens
+
+    # Saída
+
+    def max_tokens(self, operation: str, requested: int) -> int:
+        samples = self._completions.get(operation)
+        if not self.dynamic_max_tokens or samples is None or len(samples) < self.min_samples:
+            value = requested
+        else:
+            ordered = sorted(samples)
+            p99 = ordered[min(len(ordered) - 1, math.ceil(0.99 * len(ordered)) - 1)]
+            value = max(min(64, requested), min(requested, math.ceil(p99 * 1.25) + 16))
+        PROMPT_MAX_TOKENS.labels(operation).set(value)
+        return value
+
+    def observe(self, operation: str, completion_tokens: Optional[int], max_tokens: int, finish_reason: Optional[str]) -> None:
+        """Registra o tamanho da resposta; corte por ``length`` conta como resposta do tamanho pedido ao método"""
+        samples = self._completions.setdefault(operation, deque(maxlen=self.window))
+        if finish_reason == "length":
+            samples.extend([max_tokens] * max(1, self.min_samples // 4))
+        elif completion_tokens:
+            samples.append(completion_tokens)
+
+
+@lru_cache(maxsize=None)
+def budget_for(model: str) -> PromptBudget:
+    """Orçamento compartilhado por modelo (as estatísticas de saída valem para todas as instâncias do cliente)"""
+    return PromptBudget(
+        model,
+        budgets=settings.PROMPT_BUDGETS,
+        default_budget=settings.PROMPT_DEFAULT_BUDGET,
+        dynamic_max_tokens=settings.PROMPT_DYNAMIC_MAX_TOKENS,
+    )
@@ -0,0 +1,237 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Tuple
+
+from app.core.metrics import PROMPT_TEMPLATE_INFO
+from .prompt_budget import normalize_whitespace
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Template de prompt com prefixo estático e variáveis no fim.
+
+    ``system`` e ``instructions`` (instruções + schema JSON) não mudam entre
+    chamadas, então todas as requisições de uma operação compartilham o mesmo
+    prefixo e aproveitam o cache de prompt do provedor. As variáveis entram
+    depois, na ordem de ``fields`` (``(nome, rótulo)``). ``version`` é um hash
+    de tudo que é estático: muda sempre que o template muda.
+    """
+
+    name: str
+    system: str
+    instructions: str
+    fields: Tuple[Tuple[str, str], ...]
+    temperature: float
+    max_tokens: int
+    operation: str = ""
+    prefix: str = field(init=False, repr=False)
+    version: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "operation", self.operation or self.name)
+        object.__setattr__(self, "prefix", normalize_whitespace(self.instructions))
+        static = json.dumps(
+            [normalize_whitespace(self.system), self.prefix, self.fields, self.temperature, self.max_tokens],
+            ensure_ascii=False,
+        )
+        object.__setattr__(self, "version", hashlib.sha256(static.encode()).hexdigest()[:12])
+
+    def render(self, **values: str) -> str:
+        sections = [self.prefix]
+        for name, label in self.fields:
+            sections.append(f"{label}:\n{values[name]}")
+        return "\n\n".join(sections)
+
+    def cache_key(self, **values: str) -> str:
+        """Chave estável para cachear a resposta deste template com estes valores"""
+        return f"{self.name}:{self.version}:{hashlib.sha256(self.render(**values).encode()).hexdigest()[:16]}"
+
+
+class PromptRegistry:
+    """Templates compilados uma vez na importação, por nome"""
+
+    def __init__(self) -> None:
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        if template.name in self._templates:
+            raise ValueError(f"template duplicado: {template.name}")
+        self._templates[template.name] = template
+        PROMPT_TEMPLATE_INFO.labels(template.name, template.version).set(1)
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def versions(self) -> Dict[str, str]:
+        return {name: template.version for name, template in self._templates.items()}
+
+    def __iter__(self) -> Iterator[PromptTemplate]:
+        return iter(self._templates.values())
+
+
+prompt_registry = PromptRegistry()
+
+_QUALIFICATION_SCHEMA = """
+    "qualification_score": "float entre 0 e 100",
+    "budget_indication": "string",
+    "authority_level": "string",
+    "need_level": "string",
+    "timeline": "string",
+    "next_best_action": "string",
+    "risk_factors": ["array de strings"],
+    "opportunity_size": "string"
+"""
+
+ANALYZE_MESSAGE_INTENT = prompt_registry.register(PromptTemplate(
+    name="analyze_message_intent",
+    system="Você é um especialista em análise de vendas e atendimento ao cliente.",
+    instructions="""
+        Analise a mensagem do cliente (no final) e determine:
+        1. Intenção principal (interesse, objeção, pergunta, etc.)
+        2. Nível de interesse (alto, médio, baixo)
+        3. Tipo de objeção (se houver)
+        4. Próximos passos recomendados
+        5. Urgência (alta, média, baixa)
+
+        Responda em formato JSON:
+        {
+            "intent": "string",
+            "interest_level": "string",
+            "objection_type": "string ou null",
+            "next_steps": "string",
+            "urgency": "string",
+            "confidence": "float entre 0 e 1"
+        }
+    """,
+    fields=(("message", "Mensagem"),),
+    temperature=0.3,
+    max_tokens=500,
+))
+
+GENERATE_RESPONSE = prompt_registry.register(PromptTemplate(
+    name="generate_response",
+    system="Você é um assistente de vendas experiente e amigável.",
+    instructions="""
+        Responda à última mensagem do cliente (no final, junto com o contexto
+        quando houver) com uma resposta profissional, amigável e persuasiva que:
+        1. Reconheça a mensagem do cliente
+        2. Forneça valor ou informação útil
+        3. Faça uma pergunta para engajar
+        4. Mantenha tom conversacional e não muito comercial
+
+        Escreva apenas o texto da resposta.
+    """,
+    fields=(("context", "Contexto"), ("message", "Cliente disse")),
+    temperature=0.7,
+    max_tokens=300,
+))
+
+HANDLE_OBJECTION = prompt_registry.register(PromptTemplate(
+    name="handle_objection",
+    system="Você é um especialista em lidar com objeções de vendas.",
+    instructions="""
+        O cliente apresentou uma objeção (no final, junto com o contexto do
+        produto/serviço). Gere uma resposta que:
+        1. Valide a preocupação do cliente
+        2. Forneça uma solução ou benefício
+        3. Use prova social ou dados quando possível
+        4. Faça uma pergunta para continuar a conversa
+
+        Escreva apenas o texto da resposta.
+    """,
+    fields=(("product_context", "Contexto do produto/serviço"), ("objection", "Objeção")),
+    temperature=0.6,
+    max_tokens=400,
+))
+
+QUALIFY_LEAD = prompt_registry.register(PromptTemplate(
+    name="qualify_lead",
+    system="Você é um especialista em qualificação de leads BANT (Budget, Authority, Need, Timeline).",
+    instructions="""
+        Baseado no histórico da conversa (no final), qualifique o lead.
+
+        Analise e retorne em formato JSON:
+        {""" + _QUALIFICATION_SCHEMA + """}
+    """,
+    fields=(("history", "Histórico da conversa"),),
+    temperature=0.3,
+    max_tokens=600,
+))
+
+_INCREMENTAL_INSTRUCTIONS = """
+    Atualize a qualificação do lead. Use o resumo da conversa até aqui,
+    a qualificação anterior e as mensagens novas (no final).
+
+    Retorne em formato JSON:
+    {""" + _QUALIFICATION_SCHEMA + """%s}
+"""
+_INCREMENTAL_FIELDS = (
+    ("summary", "Resumo da conversa"),
+    ("previous", "Qualificação anterior"),
+    ("new_messages", "Mensagens novas"),
+)
+
+QUALIFY_LEAD_INCREMENTAL = prompt_registry.register(PromptTemplate(
+    name="qualify_lead_incremental",
+    system="Você é um especialista em qualificação de leads BANT (Budget, Authority, Need, Timeline).",
+    instructions=_INCREMENTAL_INSTRUCTIONS % "",
+    fields=_INCREMENTAL_FIELDS,
+    temperature=0.3,
+    max_tokens=600,
+))
+
+# Mesma operação, pedindo também o resumo atualizado (schema diferente → prefixo próprio)
+QUALIFY_LEAD_INCREMENTAL_SUMMARY = prompt_registry.register(PromptTemplate(
+    name="qualify_lead_incremental_summary",
+    operation="qualify_lead_incremental",
+    system="Você é um especialista em qualificação de leads BANT (Budget, Authority, Need, Timeline).",
+    instructions=_INCREMENTAL_INSTRUCTIONS
+    % ',\n    "conversation_summary": "resumo atualizado da conversa inteira, no máximo 120 palavras"\n',
+    fields=_INCREMENTAL_FIELDS,
+    temperature=0.3,
+    max_tokens=800,
+))
+
+GENERATE_FOLLOW_UP_MESSAGE = prompt_registry.register(PromptTemplate(
+    name="generate_follow_up_message",
+    system="Você é um especialista em follow-up de vendas.",
+    instructions="""
+        Gere uma mensagem de follow-up do tipo indicado no final para o lead
+        descrito no final.
+
+        A mensagem deve:
+        1. Ser personalizada baseada nas informações do lead
+        2. Fornecer valor adicional
+        3. Incluir uma call-to-action clara
+        4. Manter tom profissional mas amigável
+        5. Ser concisa (máximo 200 palavras)
+
+        Escreva apenas o texto da mensagem.
+    """,
+    fields=(("follow_up_type", "Tipo de follow-up"), ("lead_info", "Informações do lead")),
+    temperature=0.7,
+    max_tokens=300,
+))
+
+EXTRACT_CONTACT_INFO = prompt_registry.register(PromptTemplate(
+    name="extract_contact_info",
+    system="Você é um especialista em extração de informações de contato.",
+    instructions="""
+        Extraia informações de contato da mensagem (no final).
+
+        Retorne em formato JSON:
+        {
+            "name": "string ou null",
+            "email": "string ou null",
+            "phone": "string ou null",
+            "company": "string ou null",
+            "position": "string ou null",
+            "website": "string ou null"
+        }
+    """,
+    fields=(("message", "Mensagem"),),
+    temperature=0.1,
+    max_tokens=200,
+))
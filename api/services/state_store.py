@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+from ..domain.models import State
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Nomes curtos dos campos de State no Redis (economiza memória e banda)
+FIELD_CODES = {
+    "nome": "n",
+    "sobrenome": "s",
+    "empresa": "e",
+    "cargo": "c",
+    "email": "m",
+    "celular": "p",
+    "time_vendas": "t",
+    "horario1": "h1",
+    "horario2": "h2",
+    "ferramentas": "f",
+    "dor_principal": "d",
+}
+CODE_FIELDS = {v: k for k, v in FIELD_CODES.items()}
+
+# Compare-and-set: grava só se a versão atual for a esperada; marca a conversa como "suja"
+_CAS_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'v') or '0'
+if current ~= ARGV[1] then
+    return -1
+end
+local version = tonumber(current) + 1
+redis.call('HSET', KEYS[1], 'v', version, 'd', ARGV[2])
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+redis.call('SADD', KEYS[2], ARGV[4])
+return version
+"""
+
+
+class StateConflict(RuntimeError):
+    """Versão do estado mudou durante a atualização (esgotou as tentativas)"""
+
+
+def encode_state(state: State) -> str:
+    data = state.model_dump(mode="json", exclude_none=True)
+    encoded = {FIELD_CODES[k]: v for k, v in data.items() if k in FIELD_CODES}
+    return json.dumps(encoded, separators=(",", ":"), ensure_ascii=False)
+
+
+def decode_state(raw: Any) -> State:
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    data = json.loads(raw) if raw else {}
+    return State(**{CODE_FIELDS[k]: v for k, v in data.items() if k in CODE_FIELDS})
+
+
+class RedisStateStore:
+    """Estado das conversas no Redis com versão e compare-and-set.
+
+    Cada conversa é um hash ``state:{account}:{conversation}`` com ``v``
+    (versão) e ``d`` (State codificado). Atualizações concorrentes do mesmo
+    turno são serializadas por CAS (script Lua) com retry; conversas
+    alteradas entram no set ``state:dirty`` para sincronização assíncrona
+    com os ``custom_attributes`` do Chatwoot (`ChatwootStateSyncer`).
+    """
+
+    dirty_key = "state:dirty"
+
+    def __init__(self, redis: Any = None, ttl_seconds: int = 30 * 24 * 3600, url: Optional[str] = None):
+        self._redis = redis
+        self._url = url
+        self._script: Any = None
+        self.ttl_seconds = ttl_seconds
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisStateStore":
+        # Cliente criado no primeiro uso, já dentro do worker (nada de pool herdado via fork)
+        return cls(url=url, **kwargs)
+
+    @property
+    def redis(self) -> Any:
+        if self._redis is None:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(self._url)
+        return self._redis
+
+    @property
+    def _cas(self) -> Any:
+        if self._script is None:
+            self._script = self.redis.register_script(_CAS_SCRIPT)
+        return self._script
+
+    @staticmethod
+    def key(account_id: Any, conversation_id: Any) -> str:
+        return f"state:{account_id}:{conversation_id}"
+
+    @staticmethod
+    def member(account_id: Any, conversation_id: Any) -> str:
+        return f"{account_id}:{conversation_id}"
+
+    async def get(self, account_id: Any, conversation_id: Any) -> Tuple[Optional[State], int]:
+        """Retornar (state, versão); (None, 0) quando não existe"""
+        version, data = await self.redis.hmget(self.key(account_id, conversation_id), "v", "d")
+        if version is None:
+            return None, 0
+        return decode_state(data), int(version)
+
+    async def compare_and_set(
+        self, account_id: Any, conversation_id: Any, state: State, expected_version: int
+    ) -> Optional[int]:
+        """Gravar se a versão ainda for `expected_version`; retorna a nova versão ou None em conflito"""
+        result = await self._cas(
+            keys=[self.key(account_id, conversation_id), self.dirty_key],
+            args=[expected_version, encode_state(state), self.ttl_seconds, self.member(account_id, conversation_id)],
+        )
+        return None if int(result) < 0 else int(result)
+
+    async def update(
+        self,
+        account_id: Any,
+        conversation_id: Any,
+        mutate: Callable[[State], Tuple[State, T]],
+        loader: Optional[Callable[[], Awaitable[State]]] = None,
+        retries: int = 5,
+    ) -> Tuple[State, T]:
+        """Ler → aplicar `mutate` → CAS, repetindo em conflito.
+
+        `mutate` recebe uma cópia do estado e pode ser reexecutado; `loader`
+        fornece o estado inicial (ex.: Chatwoot) quando ainda não há cache.
+        """
+        for _ in range(retries):
+            state, version = await self.get(account_id, conversation_id)
+            if state is None:
+                state = await loader() if loader else State()
+            new_state, result = mutate(state.model_copy(deep=True))
+            if await self.compare_and_set(account_id, conversation_id, new_state, version) is not None:
+                return new_state, result
+        raise StateConflict(f"conflito ao atualizar estado da conversa {conversation_id}")
+
+    async def get_many(self, ids: Iterable[Tuple[Any, Any]]) -> List[Tuple[Optional[State], int]]:
+        """Ler vários estados em um único pipeline"""
+        ids = list(ids)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for account_id, conversation_id in ids:
+                pipe.hmget(self.key(account_id, conversation_id), "v", "d")
+            rows = await pipe.execute()
+        return [(None, 0) if v is None else (decode_state(d), int(v)) for v, d in rows]
+
+    async def set_many(self, items: Iterable[Tuple[Any, Any, State]], mark_dirty: bool = False) -> None:
+        """Gravar vários estados (sem CAS) em um único pipeline, para jobs em lote"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for account_id, conversation_id, state in items:
+                key = self.key(account_id, conversation_id)
+                pipe.hincrby(key, "v", 1)
+                pipe.hset(key, "d", encode_state(state))
+                if self.ttl_seconds > 0:
+                    pipe.expire(key, self.ttl_seconds)
+                if mark_dirty:
+                    pipe.sadd(self.dirty_key, self.member(account_id, conversation_id))
+            await pipe.execute()
+
+
+class ChatwootStateSyncer:
+    """Sincroniza em background os estados alterados para o Chatwoot"""
+
+    def __init__(
+        self,
+        store: RedisStateStore,
+        set_attributes: Callable[..., Awaitable[Any]],
+        interval: float = 1.0,
+        batch_size: int = 100,
+        concurrency: int = 10,
+    ):
+        self.store = store
+        self.set_attributes = set_attributes
+        self.interval = interval
+        self.batch_size = batch_size
+        self._slots = asyncio.Semaphore(concurrency)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _push(self, member: str, state: Optional[State]) -> bool:
+        if state is None:
+            return True
+        account_id, conversation_id = member.rsplit(":", 1)
+        async with self._slots:
+            try:
+                await self.set_attributes(account_id, int(conversation_id), **state.model_dump(mode="json"))
+                return True
+            except Exception as e:
+                logger.warning(f"Falha ao sincronizar estado {member} com Chatwoot: {e}")
+                return False
+
+    async def sync_once(self) -> int:
+        """Sincronizar um lote; conversas com falha voltam para o set de pendentes"""
+        members = await self.store.redis.spop(self.store.dirty_key, self.batch_size)
+        if not members:
+            return 0
+        members = [m.decode() if isinstance(m, bytes) else m for m in members]
+        ids = [tuple(m.rsplit(":", 1)) for m in members]
+        rows = await self.store.get_many(ids)
+        ok = await asyncio.gather(*(self._push(m, state) for m, (state, _) in zip(members, rows)))
+        failed = [m for m, success in zip(members, ok) if not success]
+        if failed:
+            await self.store.redis.sadd(self.store.dirty_key, *failed)
+        return len(members) - len(failed)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                synced = await self.sync_once()
+            except Exception as e:
+                logger.warning(f"Erro no sync de estados: {e}")
+                synced = 0
+            if synced < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="state-sync")
+
+    async def stop(self) -> None:
+        """Parar o loop e fazer um último flush dos pendentes"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            while await self.sync_once():
+                pass
+        except Exception as e:
+            logger.warning(f"Erro no flush final de estados: {e}")
+
+
+# Instâncias globais (None quando STATE_STORE_ENABLED=false)
+state_store: Optional[RedisStateStore] = None
+state_syncer: Optional[ChatwootStateSyncer] = None
+if settings.STATE_STORE_ENABLED:
+    from .tenants import tenant_registry
+
+    async def _set_attributes(account_id: Any, conversation_id: int, **attributes: Any) -> Any:
+        # Cada conta sincroniza com as credenciais do seu tenant
+        return await tenant_registry.get(account_id).chatwoot.set_attributes(account_id, conversation_id, **attributes)
+
+    state_store = RedisStateStore.from_url(settings.REDIS_URL, ttl_seconds=settings.STATE_STORE_TTL_SECONDS)
+    state_syncer = ChatwootStateSyncer(state_store, _set_attributes, interval=settings.STATE_SYNC_INTERVAL)
@@ -0,0 +1,256 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from ..domain.bot_logic import bot_configuration_from_env
+from ..domain.models import BotConfiguration
+from .chatwoot_client import ChatwootClient
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Fluxos de qualificação disponíveis por tenant (ver api/domain/bot_logic.py)
+FLOWS = ("v2", "v1")
+
+
+@dataclass(eq=False)
+class Tenant:
+    """Uma conta do Chatwoot atendida por esta API"""
+
+    account_id: str
+    hmac_secret: str
+    chatwoot_base_url: str
+    chatwoot_token: Optional[str]
+    name: str = ""
+    flow: str = "v2"
+    weight: float = 1.0
+    bot_config: BotConfiguration = field(default_factory=BotConfiguration)
+    _chatwoot: Optional[ChatwootClient] = field(default=None, repr=False, compare=False)
+
+    @property
+    def credentials(self) -> Tuple[str, Optional[str], str]:
+        return self.chatwoot_base_url, self.chatwoot_token, self.account_id
+
+    @property
+    def chatwoot(self) -> ChatwootClient:
+        """Cliente Chatwoot do tenant, com pool HTTP próprio (criado no primeiro uso)"""
+        if self._chatwoot is None:
+            self._chatwoot = ChatwootClient(
+                httpx.AsyncClient(
+                    timeout=15.0,
+                    limits=httpx.Limits(
+                        max_connections=settings.TENANT_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.TENANT_HTTP_MAX_CONNECTIONS,
+                    ),
+                ),
+                base_url=self.chatwoot_base_url,
+                access_token=self.chatwoot_token,
+                account_id=self.account_id,
+            )
+        return self._chatwoot
+
+    async def aclose(self) -> None:
+        if self._chatwoot is not None and self._chatwoot.http_client is not None:
+            await self._chatwoot.http_client.aclose()
+
+
+def default_tenant() -> Tenant:
+    """Tenant único configurado por variáveis de ambiente (comportamento anterior)"""
+    return Tenant(
+        account_id=str(os.getenv("CHATWOOT_ACCOUNT_ID", os.getenv("ACCOUNT_ID", "changeme"))),
+        hmac_secret=os.getenv("CHATWOOT_HMAC_SECRET", os.getenv("HMAC_SECRET", "changeme")),
+        chatwoot_base_url=os.getenv("CHATWOOT_BASE_URL", "https://app.chatwoot.com"),
+        chatwoot_token=os.getenv("CHATWOOT_ACCESS_TOKEN"),
+        name="default",
+        bot_config=bot_configuration_from_env(),
+    )
+
+
+def parse_tenants(data: Any, defaults: Tenant) -> Dict[str, Tenant]:
+    """Ler a lista de tenants do JSON; campos ausentes herdam do tenant padrão.
+
+    Formato: ``[{"account_id": 1, "hmac_secret": "...", "chatwoot_token": "...",
+    "weight": 2, "flow": "v2", "bot_config": {"escalation_keywords": [...]}}]``
+    """
+    items = data.get("tenants", []) if isinstance(data, dict) else data
+    tenants: Dict[str, Tenant] = {}
+    for item in items:
+        account_id = str(item["account_id"])
+        flow = item.get("flow", "v2")
+        if flow not in FLOWS:
+            raise ValueError(f"tenant {account_id}: fluxo desconhecido {flow!r}")
+        weight = float(item.get("weight", 1.0))
+        if weight <= 0:
+            raise ValueError(f"tenant {account_id}: weight deve ser > 0")
+        bot_config = defaults.bot_config.model_copy(update=item.get("bot_config") or {})
+        tenants[account_id] = Tenant(
+            account_id=account_id,
+            hmac_secret=item.get("hmac_secret", defaults.hmac_secret),
+            chatwoot_base_url=item.get("chatwoot_base_url", defaults.chatwoot_base_url),
+            chatwoot_token=item.get("chatwoot_token", defaults.chatwoot_token),
+            name=item.get("name", account_id),
+            flow=flow,
+            weight=weight,
+            bot_config=BotConfiguration.model_validate(bot_config.model_dump()),
+        )
+    return tenants
+
+
+class TenantRegistry:
+    """Mapeia account_id → Tenant, recarregando o arquivo JSON sem restart.
+
+    O arquivo (``TENANTS_FILE``) é verificado no máximo a cada
+    ``reload_interval`` segundos (um ``stat``); quando o mtime muda os
+    tenants são relidos. Clientes de tenants cujas credenciais não mudaram
+    são reaproveitados; os demais são fechados depois de ``retire_after``
+    segundos, para não cortar requisições em andamento. Contas desconhecidas
+    (ou sem arquivo) usam o tenant padrão das variáveis de ambiente. Um
+    arquivo inválido é ignorado e a configuração anterior continua valendo.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        default: Optional[Tenant] = None,
+        reload_interval: float = 5.0,
+        retire_after: float = 60.0,
+    ):
+        self.path = path
+        self.default = default or default_tenant()
+        self.reload_interval = reload_interval
+        self.retire_after = retire_after
+        self._tenants: Dict[str, Tenant] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._retired: List[Tenant] = []
+
+    def _maybe_reload(self) -> None:
+        if not self.path:
+            return
+        now = time.monotonic()
+        if self._checked_at and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if self._mtime is not None:
+                logger.warning(f"Arquivo de tenants indisponível, mantendo configuração atual: {e}")
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                tenants = parse_tenants(json.load(f), self.default)
+        except Exception as e:
+            logger.error(f"Erro ao carregar tenants de {self.path}: {str(e)}")
+            self._mtime = mtime  # não tenta de novo até o arquivo mudar
+            return
+        self._swap(tenants)
+        self._mtime = mtime
+        logger.info(f"Tenants carregados: {sorted(tenants)}")
+
+    def _swap(self, tenants: Dict[str, Tenant]) -> None:
+        for account_id, old in self._tenants.items():
+            new = tenants.get(account_id)
+            if new is not None and new.credentials == old.credentials:
+                new._chatwoot = old._chatwoot  # mantém o pool
+            elif old._chatwoot is not None:
+                self._retire(old)
+        self._tenants = tenants
+
+    def _retire(self, tenant: Tenant) -> None:
+        self._retired.append(tenant)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # fechado no aclose()
+        loop.call_later(self.retire_after, lambda: loop.create_task(self._close_retired(tenant)))
+
+    async def _close_retired(self, tenant: Tenant) -> None:
+        if tenant in self._retired:
+            self._retired.remove(tenant)
+            await tenant.aclose()
+
+    def get(self, account_id: Any) -> Tenant:
+        self._maybe_reload()
+        return self._tenants.get(str(account_id), self.default)
+
+    def all(self) -> List[Tenant]:
+        self._maybe_reload()
+        return list(self._tenants.values()) or [self.default]
+
+    async def aclose(self) -> None:
+        for tenant in [*self._tenants.values(), *self._retired, self.default]:
+            await tenant.aclose()
+        self._retired.clear()
+
+
+class FairScheduler:
+    """Fila justa ponderada entre tenants (start-time fair queuing).
+
+    No máximo ``concurrency`` turnos rodam ao mesmo tempo. Quando há fila,
+    cada pedido recebe a etiqueta ``max(tempo_virtual, última etiqueta do
+    tenant) + 1/weight`` e as vagas saem na ordem das etiquetas: um tenant
+    com rajada só disputa sua fatia (proporcional ao peso) e não atrasa os
+    demais além disso.
+    """
+
+    def __init__(self, concurrency: int = 32):
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self._virtual_time = 0.0
+        self._last_tag: Dict[str, float] = {}
+        self._queue: List[Tuple[float, int, "asyncio.Future[None]"]] = []
+        self._seq = itertools.count()
+
+    def _tag(self, tenant_id: str, weight: float) -> float:
+        tag = max(self._virtual_time, self._last_tag.get(tenant_id, 0.0)) + 1.0 / weight
+        self._last_tag[tenant_id] = tag
+        return tag
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        while self._queue and self.in_flight < self.concurrency:
+            tag, _, fut = heapq.heappop(self._queue)
+            if fut.done():
+                continue
+            self._virtual_time = tag
+            self.in_flight += 1
+            fut.set_result(None)
+        if not self._queue and not self.in_flight:
+            # Ocioso: zera o relógio para as etiquetas não crescerem sem limite
+            self._virtual_time = 0.0
+            self._last_tag.clear()
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str, weight: float = 1.0) -> AsyncIterator[None]:
+        if self.in_flight < self.concurrency and not self._queue:
+            self.in_flight += 1
+        else:
+            fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (self._tag(tenant_id, weight), next(self._seq), fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+
+# Instâncias globais
+tenant_registry = TenantRegistry(settings.TENANTS_FILE or None, reload_interval=settings.TENANTS_RELOAD_SECONDS)
+tenant_scheduler = FairScheduler(settings.TENANT_SCHEDULER_CONCURRENCY)
@@ -0,0 +1,344 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id              INTEGER PRIMARY KEY,
+    account_id      TEXT    NOT NULL,
+    conversation_id INTEGER NOT NULL,
+    role            TEXT    NOT NULL,
+    content         TEXT    NOT NULL,
+    created_at      REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_conversation_idx ON messages (account_id, conversation_id, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    account_id      TEXT    NOT NULL,
+    conversation_id INTEGER NOT NULL,
+    summary         TEXT    NOT NULL,
+    qualification   TEXT,
+    last_message_id INTEGER NOT NULL,
+    qualified_id    INTEGER NOT NULL,
+    updated_at      REAL    NOT NULL,
+    PRIMARY KEY (account_id, conversation_id)
+);
+"""
+
+# Mantém só as últimas N mensagens de cada conversa
+_TRIM = """
+DELETE FROM messages WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (PARTITION BY account_id, conversation_id ORDER BY id DESC) AS rn
+        FROM messages
+    ) WHERE rn > ?
+)
+"""
+
+_TAIL = """
+SELECT role, content FROM messages
+WHERE account_id = ? AND conversation_id = ?
+ORDER BY id DESC LIMIT ?
+"""
+
+_SINCE = """
+SELECT id, role, content FROM messages
+WHERE account_id = ? AND conversation_id = ? AND id > ?
+ORDER BY id ASC LIMIT ?
+"""
+
+_SUMMARY = """
+SELECT summary, qualification, last_message_id, qualified_id FROM summaries
+WHERE account_id = ? AND conversation_id = ?
+"""
+
+_UPSERT_SUMMARY = """
+INSERT INTO summaries (account_id, conversation_id, summary, qualification, last_message_id, qualified_id, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (account_id, conversation_id) DO UPDATE SET
+    summary = excluded.summary,
+    qualification = excluded.qualification,
+    last_message_id = excluded.last_message_id,
+    qualified_id = excluded.qualified_id,
+    updated_at = excluded.updated_at
+"""
+
+
+@dataclass
+class ConversationSummary:
+    """Resumo da conversa até ``last_message_id`` e a qualificação feita até ``qualified_id``"""
+
+    summary: str = ""
+    qualification: Optional[Dict[str, Any]] = None
+    last_message_id: int = 0
+    qualified_id: int = 0
+
+
+@dataclass
+class _SummaryWrite:
+    account_id: str
+    conversation_id: int
+    value: ConversationSummary
+    # Resolvido pela thread escritora depois do COMMIT (ou com o erro, depois do ROLLBACK)
+    done: "Future[None]" = field(default_factory=Future)
+
+
+_COMPACT = object()
+_STOP = object()
+
+
+class TranscriptStore:
+    """Log local (SQLite em WAL) das mensagens de cada conversa.
+
+    ``append`` não bloqueia: as mensagens vão para uma fila e uma thread
+    escritora grava em lote, numa transação por lote. As leituras usam uma
+    conexão por thread e não esperam o escritor (WAL). ``tail`` devolve as
+    últimas mensagens de uma conversa no formato de ``conversation_history``
+    (``[{"role": ..., "content": ...}]``) pelo índice
+    ``(account_id, conversation_id, id)``.
+
+    A compactação roda na thread escritora a cada ``compact_interval``
+    segundos: remove mensagens mais antigas que ``retention_days``, limita
+    cada conversa a ``max_messages`` e devolve o espaço livre ao disco.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        retention_days: float = 90,
+        max_messages: int = 200,
+        compact_interval: float = 3600.0,
+        batch_size: int = 500,
+    ):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_messages = max_messages
+        self.compact_interval = compact_interval
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._local = threading.local()
+        self._writer: Optional[threading.Thread] = None
+        self._wconn: Optional[sqlite3.Connection] = None
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_schema(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            # Precisa vir antes da criação das tabelas para valer
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    # Escrita
+
+    def append(self, account_id: Any, conversation_id: int, role: str, content: str) -> None:
+        """Enfileira uma mensagem (``role`` = ``user`` ou ``assistant``)"""
+        if content:
+            self._queue.put((str(account_id), int(conversation_id), role, content, time.time()))
+
+    async def save_summary(self, account_id: Any, conversation_id: int, value: ConversationSummary) -> None:
+        """Grava o resumo/qualificação da conversa e espera só esta gravação (a próxima leitura já vê o cursor novo).
+
+        Levanta a exceção da transação quando a gravação falha.
+        """
+        write = _SummaryWrite(str(account_id), int(conversation_id), value)
+        self._queue.put(write)
+        if self._writer is None:
+            await asyncio.to_thread(self.flush)
+        await asyncio.wrap_future(write.done)
+
+    def start(self) -> None:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+            self._writer.start()
+
+    def flush(self) -> None:
+        """Bloqueia até as mensagens enfileiradas estarem gravadas"""
+        if self._writer is None:
+            items = self._drain()
+            self._write(items)
+            for _ in items:
+                self._queue.task_done()
+        else:
+            self._queue.join()
+
+    def compact(self) -> None:
+        """Pede uma compactação fora de hora (executada pela thread escritora)"""
+        if self._writer is None:
+            self._compact(self._write_conn())
+        else:
+            self._queue.put(_COMPACT)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+        else:
+            self.flush()
+            if self._wconn is not None:
+                self._wconn.close()
+                self._wconn = None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _write_conn(self) -> sqlite3.Connection:
+        if self._wconn is None:
+            self._wconn = self._connect()
+        return self._wconn
+
+    def _drain(self, first: Any = None) -> List[Any]:
+        items = [] if first is None else [first]
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    @staticmethod
+    def _summary_row(item: _SummaryWrite) -> Tuple[Any, ...]:
+        qualification = item.value.qualification
+        return (
+            item.account_id,
+            item.conversation_id,
+            item.value.summary,
+            json.dumps(qualification, ensure_ascii=False) if qualification is not None else None,
+            item.value.last_message_id,
+            item.value.qualified_id,
+            time.time(),
+        )
+
+    def _write(self, items: List[Any]) -> None:
+        rows = [item for item in items if isinstance(item, tuple)]
+        writes = [item for item in items if isinstance(item, _SummaryWrite)]
+        if not rows and not writes:
+            return
+        conn = self._write_conn()
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO messages (account_id, conversation_id, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany(_UPSERT_SUMMARY, [self._summary_row(item) for item in writes])
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            logger.error(f"Erro ao gravar {len(rows)} mensagens e {len(writes)} resumos no transcript: {str(e)}")
+            for item in writes:
+                item.done.set_exception(e)
+            return
+        for item in writes:
+            item.done.set_result(None)
+
+    def _compact(self, conn: sqlite3.Connection) -> None:
+        started = time.perf_counter()
+        try:
+            cutoff = time.time() - self.retention_days * 86400
+            expired = conn.execute("DELETE FROM messages WHERE created_at < ?", (cutoff,)).rowcount
+            trimmed = conn.execute(_TRIM, (self.max_messages,)).rowcount
+            conn.execute("DELETE FROM summaries WHERE updated_at < ?", (cutoff,))
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            logger.info(
+                f"Transcript compactado: {expired} expiradas, {trimmed} excedentes "
+                f"em {(time.perf_counter() - started) * 1000:.0f}ms"
+            )
+        except Exception as e:
+            logger.error(f"Erro ao compactar transcript: {str(e)}")
+
+    def _run(self) -> None:
+        conn = self._write_conn()
+        next_compaction = time.monotonic() + self.compact_interval
+        while True:
+            timeout = max(0.0, next_compaction - time.monotonic())
+            try:
+                items = self._drain(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                items = []
+            try:
+                self._write(items)
+                if _COMPACT in items or time.monotonic() >= next_compaction:
+                    self._compact(conn)
+                    next_compaction = time.monotonic() + self.compact_interval
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if _STOP in items:
+                conn.close()
+                self._wconn = None
+                return
+
+    # Leitura
+
+    def tail_sync(self, account_id: Any, conversation_id: int, limit: int = 20) -> List[Dict[str, str]]:
+        rows = self._reader().execute(_TAIL, (str(account_id), int(conversation_id), limit)).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    async def tail(self, account_id: Any, conversation_id: int, limit: int = 20) -> List[Dict[str, str]]:
+        """Últimas ``limit`` mensagens da conversa, da mais antiga para a mais nova"""
+        return await asyncio.to_thread(self.tail_sync, account_id, conversation_id, limit)
+
+    def since_sync(self, account_id: Any, conversation_id: int, after_id: int, limit: int = 50) -> List[Tuple[int, str, str]]:
+        return self._reader().execute(_SINCE, (str(account_id), int(conversation_id), after_id, limit)).fetchall()
+
+    async def since(self, account_id: Any, conversation_id: int, after_id: int, limit: int = 50) -> List[Tuple[int, str, str]]:
+        """Mensagens ``(id, role, content)`` posteriores a ``after_id``, as ``limit`` mais antigas primeiro.
+
+        O cursor avança por todas, então nenhuma mensagem fica para trás.
+        """
+        return await asyncio.to_thread(self.since_sync, account_id, conversation_id, after_id, limit)
+
+    def summary_sync(self, account_id: Any, conversation_id: int) -> Optional[ConversationSummary]:
+        row = self._reader().execute(_SUMMARY, (str(account_id), int(conversation_id))).fetchone()
+        if row is None:
+            return None
+        summary, qualification, last_message_id, qualified_id = row
+        return ConversationSummary(
+            summary, json.loads(qualification) if qualification else None, last_message_id, qualified_id
+        )
+
+    async def summary(self, account_id: Any, conversation_id: int) -> Optional[ConversationSummary]:
+        return await asyncio.to_thread(self.summary_sync, account_id, conversation_id)
+
+
+# Instância global; None quando o transcript local está desligado
+transcript_store: Optional[TranscriptStore] = None
+if settings.TRANSCRIPTS_ENABLED:
+    transcript_store = TranscriptStore(
+        settings.TRANSCRIPTS_PATH,
+        retention_days=settings.TRANSCRIPTS_RETENTION_DAYS,
+        max_messages=settings.TRANSCRIPTS_MAX_MESSAGES,
+        compact_interval=settings.TRANSCRIPTS_COMPACT_INTERVAL,
+    )
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+# Tests that need a real Redis use a dedicated database and are skipped when
+# no server is reachable (e.g. CI without a redis service).
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+@pytest.fixture
+def redis_url():
+    import redis
+
+    client = redis.from_url(TEST_REDIS_URL)
+    try:
+        client.ping()
+    except Exception:
+        pytest.skip(f"Redis not available at {TEST_REDIS_URL}")
+    client.flushdb()
+    yield TEST_REDIS_URL
+    client.flushdb()
+    client.close()
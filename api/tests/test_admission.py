@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import PRIORITY_HANDOFF, PRIORITY_NORMAL, AdmissionController, GradientLimit, Shed
+
+
+def test_gradient_limit_grows_when_healthy_and_shrinks_when_latency_rises():
+    limit = GradientLimit(initial=10, min_limit=2, max_limit=100)
+    for _ in range(50):
+        limit.update(0.05, in_flight=int(limit.limit))
+    grown = limit.limit
+    assert grown > 10
+
+    for _ in range(50):
+        limit.update(0.5, in_flight=int(limit.limit))
+    assert limit.limit < grown / 2
+    assert limit.limit >= 2
+
+
+def test_gradient_limit_ignores_samples_when_app_limited():
+    limit = GradientLimit(initial=40)
+    for _ in range(20):
+        limit.update(0.05, in_flight=1)
+    assert limit.limit == 40
+
+
+def _controller(limit=2, queue_timeout=0.2, max_queue=10):
+    return AdmissionController(
+        "test",
+        limit=GradientLimit(initial=limit, min_limit=limit, max_limit=limit),
+        queue_timeout=queue_timeout,
+        max_queue=max_queue,
+    )
+
+
+@pytest.mark.asyncio
+async def test_caps_concurrency_queues_then_sheds_with_retry_after():
+    controller = _controller(limit=2, queue_timeout=0.1)
+    release = asyncio.Event()
+    peak = 0
+
+    async def turn():
+        nonlocal peak
+        async with controller.admit():
+            peak = max(peak, controller.in_flight)
+            await release.wait()
+
+    holders = [asyncio.create_task(turn()) for _ in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(Shed) as shed:
+        async with controller.admit():
+            pass
+    assert shed.value.retry_after >= 1
+
+    queued = asyncio.create_task(turn())
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(*holders, queued)
+    assert peak == 2
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_handoff_jumps_the_queue_and_displaces_normal_turns():
+    controller = _controller(limit=1, queue_timeout=1.0, max_queue=2)
+    order = []
+    gate = asyncio.Event()
+
+    async def turn(label, priority):
+        try:
+            async with controller.admit(priority):
+                order.append(label)
+                await gate.wait()
+        except Shed:
+            order.append(f"shed:{label}")
+
+    tasks = [asyncio.create_task(turn("first", PRIORITY_NORMAL))]
+    await asyncio.sleep(0)
+    for label in ("n1", "n2"):
+        tasks.append(asyncio.create_task(turn(label, PRIORITY_NORMAL)))
+        await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(turn("handoff", PRIORITY_HANDOFF)))
+    await asyncio.sleep(0.01)
+    gate.set()
+    await asyncio.gather(*tasks)
+
+    assert order == ["first", "shed:n2", "handoff", "n1"]
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import time
+
+import pytest
+import redis.asyncio as aioredis
+
+from app.workers.async_worker import AsyncWorker, QueueKeys, enqueue
+from app.workers.tasks import task
+
+calls = {}
+
+
+@task("test.flaky")
+async def flaky(payload, ctx):
+    calls[payload["i"]] = calls.get(payload["i"], 0) + 1
+    await asyncio.sleep(0.01)
+    if payload.get("fail_times", 0) >= calls[payload["i"]]:
+        raise RuntimeError("boom")
+
+
+async def _run_until(worker, predicate, timeout=10.0):
+    runner = asyncio.create_task(worker.run(install_signal_handlers=False))
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+    worker.stop()
+    await runner
+
+
+def test_backoff_is_bounded():
+    worker = AsyncWorker.__new__(AsyncWorker)
+    worker.retry_base_delay, worker.retry_max_delay = 1.0, 10.0
+    assert all(0 <= worker.backoff(n) <= 10.0 for n in range(1, 20))
+
+
+@pytest.mark.asyncio
+async def test_jobs_retry_then_ack(redis_url):
+    redis_client = aioredis.from_url(redis_url)
+    calls.clear()
+    for i in range(20):
+        await enqueue(redis_client, "test.flaky", {"i": i, "fail_times": 1 if i % 5 == 0 else 0})
+    worker = AsyncWorker(redis_client, concurrency=10, retry_base_delay=0.01)
+    await _run_until(worker, lambda: worker.processed == 20)
+
+    keys = QueueKeys("events")
+    assert worker.processed == 20 and worker.failed == 4
+    assert await redis_client.llen(keys.processing) == 0
+    assert await redis_client.zcard(keys.leases) == 0
+    assert await redis_client.zcard(keys.delayed) == 0
+
+
+@pytest.mark.asyncio
+async def test_exhausted_jobs_go_to_dead_letter(redis_url):
+    redis_client = aioredis.from_url(redis_url)
+    calls.clear()
+    await enqueue(redis_client, "test.flaky", {"i": 1, "fail_times": 99})
+    worker = AsyncWorker(redis_client, max_attempts=2, retry_base_delay=0.01)
+    keys = QueueKeys("events")
+    await _run_until(worker, lambda: worker.failed == 2)
+    dead = [json.loads(j) for j in await redis_client.lrange(keys.dead, 0, -1)]
+    assert len(dead) == 1 and dead[0]["attempts"] == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_redelivered(redis_url):
+    redis_client = aioredis.from_url(redis_url)
+    calls.clear()
+    keys = QueueKeys("events")
+    raw = json.dumps({"id": "orphan", "task": "test.flaky", "payload": {"i": 7}, "attempts": 0})
+    await redis_client.lpush(keys.processing, raw)
+    await redis_client.zadd(keys.leases, {raw: time.time() - 1})
+    worker = AsyncWorker(redis_client)
+    await _run_until(worker, lambda: worker.processed == 1)
+    assert calls == {7: 1}
@@ -0,0 +1,76 @@
+import json
+
+import httpx
+import pytest
+
+from api.services.backfill import JsonlSink, SqliteSink, run_backfill
+from api.services.chatwoot_client import ChatwootClient
+
+
+def _chatwoot(total, fail_once=()):
+    """Listagem fake do Chatwoot; páginas em ``fail_once`` respondem 429 na primeira vez"""
+    requested = []
+    failed = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        requested.append(page)
+        if page in fail_once and page not in failed:
+            failed.add(page)
+            return httpx.Response(429, headers={"Retry-After": "0.01"})
+        ids = range((page - 1) * 25 + 1, min(page * 25, total) + 1)
+        payload = [{"id": i, "status": "open", "custom_attributes": {"nome": f"Lead {i}"}} for i in ids]
+        return httpx.Response(200, json={"data": {"meta": {"all_count": total}, "payload": payload}})
+
+    client = ChatwootClient(
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        base_url="http://chatwoot", access_token="t", account_id="1",
+    )
+    return client, requested
+
+
+@pytest.mark.asyncio
+async def test_backfill_pages_concurrently_into_jsonl_with_retries(tmp_path):
+    client, requested = _chatwoot(130, fail_once={3})
+    sink = JsonlSink(str(tmp_path / "conv.jsonl"))
+    report = await client.backfill_conversations(sink, concurrency=4, rate=1000, checkpoint_path=str(tmp_path / "ckpt.json"))
+    await sink.close()
+
+    rows = [json.loads(line) for line in (tmp_path / "conv.jsonl").read_text().splitlines()]
+    assert sorted(r["conversation_id"] for r in rows) == list(range(1, 131))
+    assert rows[0]["custom_attributes"]["nome"].startswith("Lead")
+    assert report.pages == 6 and report.conversations == 130 and report.retries == 1
+    assert requested.count(3) == 2
+    assert 7 not in requested  # última página incompleta: nada além do total
+    assert json.loads((tmp_path / "ckpt.json").read_text())["done"] == [1, 2, 3, 4, 5, 6]
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_checkpoint_after_interruption(tmp_path):
+    client, requested = _chatwoot(240)
+    sink = SqliteSink(str(tmp_path / "conv.db"))
+    checkpoint = str(tmp_path / "ckpt.json")
+
+    class Interrupted(Exception):
+        pass
+
+    original_write = sink.write
+
+    async def failing_write(account_id, conversations):
+        if conversations[0]["id"] > 100:
+            raise Interrupted()
+        return await original_write(account_id, conversations)
+
+    sink.write = failing_write
+    with pytest.raises(Interrupted):
+        await run_backfill(client, sink, "1", concurrency=1, rate=1000, checkpoint_path=checkpoint)
+    assert json.loads(open(checkpoint).read())["done"] == [1, 2, 3, 4]
+
+    requested.clear()
+    sink.write = original_write
+    report = await run_backfill(client, sink, "1", concurrency=3, rate=1000, checkpoint_path=checkpoint)
+    assert sorted(requested) == [5, 6, 7, 8, 9, 10]
+    assert report.resumed_pages == 4
+    count = sink._conn.execute("SELECT count(*), count(DISTINCT conversation_id) FROM conversations").fetchone()
+    assert count == (240, 240)
+    await sink.close()
@@ -205,4 +205,87 @@ def test_load_configuration(bot):
     config = bot._load_configuration()
     assert isinstance(config.welcome_message, str)
     assert isinstance(config.escalation_keywords, list)
-    assert isinstance(config.auto_response_enabled, bool)
\ No newline at end of file
+    assert isinstance(config.auto_response_enabled, bool)
+
+@pytest.mark.asyncio
+async def test_qualify_conversation_incremental_sends_summary_and_new_turns(bot, tmp_path, monkeypatch):
+    from app.core.settings import settings
+    from ..services.transcripts import TranscriptStore
+
+    monkeypatch.setattr(settings, "QUALIFY_INCREMENTAL", True)
+    monkeypatch.setattr(settings, "QUALIFY_SUMMARY_THRESHOLD_TOKENS", 15)
+    bot.transcripts = TranscriptStore(str(tmp_path / "t.db"))
+    calls = []
+
+    async def qualify_lead_incremental(summary, previous, new_messages, refresh_summary=False):
+        calls.append((summary, previous, [m["content"] for m in new_messages], refresh_summary))
+        result = {"qualification_score": 60 + len(calls), "need_level": "high"}
+        if refresh_summary:
+            result["conversation_summary"] = f"resumo {len(calls)}"
+        return result
+
+    bot.openai_client = Mock(qualify_lead_incremental=qualify_lead_incremental)
+
+    bot.transcripts.append(1, 7, "user", "Oi")
+    bot.transcripts.flush()
+    first = await bot.qualify_conversation(1, 7)
+    assert first.qualification_score == 61
+    assert calls[-1] == ("", None, ["Oi"], False)
+
+    bot.transcripts.append(1, 7, "user", "Temos 50 vendedores e precisamos organizar o funil ainda este mês")
+    bot.transcripts.flush()
+    await bot.qualify_conversation(1, 7)
+    # Limite de tokens atingido: pede resumo novo incluindo as mensagens pendentes
+    assert calls[-1][2] == ["Oi", "Temos 50 vendedores e precisamos organizar o funil ainda este mês"]
+    assert calls[-1][1]["qualification_score"] == 61 and calls[-1][3] is True
+
+    bot.transcripts.append(1, 7, "assistant", "Perfeito!")
+    bot.transcripts.flush()
+    await bot.qualify_conversation(1, 7)
+    assert calls[-1][:3] == ("resumo 2", calls[-1][1], ["Perfeito!"])
+
+    # Sem mensagens novas: devolve a última qualificação sem chamar o modelo
+    bot.transcripts.flush()
+    cached = await bot.qualify_conversation(1, 7)
+    assert len(calls) == 3 and cached.qualification_score == 63
+    bot.transcripts.close()
+
+@pytest.mark.asyncio
+async def test_qualify_incremental_walks_backlog_larger_than_max_new_messages(bot, tmp_path, monkeypatch):
+    from app.core.settings import settings
+    from ..services.transcripts import TranscriptStore
+
+    monkeypatch.setattr(settings, "QUALIFY_INCREMENTAL", True)
+    monkeypatch.setattr(settings, "QUALIFY_MAX_NEW_MESSAGES", 3)
+    monkeypatch.setattr(settings, "QUALIFY_SUMMARY_THRESHOLD_TOKENS", 10000)
+    bot.transcripts = TranscriptStore(str(tmp_path / "t.db"))
+    calls = []
+
+    async def qualify_lead_incremental(summary, previous, new_messages, refresh_summary=False):
+        calls.append(([m["content"] for m in new_messages], refresh_summary))
+        result = {"qualification_score": 50 + len(calls)}
+        if refresh_summary:
+            result["conversation_summary"] = f"resumo {len(calls)}"
+        return result
+
+    bot.openai_client = Mock(qualify_lead_incremental=qualify_lead_incremental)
+    for i in range(1, 8):
+        bot.transcripts.append(1, 9, "user", f"m{i}")
+    bot.transcripts.flush()
+
+    # Uma chamada só já alcança a última mensagem, resumindo em lotes das mais antigas primeiro
+    result = await bot.qualify_conversation(1, 9)
+    assert result.qualification_score == 53
+    assert calls == [(["m1", "m2", "m3"], True), (["m4", "m5", "m6"], True), (["m7"], False)]
+    summary = await bot.transcripts.summary(1, 9)
+    assert summary.summary == "resumo 2" and summary.last_message_id == 6 and summary.qualified_id == 7
+
+    # m7 já foi qualificada mas não resumida: volta no primeiro lote do próximo backlog
+    for i in range(8, 14):
+        bot.transcripts.append(1, 9, "user", f"m{i}")
+    bot.transcripts.flush()
+    result = await bot.qualify_conversation(1, 9)
+    assert calls[3:] == [(["m7", "m8", "m9"], True), (["m10", "m11", "m12"], True), (["m13"], False)]
+    assert result.qualification_score == 56
+    assert await bot.qualify_conversation(1, 9) == result and len(calls) == 6
+    bot.transcripts.close()
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from api.services.debounce import MessageDebouncer, combine_messages
+
+
+async def echo(texts):
+    return list(texts)
+
+
+@pytest.mark.asyncio
+async def test_burst_is_merged_into_the_first_message_turn():
+    debouncer = MessageDebouncer(window=0.05, max_wait=1.0)
+
+    leader = asyncio.create_task(debouncer.run("c1", "João", echo))
+    await asyncio.sleep(0.02)
+    follower = asyncio.create_task(debouncer.run("c1", "Silva", echo))
+    # Outra conversa tem sua própria rajada
+    assert await debouncer.run("c2", "oi", echo) == ["oi"]
+
+    assert await leader == ["João", "Silva"]
+    assert await follower is None
+    assert combine_messages(["João", "Silva"]) == "João Silva"
+    # Depois do turno, a próxima mensagem abre uma nova rajada
+    assert await debouncer.run("c1", "oi", echo) == ["oi"]
+
+
+@pytest.mark.asyncio
+async def test_followers_wait_for_the_leader_and_share_its_failure():
+    debouncer = MessageDebouncer(window=0.05, max_wait=1.0)
+    started = asyncio.Event()
+
+    async def shed(texts):
+        started.set()
+        await asyncio.sleep(0.02)
+        raise RuntimeError("503")
+
+    leader = asyncio.create_task(debouncer.run("c", "João", shed))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(debouncer.run("c", "Silva", shed))
+    await started.wait()
+    assert not follower.done()  # não responde antes do turno combinado
+
+    for task in (leader, follower):
+        with pytest.raises(RuntimeError, match="503"):
+            await task
+
+    # Seguidora cancelada (cliente desconectou) não derruba o turno da líder
+    leader = asyncio.create_task(debouncer.run("d", "a", echo))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(debouncer.run("d", "b", echo))
+    await asyncio.sleep(0)
+    follower.cancel()
+    assert await leader == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_max_wait_and_max_messages_bound_the_latency():
+    debouncer = MessageDebouncer(window=0.05, max_wait=0.15, max_messages=50)
+    start = time.monotonic()
+    leader = asyncio.create_task(debouncer.run("c", "m0", echo))
+    followers = []
+    for i in range(1, 10):
+        await asyncio.sleep(0.03)
+        if leader.done():
+            break
+        followers.append(asyncio.create_task(debouncer.run("c", f"m{i}", echo)))
+    texts = await leader
+    assert time.monotonic() - start < 0.3
+    assert 3 <= len(texts) < 10
+    assert await asyncio.gather(*followers) == [None] * len(followers)
+
+    capped = MessageDebouncer(window=10.0, max_wait=10.0, max_messages=3)
+    leader = asyncio.create_task(capped.run("c", "a", echo))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(capped.run("c", t, echo)) for t in ("b", "c")]
+    assert await asyncio.wait_for(leader, 1.0) == ["a", "b", "c"]
+    await asyncio.gather(*followers)
+
+
+@pytest.mark.asyncio
+async def test_disabled_debouncer_passes_messages_through():
+    assert await MessageDebouncer(window=0).run("c", "oi", echo) == ["oi"]
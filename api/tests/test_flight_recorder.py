@@ -0,0 +1,38 @@
+from app.core.flight_recorder import FlightRecorder, RequestRecord
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _rec(ms):
+    record = RequestRecord("POST", "/x")
+    record.duration_ms = ms
+    return record
+
+
+def test_keeps_n_slowest_per_route():
+    recorder = FlightRecorder(size=3, clock=FakeClock())
+    for ms in [5, 50, 1, 30, 40, 2]:
+        recorder.record("POST /x", _rec(ms))
+    recorder.record("GET /y", _rec(7))
+    snap = recorder.snapshot()
+    assert [r["duration_ms"] for r in snap["POST /x"]] == [50, 40, 30]
+    assert [r["duration_ms"] for r in recorder.snapshot("GET /y")["GET /y"]] == [7]
+
+
+def test_window_rotation_ages_out_old_entries():
+    clock = FakeClock()
+    recorder = FlightRecorder(size=2, window_seconds=10, clock=clock)
+    recorder.record("r", _rec(100))
+    clock.now = 11  # previous window still visible
+    recorder.record("r", _rec(1))
+    assert [r["duration_ms"] for r in recorder.snapshot()["r"]] == [100, 1]
+    clock.now = 22  # first window gone
+    assert [r["duration_ms"] for r in recorder.snapshot()["r"]] == [1]
+    clock.now = 100
+    assert recorder.snapshot() == {}
@@ -0,0 +1,158 @@
+import asyncio
+import random
+
+import pytest
+import redis.asyncio as aioredis
+
+from api.services.follow_up_scheduler import (
+    FollowUpJob,
+    FollowUpScheduler,
+    RedisFollowUpStore,
+    SqliteFollowUpStore,
+    TimingWheel,
+)
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_timing_wheel_fires_each_job_on_its_tick_across_levels():
+    rng = random.Random(7)
+    start = 1_000_000.0
+    # 4 posições x 3 níveis: horizonte de 64 ticks, o resto passa pelo overflow
+    wheel = TimingWheel(tick=1.0, slots=4, levels=3, now=start)
+    due = {}
+    for i in range(500):
+        job = FollowUpJob("1", i, start + rng.uniform(0, 300), "t")
+        wheel.add(job)
+        due[i] = job.due_at
+    for i in range(0, 500, 5):
+        assert wheel.remove(("1", i)) is not None
+        del due[i]
+    assert len(wheel) == 400
+
+    now = start
+    fired = {}
+    while now < start + 301:
+        now += rng.uniform(0.2, 3.0)
+        for job in wheel.advance(now):
+            fired[job.conversation_id] = now
+    assert fired.keys() == due.keys()
+    for i, at in fired.items():
+        # nunca antes do vencimento, e no primeiro avanço depois do tick dele
+        assert due[i] <= at < due[i] + 1 + 3.0
+    assert len(wheel) == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_persists_cancels_and_fires_once_across_workers(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "follow_ups.db")
+    sent = []
+    running = peak = 0
+
+    async def handler(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        sent.append(job.conversation_id)
+        return True
+
+    first = FollowUpScheduler(handler, SqliteFollowUpStore(path), concurrency=3, clock=clock)
+    for conversation_id in range(1, 11):
+        first.schedule(1, conversation_id, 3600, "reengajamento", {"nome": f"L{conversation_id}"})
+    first.schedule(1, 5, 7200, "reengajamento")  # reagendar substitui
+    assert first.cancel(1, 2)
+    await first.flush()
+    assert len(first) == 9
+
+    # Segundo worker com o mesmo store: carrega os mesmos pendentes e cancela um deles
+    second = FollowUpScheduler(handler, SqliteFollowUpStore(path), concurrency=3, clock=clock)
+    assert await second.load() == 9
+    assert second.cancel(1, 3)
+    await second.flush()
+
+    clock.now += 3600
+    assert await first.run_due() == 7  # 3 cancelada em outro worker, 5 reagendada
+    assert await second.run_due() == 0  # tudo já reivindicado pelo primeiro
+    assert sorted(sent) == [1, 4, 6, 7, 8, 9, 10]
+    assert peak == 3
+
+    clock.now += 3600
+    assert await second.run_due() == 1 and sent[-1] == 5
+    assert await first.run_due() == 0
+    await first.stop()
+    await second.stop()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_retries_failures_and_drops_follow_up_after_reply(tmp_path):
+    clock = Clock()
+    calls = []
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def handler(job):
+        calls.append((job.conversation_id, job.attempt))
+        if job.conversation_id == 1:
+            raise RuntimeError("openai fora")
+        started.set()
+        await release.wait()
+        return not job.cancelled
+
+    scheduler = FollowUpScheduler(
+        handler, SqliteFollowUpStore(str(tmp_path / "f.db")), max_attempts=2, retry_delay=60, clock=clock
+    )
+    scheduler.schedule(1, 1, 10, "t")
+    scheduler.schedule(1, 2, 10, "t")
+    clock.now += 10
+
+    firing = asyncio.create_task(scheduler.run_due())
+    await started.wait()
+    assert scheduler.cancel(1, 2)  # usuário respondeu durante a geração
+    release.set()
+    assert await firing == 0
+
+    retry = scheduler.pending(1, 1)
+    assert retry is not None and retry.attempt == 1 and retry.due_at == clock.now + 60
+    clock.now += 60
+    assert await scheduler.run_due() == 0
+    assert calls == [(1, 0), (2, 0), (1, 1)]
+    assert len(scheduler) == 0  # max_attempts esgotado
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_redis_store_claims_only_the_current_job(redis_url):
+    store = RedisFollowUpStore(aioredis.from_url(redis_url))
+    old, current = FollowUpJob("1", 1, 10.0, "t"), FollowUpJob("1", 1, 20.0, "t")
+    await store.apply([old, FollowUpJob("1", 2, 10.0, "t")], [])
+    await store.apply([current], [("1", 2)])
+    loaded = [job async for batch in store.load() for job in batch]
+    assert [(j.conversation_id, j.id) for j in loaded] == [(1, current.id)]
+    assert not await store.claim(old)
+    assert await store.claim(current)
+    assert not await store.claim(current)
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_opens_its_connection_on_first_use(tmp_path):
+    path = tmp_path / "data" / "follow_ups.db"
+    store = SqliteFollowUpStore(str(path))
+    # Nada aberto no import/construção (o master do gunicorn não pode herdar a conexão)
+    assert store._conn is None and not path.exists()
+
+    assert [job async for batch in store.load() for job in batch] == []
+    assert path.exists()
+    job = FollowUpJob("1", 1, 10.0, "t")
+    await store.apply([job], [])
+    assert await store.claim(job)
+    await store.close()
+    assert store._conn is None
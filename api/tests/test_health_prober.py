@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+
+from api.routers import health
+from api.services.health_prober import HealthProber
+from app.core.settings import Settings
+
+
+def fake_prober(monkeypatch, outcomes):
+    """HealthProber com checagens falsas: cada nome devolve/levanta o que estiver em ``outcomes``"""
+    prober = HealthProber(timeout=0.2)
+    calls = {name: 0 for name in outcomes}
+
+    def make_check(name):
+        async def check():
+            calls[name] += 1
+            outcome = outcomes[name]
+            if isinstance(outcome, Exception):
+                raise outcome
+            if outcome == "slow":
+                await asyncio.sleep(1)
+            return outcome
+        return check
+
+    monkeypatch.setattr(prober, "_checks", lambda: {name: make_check(name) for name in outcomes})
+    monkeypatch.setattr(health, "health_prober", prober)
+    return prober, calls
+
+
+@pytest.mark.asyncio
+async def test_refresh_runs_every_probe_and_records_status(monkeypatch):
+    prober, calls = fake_prober(
+        monkeypatch,
+        {"chatwoot": None, "n8n": ConnectionError("recusada"), "redis": "slow", "extra": "not_configured"},
+    )
+    results = await prober.refresh()
+
+    assert calls == {"chatwoot": 1, "n8n": 1, "redis": 1, "extra": 1}
+    assert results["chatwoot"].status == "connected" and results["chatwoot"].error is None
+    assert results["n8n"].status == "error" and results["n8n"].error == "ConnectionError: recusada"
+    assert results["redis"].status == "error" and results["redis"].error.startswith("TimeoutError")
+    assert results["extra"].status == "not_configured"
+    assert REGISTRY.get_sample_value("dependency_up", {"dependency": "chatwoot"}) == 1
+    assert REGISTRY.get_sample_value("dependency_up", {"dependency": "n8n"}) == 0
+    assert REGISTRY.get_sample_value("dependency_up", {"dependency": "extra"}) is None
+    assert results["chatwoot"].to_dict()["age_s"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_readiness_answers_from_cache_and_rejects_stale_results(monkeypatch):
+    outcomes = {"chatwoot": None, "n8n": None, "redis": ConnectionError("x")}
+    prober, calls = fake_prober(monkeypatch, outcomes)
+
+    # Cache vazio: checa uma vez na hora
+    body = await health.readiness_check()
+    assert body["status"] == "ready" and calls["chatwoot"] == 1
+    assert body["services"] == {"chatwoot": "connected", "n8n": "connected", "redis": "error"}
+
+    # Cache preenchido: nenhuma checagem nova, mesmo com a dependência caída agora
+    outcomes["chatwoot"] = ConnectionError("caiu")
+    prober._results["chatwoot"].checked_at = time.time() - 1
+    assert (await health.readiness_check())["status"] == "ready"
+    assert calls == {"chatwoot": 1, "n8n": 1, "redis": 1}
+
+    # Resultado mais velho que max_age: not ready até o prober rodar de novo
+    prober._results["n8n"].checked_at = time.time() - prober.max_age("n8n") - 1
+    with pytest.raises(HTTPException) as exc:
+        await health.readiness_check()
+    assert exc.value.status_code == 503 and "n8n: stale" in exc.value.detail
+
+    await prober.probe("n8n")
+    assert (await health.readiness_check())["status"] == "ready"
+    await prober.probe("chatwoot")
+    with pytest.raises(HTTPException) as exc:
+        await health.readiness_check()
+    assert exc.value.detail == "Service unavailable: chatwoot: ConnectionError: caiu"
+
+
+@pytest.mark.asyncio
+async def test_readiness_fails_on_required_dependency_error(monkeypatch):
+    prober, _ = fake_prober(monkeypatch, {"chatwoot": RuntimeError("401"), "n8n": "not_configured"})
+    with pytest.raises(HTTPException) as exc:
+        await health.readiness_check()
+    assert exc.value.status_code == 503 and exc.value.detail == "Service unavailable: chatwoot: RuntimeError: 401"
+
+
+def test_per_dependency_interval_overrides_default(monkeypatch):
+    monkeypatch.delenv("HEALTH_PROBE_INTERVAL_N8N", raising=False)
+    monkeypatch.delenv("HEALTH_PROBE_INTERVAL_REDIS", raising=False)
+    monkeypatch.setenv("HEALTH_PROBE_INTERVAL", "20")
+    monkeypatch.setenv("HEALTH_PROBE_INTERVAL_CHATWOOT", "2.5")
+    monkeypatch.setenv("N8N_BASE_URL", "http://n8n:5678")
+    prober = HealthProber.from_settings(Settings(_env_file=None))
+
+    assert prober.intervals == {"chatwoot": 2.5, "n8n": 20.0, "redis": 20.0}
+    assert prober.n8n_url == "http://n8n:5678"
+    assert prober.max_age("chatwoot") == 3 * 2.5 + prober.timeout
+    assert prober.max_age("n8n") == 3 * 20.0 + prober.timeout
+
+
+@pytest.mark.asyncio
+async def test_background_loop_uses_each_interval(monkeypatch):
+    prober, calls = fake_prober(monkeypatch, {"chatwoot": None, "n8n": None, "redis": None})
+    prober.intervals = {"chatwoot": 0.01, "n8n": 10.0, "redis": 10.0}
+    prober.start()
+    await asyncio.sleep(0.1)
+    await prober.stop()
+
+    assert calls["chatwoot"] >= 4
+    assert calls["n8n"] == calls["redis"] == 1
@@ -0,0 +1,146 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from api.services.backfill import SqliteSink
+from api.services.chatwoot_client import ChatwootClient
+from api.services.lead_export import (
+    ExportStats,
+    LeadFilter,
+    chatwoot_source,
+    export_leads,
+    make_encoder,
+    sqlite_source,
+)
+
+JAN_1 = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+async def _records(n):
+    for i in range(1, n + 1):
+        yield {
+            "account_id": "1",
+            "conversation_id": i,
+            "attributes": {
+                "nome": f"Lead {i}",
+                "email": f"lead{i}@example.com",
+                "time_vendas": "muitos" if i == 7 else i % 6,
+                "dor_principal": "Quero saber o preço" if i % 2 else "Perdemos leads na planilha",
+            },
+            "updated_at": JAN_1 + i * 86400,
+        }
+
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest.mark.asyncio
+async def test_export_streams_gzip_csv_in_batches_with_fit_and_intent():
+    stats = ExportStats()
+    data = await _collect(export_leads(_records(2500), make_encoder("csv", "gzip"), batch_size=400, stats=stats))
+
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(data).decode("utf-8"))))
+    assert len(rows) == stats.rows == 2499
+    assert stats.skipped == 1  # time_vendas inválido
+    assert stats.batches == 7 and stats.bytes == len(data)
+    first = rows[0]
+    assert first["conversation_id"] == "1" and first["time_vendas"] == "1"
+    assert first["fit"] == "inelegivel" and first["intent"] == "preco"
+    assert rows[2]["fit"] == "elegivel" and rows[1]["intent"] == "pergunta_geral"
+    assert first["updated_at"] == "2026-01-02T00:00:00+00:00"
+
+
+@pytest.mark.asyncio
+async def test_export_filters_by_fit_pain_and_period():
+    lead_filter = LeadFilter(fit="elegivel", dor="PLANILHA", since=datetime(2026, 1, 11), until=datetime(2026, 1, 31))
+    stats = ExportStats()
+    data = await _collect(export_leads(_records(100), make_encoder("jsonl"), lead_filter, batch_size=3, stats=stats))
+
+    rows = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+    # elegível (time_vendas >= 3) com dor na planilha (ids pares), atualizados de 11/01 a 30/01
+    assert [r["conversation_id"] for r in rows] == [i for i in range(10, 30) if i % 2 == 0 and i % 6 >= 3]
+    assert stats.filtered == 99 - len(rows)
+
+
+@pytest.mark.asyncio
+async def test_export_reads_backfill_sqlite(tmp_path):
+    sink = SqliteSink(str(tmp_path / "conv.db"))
+    await sink.write("1", [
+        {"id": i, "status": "open", "last_activity_at": JAN_1, "custom_attributes": {"nome": f"L{i}", "time_vendas": 5}}
+        for i in range(1, 51)
+    ])
+    await sink.close()
+
+    data = await _collect(export_leads(sqlite_source(str(tmp_path / "conv.db"), batch_size=7), make_encoder("jsonl")))
+    rows = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+    assert [r["conversation_id"] for r in rows] == list(range(1, 51))
+    assert rows[0]["fit"] == "elegivel" and rows[0]["intent"] is None
+    assert rows[0]["updated_at"] == "2026-01-01T00:00:00+00:00"
+
+
+@pytest.mark.asyncio
+async def test_export_pages_chatwoot_conversations():
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        ids = range((page - 1) * 25 + 1, min(page * 25, 60) + 1)
+        payload = [{"id": i, "last_activity_at": JAN_1, "custom_attributes": {"nome": f"L{i}"}} for i in ids]
+        return httpx.Response(200, json={"data": {"meta": {"all_count": 60}, "payload": payload}})
+
+    client = ChatwootClient(
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        base_url="http://chatwoot", access_token="t", account_id="1",
+    )
+    data = await _collect(export_leads(chatwoot_source(client, rate=1000), make_encoder("jsonl"), batch_size=10))
+    rows = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+    assert sorted(r["conversation_id"] for r in rows) == list(range(1, 61))
+    assert {r["account_id"] for r in rows} == {"1"}
+
+
+def test_make_encoder_rejects_unknown_format_and_compression():
+    with pytest.raises(ValueError):
+        make_encoder("xlsx")
+    with pytest.raises(ValueError):
+        make_encoder("csv", "bz2")
+
+
+@pytest.mark.asyncio
+async def test_only_one_chatwoot_export_runs_at_a_time(monkeypatch):
+    from fastapi import HTTPException
+
+    from api.routers import exports
+
+    async def fake_source(client, account_id):
+        async for record in _records(3):
+            yield record
+
+    monkeypatch.setattr(exports, "chatwoot_source", fake_source)
+    params = dict(
+        source="chatwoot", format="jsonl", compression=None, account=None, fit=None, dor=None, since=None, until=None
+    )
+    first = await exports.export_leads_file(**params)
+
+    with pytest.raises(HTTPException) as exc:
+        await exports.export_leads_file(**params)
+    assert exc.value.status_code == 429 and exc.value.headers["Retry-After"]
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    await first({"type": "http"}, receive, send)
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    assert len(body.splitlines()) == 3
+    # Terminada a primeira, a próxima é aceita
+    second = await exports.export_leads_file(**params)
+    await second({"type": "http"}, receive, send)
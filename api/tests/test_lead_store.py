@@ -0,0 +1,76 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from api.domain.bot_logic import compute_fit_primary
+from api.domain.models import LeadQualification, State
+from api.services.lead_store import LeadStore, LeadWriter, has_asyncpg, lead_row, merge_rows
+
+
+class RecordingStore:
+    def __init__(self, fail=0):
+        self.batches = []
+        self.fail = fail
+
+    async def upsert_many(self, rows):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("db down")
+        self.batches.append(list(rows))
+        return len(self.batches[-1])
+
+
+def test_lead_row_and_merge_keep_known_fields_and_status():
+    fit = compute_fit_primary(State(time_vendas=5)).value
+    first = lead_row(1, 10, State(nome="Ana", empresa="Acme"), action="create_lead", fit=fit)
+    later = lead_row(1, 10, State(nome="Ana", email="ana@acme.com"), action=None, fit=fit)
+    assert first["status"] == "qualificado" and later["status"] == "em_qualificacao"
+    assert first["fit"] == "elegivel"
+    merged = merge_rows(first, later)
+    assert merged["empresa"] == "Acme"
+    assert merged["email"] == "ana@acme.com"
+    assert merged["status"] == "qualificado"
+
+    qualified = lead_row(1, 10, State(), qualification=LeadQualification(qualification_score=80))
+    assert qualified["qualification_score"] == 80
+    assert '"qualification_score":80' in qualified["qualification"]
+
+
+@pytest.mark.asyncio
+async def test_writer_coalesces_per_conversation_and_requeues_on_failure():
+    store = RecordingStore(fail=1)
+    writer = LeadWriter(store, batch_size=100)
+    for i in range(3):
+        writer.submit(lead_row(1, 10, State(nome=f"v{i}")))
+    writer.submit(lead_row(1, 11, State(nome="outro")))
+
+    with pytest.raises(RuntimeError):
+        await writer.flush()
+    writer.submit(lead_row(1, 10, State(cargo="CEO")))
+    assert await writer.flush() == 2
+    rows = {r["conversation_id"]: r for r in store.batches[0]}
+    assert rows[10]["nome"] == "v2" and rows[10]["cargo"] == "CEO"
+    assert await writer.flush() == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not has_asyncpg or not os.getenv("TEST_DATABASE_URL"), reason="requires asyncpg and TEST_DATABASE_URL")
+async def test_bulk_upsert_and_indexed_queries():
+    store = await LeadStore.connect(os.environ["TEST_DATABASE_URL"])
+    try:
+        async with store.pool.acquire() as conn:
+            await conn.execute("DROP TABLE IF EXISTS leads")
+        await store.init_schema()
+        fit = compute_fit_primary(State(time_vendas=5)).value
+        await store.upsert_many([lead_row(1, i, State(nome=f"lead{i}"), fit=fit) for i in range(50)])
+        await store.upsert_many([lead_row(1, 7, State(email="x@acme.com"), action="schedule")])
+        await store.upsert_many([lead_row(1, 7, State())])
+
+        scheduled = await store.query(status="agendado")
+        assert [(r["conversation_id"], r["nome"], r["email"]) for r in scheduled] == [(7, "lead7", "x@acme.com")]
+        assert len(await store.query(fit="elegivel", limit=1000)) == 50
+        since = datetime.now(timezone.utc) + timedelta(hours=1)
+        assert await store.query(since=since) == []
+    finally:
+        await store.close()
@@ -0,0 +1,71 @@
+import logging
+import random
+
+import pytest
+import structlog
+
+from app.core.log_sampling import LogSampler, SamplingRule
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _record(name="api.services.openai_client", level=logging.INFO, lineno=10, msg="Resposta gerada: x"):
+    return logging.LogRecord(name, level, "openai_client.py", lineno, msg, (), None)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_rate_limit_per_call_site_and_suppressed_counter(clock):
+    sampler = LogSampler({"api.services": SamplingRule(rate=1, burst=2)}, clock=clock)
+    kept = [sampler.filter(_record()) for _ in range(5)]
+    assert kept == [True, True, False, False, False]
+    # another call site has its own bucket
+    assert sampler.filter(_record(lineno=20)) is True
+
+    clock.now = 1.0
+    record = _record()
+    assert sampler.filter(record) is True
+    assert record.suppressed == 3
+    assert record.getMessage().endswith("(suppressed 3 similar)")
+
+
+def test_errors_and_slow_events_always_kept(clock):
+    sampler = LogSampler({"api": SamplingRule(rate=0, burst=0)}, slow_ms=500, clock=clock)
+    assert sampler.filter(_record()) is False
+    assert sampler.filter(_record(level=logging.ERROR)) is True
+    slow = _record()
+    slow.duration_ms = 800
+    assert sampler.filter(slow) is True
+
+
+def test_unmatched_loggers_are_untouched(clock):
+    sampler = LogSampler({"api.services.openai_client": SamplingRule(rate=0, burst=0)}, clock=clock)
+    assert all(sampler.filter(_record(name="api.routers.health")) for _ in range(100))
+    assert sampler.rule_for("api.services.openai_client_extra") is None
+
+
+def test_probabilistic_sampling():
+    sampler = LogSampler({"": SamplingRule(sample=0.1)}, rng=random.Random(1))
+    kept = sum(sampler.filter(_record()) for _ in range(10000))
+    assert 800 < kept < 1200
+
+
+def test_structlog_processor(clock):
+    sampler = LogSampler.from_json('{"x": {"rate": 1, "burst": 1}}')
+    sampler._clock = clock
+    logger = logging.getLogger("x")
+    assert sampler(logger, "info", {"event": "lead", "level": "info"})["event"] == "lead"
+    # the stdlib record emitted for the kept event is not sampled again
+    assert sampler.filter(_record(name="x")) is True
+    with pytest.raises(structlog.DropEvent):
+        sampler(logger, "info", {"event": "lead", "level": "info"})
+    assert sampler(logger, "error", {"event": "lead", "level": "error"})["suppressed"] == 1
@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+
+import pytest
+
+from app.core.logging import BoundedQueueHandler, PiiMaskingFilter, _DeferredRenderFormatter
+
+
+def _record(msg, *args, level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+def test_bounded_queue_handler_drops_when_full():
+    q = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(q, overflow="drop")
+    for i in range(5):
+        handler.emit(_record("msg %d", i))
+    assert q.qsize() == 2
+    assert handler.dropped == 3
+    # args are frozen into the message on the calling side
+    assert q.get_nowait().msg == "msg 0"
+
+
+def test_bounded_queue_handler_block_times_out():
+    q = queue.Queue(maxsize=1)
+    handler = BoundedQueueHandler(q, overflow="block", block_timeout=0.01)
+    handler.emit(_record("first"))
+    handler.emit(_record("second"))
+    assert handler.dropped == 1
+
+
+def test_bounded_queue_handler_invalid_policy():
+    with pytest.raises(ValueError):
+        BoundedQueueHandler(queue.Queue(), overflow="spill")
+
+
+def test_deferred_render_masks_and_renders_event_dict():
+    record = _record({"event": "lead", "email": "joao@example.com"})
+    PiiMaskingFilter().filter(record)
+    out = json.loads(_DeferredRenderFormatter().format(record))
+    assert out == {"event": "lead", "email": "[email_masked]"}
+
+    plain = _record("contato joao@example.com")
+    PiiMaskingFilter().filter(plain)
+    assert _DeferredRenderFormatter().format(plain) == "contato [email_masked]"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_async_logging_survives_fork():
+    # gunicorn --preload configures logging in the master, then forks workers
+    code = (
+        "import logging, os\n"
+        "from app.core.logging import configure_logging, shutdown_logging\n"
+        "configure_logging(async_mode=True)\n"
+        "pid = os.fork()\n"
+        "if pid == 0:\n"
+        "    logging.getLogger('child').info('from child')\n"
+        "    shutdown_logging()\n"
+        "    os._exit(0)\n"
+        "os.waitpid(pid, 0)\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=30)
+    assert proc.returncode == 0, proc.stderr
+    assert "from child" in proc.stdout
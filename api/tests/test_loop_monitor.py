@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.loop_monitor import LoopMonitor
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_detected_with_stack(caplog):
+    monitor = LoopMonitor(interval=0.02, slow_threshold=0.05)
+    before = REGISTRY.get_sample_value("event_loop_blocked_total") or 0
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)  # blocks the loop
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    assert (REGISTRY.get_sample_value("event_loop_blocked_total") or 0) == before + 1
+    messages = [r.getMessage() for r in caplog.records]
+    assert any("test_blocking_call_is_detected_with_stack" in m for m in messages)
+    assert REGISTRY.get_sample_value("event_loop_lag_seconds_count") > 0
+
+
+@pytest.mark.asyncio
+async def test_block_starting_mid_interval_is_detected(caplog):
+    # Block shorter than the lag interval that starts while the heartbeat would
+    # still be asleep: it must not hide inside the interval
+    monitor = LoopMonitor(interval=0.5, slow_threshold=0.1)
+    before = REGISTRY.get_sample_value("event_loop_blocked_total") or 0
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        monitor.start()
+        await asyncio.sleep(0.2)
+        time.sleep(0.15)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    assert (REGISTRY.get_sample_value("event_loop_blocked_total") or 0) == before + 1
+    assert any("test_block_starting_mid_interval_is_detected" in r.getMessage() for r in caplog.records)
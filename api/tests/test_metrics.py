@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.metrics import instrument_dependency, record_openai_usage
+
+
+def _count(dependency, operation, status):
+    value = REGISTRY.get_sample_value(
+        "dependency_requests_total",
+        {"dependency": dependency, "operation": operation, "status": status},
+    )
+    return value or 0.0
+
+
+@pytest.mark.asyncio
+async def test_instrument_dependency_records_outcomes():
+    @instrument_dependency("test-dep")
+    async def ok():
+        return 1
+
+    @instrument_dependency("test-dep", "call")
+    async def not_found():
+        request = httpx.Request("GET", "http://x")
+        raise httpx.HTTPStatusError("nf", request=request, response=httpx.Response(404, request=request))
+
+    assert await ok() == 1
+    with pytest.raises(httpx.HTTPStatusError):
+        await not_found()
+
+    assert _count("test-dep", "ok", "2xx") == 1
+    assert _count("test-dep", "call", "404") == 1
+    in_flight = REGISTRY.get_sample_value(
+        "dependency_requests_in_flight", {"dependency": "test-dep", "operation": "call"}
+    )
+    assert in_flight == 0
+    assert REGISTRY.get_sample_value(
+        "dependency_request_duration_seconds_count", {"dependency": "test-dep", "operation": "ok"}
+    ) == 1
+
+
+def test_record_openai_usage():
+    record_openai_usage("op", "m", SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+    record_openai_usage("op", "m", None)
+    labels = {"operation": "op", "model": "m"}
+    assert REGISTRY.get_sample_value("openai_tokens_total", {**labels, "kind": "prompt"}) == 120
+    assert REGISTRY.get_sample_value("openai_tokens_total", {**labels, "kind": "completion"}) == 30
+
+
+def test_record_openai_usage_reports_cached_prompt_tokens():
+    usage = SimpleNamespace(
+        prompt_tokens=2000, completion_tokens=50, prompt_tokens_details=SimpleNamespace(cached_tokens=1536)
+    )
+    record_openai_usage("cached-op", "m", usage)
+    labels = {"operation": "cached-op", "model": "m"}
+    assert REGISTRY.get_sample_value("openai_tokens_total", {**labels, "kind": "cached"}) == 1536
+    assert REGISTRY.get_sample_value("openai_prompt_cached_ratio_sum", labels) == 1536 / 2000
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from app.core.profiling import MemoryProfiler, ProfilerBusy, SamplingProfiler
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_collapsed_output():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,))
+    worker.start()
+    try:
+        out = SamplingProfiler().profile(worker.ident, seconds=0.2, interval=0.002)
+    finally:
+        stop.set()
+        worker.join()
+    lines = out.strip().splitlines()
+    assert lines
+    assert any("_busy_loop" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_sampling_profiler_is_exclusive_and_bounded():
+    profiler = SamplingProfiler(max_seconds=0.05)
+    profiler._lock.acquire()
+    with pytest.raises(ProfilerBusy):
+        profiler.profile(threading.get_ident(), 1)
+    profiler._lock.release()
+    start = time.monotonic()
+    profiler.profile(threading.main_thread().ident, seconds=10)
+    assert time.monotonic() - start < 1
+
+
+def test_memory_profiler_diff_and_stop():
+    profiler = MemoryProfiler(max_seconds=60)
+    try:
+        first = profiler.snapshot(limit=5)
+        assert first["compared_to_previous"] is False
+        blob = [bytearray(512) for _ in range(2000)]  # noqa: F841
+        second = profiler.snapshot(limit=5)
+        assert second["compared_to_previous"] is True
+        assert any("test_profiling.py" in s["location"] for s in second["top"])
+    finally:
+        profiler.stop()
+    assert profiler.active is False
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+from api.services.prompt_budget import TRUNCATION_MARKER, PromptBudget, normalize_whitespace
+from app.core.metrics import PROMPT_TOKENS_SAVED
+
+
+def _saved(operation, reason):
+    return PROMPT_TOKENS_SAVED.labels(operation, reason)._value.get()
+
+
+def test_normalize_whitespace_strips_template_indentation():
+    prompt = """
+            Analise a mensagem:
+
+            Mensagem: "oi   tudo    bem"
+
+
+            Responda em JSON:
+            {
+                "intent": "string"
+            }
+            """
+    assert normalize_whitespace(prompt) == (
+        'Analise a mensagem:\n\nMensagem: "oi tudo bem"\n\nResponda em JSON:\n{\n"intent": "string"\n}'
+    )
+
+
+def test_fit_text_and_history_respect_their_share():
+    budget = PromptBudget("test-model", budgets={"op": 100})
+    pasted_email = "início " + "x" * 4000 + " fim"
+    fitted = budget.fit_text("op", "message", pasted_email, budget.share("op", 0.5))
+    assert budget.count(fitted) <= 50
+    assert fitted.startswith("início") and fitted.endswith("fim") and TRUNCATION_MARKER in fitted
+
+    history = [{"role": "user", "content": f"mensagem {i} " + "y" * 60} for i in range(20)]
+    kept = budget.fit_history("op", "history", history, 80)
+    assert kept and kept[-1]["content"].startswith("mensagem 19")
+    assert sum(budget.count(m["content"]) for m in kept) <= 80
+
+
+def test_prepare_normalizes_and_enforces_the_operation_budget():
+    budget = PromptBudget("test-model", budgets={"prepare_op": 60})
+    before = _saved("prepare_op", "whitespace"), _saved("prepare_op", "truncation")
+    system, prompt, tokens = budget.prepare("prepare_op", "  Você é um assistente.  ", "    linha\n" * 10 + "z" * 1000)
+    assert system == "Você é um assistente."
+    assert tokens <= 60
+    assert _saved("prepare_op", "whitespace") > before[0]
+    assert _saved("prepare_op", "truncation") > before[1]
+
+
+def test_dynamic_max_tokens_follows_observed_completions():
+    budget = PromptBudget("test-model", min_samples=5)
+    assert budget.max_tokens("op", 500) == 500  # sem amostras suficientes
+    for tokens in (40, 50, 60, 55, 45, 52):
+        budget.observe("op", tokens, 500, "stop")
+    assert budget.max_tokens("op", 500) == 60 * 5 // 4 + 16
+    # Resposta cortada por "length" devolve folga ao limite
+    budget.observe("op", 91, 91, "length")
+    assert budget.max_tokens("op", 500) > 91
+
+
+@pytest.mark.asyncio
+async def test_chat_sends_compacted_prompt_and_adjusted_max_tokens(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from api.services.openai_client import OpenAIClient
+
+    client = OpenAIClient()
+    client.budget = PromptBudget(client.model, min_samples=1)
+    client.budget.observe("analyze_message_intent", 100, 500, "stop")
+    sent = {}
+
+    async def create(**kwargs):
+        sent.update(kwargs)
+        return SimpleNamespace(
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=30),
+            choices=[SimpleNamespace(finish_reason="stop", message=SimpleNamespace(content='{"intent": "interesse"}'))],
+        )
+
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    result = await client.analyze_message_intent("quero   saber o preço " + "a" * 10000)
+    assert result == {"intent": "interesse"}
+    prompt = sent["messages"][1]["content"]
+    assert not prompt.startswith(" ") and "\n    " not in prompt
+    assert client.budget.count(prompt) <= client.budget.input_budget("analyze_message_intent")
+    assert sent["max_tokens"] == 100 * 5 // 4 + 16
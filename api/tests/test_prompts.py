@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from api.services.prompts import PromptRegistry, PromptTemplate, prompt_registry
+
+
+def test_every_template_keeps_variables_after_a_shared_static_prefix():
+    for template in prompt_registry:
+        first = template.render(**{name: "<<A>>" for name, _ in template.fields})
+        second = template.render(**{name: "<<outro valor>>" for name, _ in template.fields})
+        shared = os.path.commonprefix([first, second])
+        assert shared.startswith(template.prefix)
+        # Nada estático depois da primeira variável
+        assert template.prefix in shared and "<<" not in template.prefix
+
+
+def test_version_tracks_the_static_parts_only():
+    def template(instructions):
+        return PromptTemplate(
+            name="t", system="S", instructions=instructions, fields=(("m", "Mensagem"),), temperature=0.3, max_tokens=100
+        )
+
+    base = template("  Faça X.\n  JSON: {}")
+    reindented = template("Faça X.\nJSON: {}")
+    changed = template("Faça Y.\nJSON: {}")
+    assert base.version == reindented.version != changed.version
+    assert base.render(m="oi") == "Faça X.\nJSON: {}\n\nMensagem:\noi"
+    assert base.cache_key(m="oi") == base.cache_key(m="oi") != base.cache_key(m="olá")
+
+
+def test_registry_rejects_duplicates_and_lists_versions():
+    registry = PromptRegistry()
+    template = registry.register(
+        PromptTemplate(name="dup", system="S", instructions="I", fields=(), temperature=0, max_tokens=1)
+    )
+    with pytest.raises(ValueError):
+        registry.register(template)
+    assert registry.versions() == {"dup": template.version}
+    assert prompt_registry.get("qualify_lead_incremental_summary").operation == "qualify_lead_incremental"
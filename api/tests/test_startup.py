@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+
+def test_importing_api_does_not_load_optional_sdks():
+    # Heavy/optional SDKs are imported on first use, not at process start
+    code = "import sys, api.main; print(','.join(m for m in ('openai', 'redis', 'asyncpg') if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env={"CHATWOOT_WEBHOOK_SECRET": "x", **os.environ},
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == ""
+
+
+def test_settings_are_built_lazily_and_cached():
+    import app.core.settings as settings_module
+
+    assert "settings" not in vars(settings_module)
+    assert settings_module.settings is settings_module.get_settings()
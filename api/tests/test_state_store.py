@@ -0,0 +1,62 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+import redis.asyncio as aioredis
+
+from api.domain.models import State
+from api.services.state_store import ChatwootStateSyncer, RedisStateStore, decode_state, encode_state
+
+
+def test_encoding_is_compact_and_round_trips():
+    state = State(nome="Ana", email="ana@acme.com", time_vendas=5, horario1=datetime(2025, 1, 2, 10, 0))
+    raw = encode_state(state)
+    assert set(json.loads(raw)) == {"n", "m", "t", "h1"}
+    assert decode_state(raw) == state
+    assert decode_state(None) == State()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_do_not_lose_writes(redis_url):
+    store = RedisStateStore(aioredis.from_url(redis_url))
+
+    def bump(state):
+        state.time_vendas = (state.time_vendas or 0) + 1
+        return state, state.time_vendas
+
+    async def worker():
+        for _ in range(10):
+            await store.update(1, 42, bump, retries=100)
+
+    await asyncio.gather(*(worker() for _ in range(5)))
+    state, version = await store.get(1, 42)
+    assert state.time_vendas == 50
+    assert version == 50
+    assert await store.compare_and_set(1, 42, state, expected_version=1) is None
+    await store.redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_pipelined_batch_and_background_sync(redis_url):
+    store = RedisStateStore(aioredis.from_url(redis_url))
+    await store.set_many([(1, i, State(nome=f"lead{i}")) for i in range(5)], mark_dirty=True)
+    rows = await store.get_many([(1, i) for i in range(6)])
+    assert [s.nome if s else None for s, _ in rows] == ["lead0", "lead1", "lead2", "lead3", "lead4", None]
+
+    pushed = {}
+    fail_once = {"1:3"}
+
+    async def set_attributes(account_id, conversation_id, **attrs):
+        member = f"{account_id}:{conversation_id}"
+        if member in fail_once:
+            fail_once.discard(member)
+            raise RuntimeError("chatwoot down")
+        pushed[conversation_id] = attrs["nome"]
+
+    syncer = ChatwootStateSyncer(store, set_attributes)
+    assert await syncer.sync_once() == 4
+    assert await syncer.sync_once() == 1
+    assert pushed == {i: f"lead{i}" for i in range(5)}
+    assert await store.redis.scard(store.dirty_key) == 0
+    await store.redis.aclose()
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from api.services.tenants import FairScheduler, Tenant, TenantRegistry, parse_tenants
+
+
+def _default():
+    return Tenant(account_id="1", hmac_secret="default-secret", chatwoot_base_url="http://chatwoot", chatwoot_token="t0")
+
+
+def test_parse_tenants_inherits_defaults_and_validates():
+    tenants = parse_tenants(
+        {"tenants": [{"account_id": 7, "hmac_secret": "s7", "weight": 3, "bot_config": {"escalation_keywords": ["socorro"]}}]},
+        _default(),
+    )
+    tenant = tenants["7"]
+    assert tenant.hmac_secret == "s7"
+    assert tenant.chatwoot_base_url == "http://chatwoot"
+    assert tenant.weight == 3.0
+    assert tenant.bot_config.escalation_keywords == ["socorro"]
+
+    with pytest.raises(ValueError):
+        parse_tenants([{"account_id": 8, "flow": "v9"}], _default())
+
+
+@pytest.mark.asyncio
+async def test_registry_reloads_file_and_keeps_pools_of_unchanged_tenants(tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps([{"account_id": 1, "chatwoot_token": "a"}, {"account_id": 2, "chatwoot_token": "b"}]))
+    registry = TenantRegistry(str(path), default=_default(), reload_interval=0, retire_after=0)
+
+    first, second = registry.get(1), registry.get("2")
+    pool_1, pool_2 = first.chatwoot, second.chatwoot
+    assert registry.get(99) is registry.default
+
+    path.write_text(json.dumps([
+        {"account_id": 1, "chatwoot_token": "a", "weight": 5},
+        {"account_id": 2, "chatwoot_token": "new"},
+    ]))
+    os.utime(path, (1, 1))
+    assert registry.get(1).weight == 5
+    assert registry.get(1).chatwoot is pool_1
+    assert registry.get(2).chatwoot is not pool_2
+
+    # Arquivo inválido mantém a configuração anterior
+    path.write_text("{")
+    os.utime(path, (2, 2))
+    assert registry.get(1).weight == 5
+
+    await asyncio.sleep(0.01)
+    assert pool_2.http_client.is_closed
+    await registry.aclose()
+    assert pool_1.http_client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_interleaves_tenants_by_weight():
+    scheduler = FairScheduler(concurrency=1)
+    gate = asyncio.Event()
+    order = []
+
+    async def turn(tenant, weight):
+        async with scheduler.slot(tenant, weight):
+            order.append(tenant)
+            await gate.wait()
+
+    blocker = asyncio.create_task(turn("warmup", 1))
+    await asyncio.sleep(0)
+    # Rajada do tenant "noisy" chega antes dos pedidos de "quiet" (peso 2)
+    tasks = [asyncio.create_task(turn("noisy", 1)) for _ in range(6)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(turn("quiet", 2)) for _ in range(4)]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(blocker, *tasks)
+
+    served = order[1:]
+    # "quiet" não espera a rajada inteira: seus 4 pedidos saem entre os 6 primeiros
+    assert served[:6].count("quiet") == 4
+    assert scheduler.in_flight == 0
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from asgi_correlation_id import correlation_id
+
+from app.core.tracing import InMemorySpanExporter, JsonlSpanExporter, Tracer
+
+
+def test_nested_spans_share_trace_and_link_parent():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter)
+    token = correlation_id.set("req-123")
+    try:
+        with tracer.span("root", route="/x") as root:
+            with tracer.span("child") as child:
+                pass
+    finally:
+        correlation_id.reset(token)
+
+    spans = {s.name: s for s in exporter.spans()}
+    assert list(spans) == ["child", "root"]
+    assert root.trace_id == child.trace_id == "req-123"
+    assert child.parent_id == root.span_id
+    assert spans["root"].attributes == {"route": "/x"}
+    assert spans["root"].end_ns >= spans["child"].end_ns
+
+
+def test_error_status_and_ring_bound():
+    exporter = InMemorySpanExporter(maxlen=2)
+    tracer = Tracer(exporter)
+    with pytest.raises(ValueError):
+        with tracer.span("boom"):
+            raise ValueError()
+    assert exporter.spans()[0].status == "error"
+    for i in range(5):
+        with tracer.span(f"s{i}"):
+            pass
+    assert [s.name for s in exporter.spans()] == ["s3", "s4"]
+
+
+def test_unsampled_trace_skips_children():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, sample_rate=0.0)
+    with tracer.span("root") as root:
+        with tracer.span("child") as child:
+            pass
+    assert root is None and child is None
+    assert exporter.spans() == []
+
+
+def test_jsonl_exporter_flushes_on_shutdown(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = JsonlSpanExporter(str(path), flush_interval=60)
+    tracer = Tracer(exporter)
+    with tracer.span("a"):
+        pass
+    exporter.shutdown()
+    line = json.loads(path.read_text().strip())
+    assert line["name"] == "a" and line["duration_ms"] >= 0
@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+import pytest
+
+from api.services.transcripts import ConversationSummary, TranscriptStore
+
+
+def test_append_and_tail_through_the_writer_thread(tmp_path):
+    store = TranscriptStore(str(tmp_path / "t.db"))
+    store.start()
+    try:
+        for i in range(30):
+            store.append(1, 10, "user", f"oi {i}")
+            store.append(1, 10, "assistant", f"resposta {i}")
+        store.append(1, 11, "user", "outra conversa")
+        store.append(1, 10, "assistant", "")  # respostas vazias não entram
+        store.flush()
+
+        tail = store.tail_sync(1, 10, limit=4)
+        assert tail == [
+            {"role": "user", "content": "oi 28"},
+            {"role": "assistant", "content": "resposta 28"},
+            {"role": "user", "content": "oi 29"},
+            {"role": "assistant", "content": "resposta 29"},
+        ]
+        assert store.tail_sync("1", 11) == [{"role": "user", "content": "outra conversa"}]
+        assert store.tail_sync(2, 10) == []
+    finally:
+        store.close()
+
+
+def test_compaction_trims_conversations_and_drops_expired(tmp_path):
+    store = TranscriptStore(str(tmp_path / "t.db"), retention_days=1, max_messages=5)
+    for i in range(12):
+        store.append(1, 10, "user", f"m{i}")
+    store.append(1, 20, "user", "velha")
+    store.flush()
+    store._write_conn().execute("UPDATE messages SET created_at = ? WHERE conversation_id = 20", (time.time() - 2 * 86400,))
+
+    store.compact()
+    assert [m["content"] for m in store.tail_sync(1, 10, limit=50)] == [f"m{i}" for i in range(7, 12)]
+    assert store.tail_sync(1, 20) == []
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_async_tail_reads_from_a_worker_thread(tmp_path):
+    store = TranscriptStore(str(tmp_path / "t.db"))
+    store.append(3, 1, "user", "João Silva")
+    store.flush()
+    assert await store.tail(3, 1) == [{"role": "user", "content": "João Silva"}]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_save_summary_waits_for_its_own_commit(tmp_path):
+    store = TranscriptStore(str(tmp_path / "t.db"))
+    store.start()
+    try:
+        store.append(1, 5, "user", "oi")
+        # Não espera a fila inteira (que pode nunca esvaziar), só o próprio COMMIT
+        store._queue.join = lambda: pytest.fail("save_summary esperou a fila inteira")
+        await store.save_summary(1, 5, ConversationSummary("resumo", {"qualification_score": 70}, 1, 1))
+        assert store.summary_sync(1, 5) == ConversationSummary("resumo", {"qualification_score": 70}, 1, 1)
+    finally:
+        store.close()
+
+
+@pytest.mark.asyncio
+async def test_save_summary_raises_when_the_transaction_fails(tmp_path):
+    store = TranscriptStore(str(tmp_path / "t.db"))
+    conn = sqlite3.connect(str(tmp_path / "t.db"))
+    conn.execute("DROP TABLE summaries")
+    conn.close()
+
+    store.append(1, 5, "user", "oi")
+    with pytest.raises(sqlite3.OperationalError):
+        await store.save_summary(1, 5, ConversationSummary("resumo", None, 1, 1))
+    # Mensagens do mesmo lote voltaram com o ROLLBACK
+    assert store.tail_sync(1, 5) == []
+    store.close()
@@ -0,0 +1,225 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from app.core.flight_recorder import note_queue_wait
+from app.core.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_LIMIT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_REQUESTS,
+)
+
+PRIORITY_NORMAL = 0
+PRIORITY_HANDOFF = 1
+_PRIORITY_NAMES = {PRIORITY_NORMAL: "normal", PRIORITY_HANDOFF: "handoff"}
+
+
+class Shed(Exception):
+    """Request rejected by admission control; answer 503 with ``Retry-After``."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class GradientLimit:
+    """Concurrency limit that follows the ratio of long-term to recent latency.
+
+    Gradient style (as in Netflix' concurrency-limits): ``short`` is a fast
+    EWMA of request latency, ``long`` a slow one that approximates the no-load
+    latency. While ``short`` stays within ``tolerance`` of ``long`` the limit
+    grows by ``sqrt(limit)`` per sample; once latency rises the gradient
+    ``tolerance * long / short`` drops below 1 and the limit shrinks
+    proportionally (never by more than half per sample).
+    """
+
+    def __init__(
+        self,
+        initial: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        long_window: int = 600,
+    ) -> None:
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self._long_alpha = 2.0 / (long_window + 1)
+        self.short_rtt: Optional[float] = None
+        self.long_rtt: Optional[float] = None
+
+    def update(self, rtt: float, in_flight: int) -> float:
+        if self.short_rtt is None or self.long_rtt is None:
+            self.short_rtt = self.long_rtt = rtt
+            return self.limit
+        self.short_rtt += 0.25 * (rtt - self.short_rtt)
+        self.long_rtt += self._long_alpha * (rtt - self.long_rtt)
+        if self.long_rtt > 2 * self.short_rtt:
+            # Latency dropped for good (e.g. dependency recovered): let the baseline follow
+            self.long_rtt *= 0.95
+        if in_flight < self.limit / 2 and self.short_rtt <= self.tolerance * self.long_rtt:
+            # Far from the limit and healthy: the sample says nothing about capacity
+            return self.limit
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = (1 - self.smoothing) * self.limit + self.smoothing * target
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), limit))
+        return self.limit
+
+
+class AdmissionController:
+    """Cap concurrent requests with an adaptive limit and a short priority queue.
+
+    Requests above the limit wait up to ``queue_timeout`` seconds (the
+    latency budget) in a queue of at most ``max_queue`` entries, highest
+    priority first. A full queue, or an expired wait, sheds the request with
+    `Shed`. A higher-priority arrival displaces the newest lowest-priority
+    waiter when the queue is full.
+    """
+
+    def __init__(
+        self,
+        name: str = "default",
+        limit: Optional[GradientLimit] = None,
+        queue_timeout: float = 2.0,
+        max_queue: int = 100,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.limiter = limit or GradientLimit()
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.clock = clock
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, "asyncio.Future[bool]"]] = []
+        self._seq = itertools.count()
+        ADMISSION_LIMIT.labels(name).set(self.limiter.limit)
+
+    def configure(
+        self,
+        *,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        queue_timeout: float,
+        max_queue: int,
+    ) -> None:
+        self.limiter = GradientLimit(initial=initial_limit, min_limit=min_limit, max_limit=max_limit)
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        ADMISSION_LIMIT.labels(self.name).set(self.limiter.limit)
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.limiter.limit))
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queued work divided by capacity."""
+        rtt = self.limiter.short_rtt or self.queue_timeout
+        return max(1, math.ceil(rtt * (self.queued + 1) / self.limit))
+
+    def _count(self, priority: int, outcome: str) -> None:
+        ADMISSION_REQUESTS.labels(self.name, _PRIORITY_NAMES.get(priority, str(priority)), outcome).inc()
+
+    def _update_gauges(self) -> None:
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self.in_flight)
+        ADMISSION_QUEUE_DEPTH.labels(self.name).set(self.queued)
+
+    def _displace_lower(self, priority: int) -> bool:
+        victims = [w for w in self._waiters if not w[2].done() and -w[0] < priority]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda w: (w[0], w[1]))  # lowest priority, newest
+        victim[2].set_exception(Shed(self.retry_after()))
+        return True
+
+    async def _acquire(self, priority: int) -> bool:
+        """Take a slot; returns True when the request had to queue."""
+        if self.in_flight < self.limit and not self.queued:
+            self.in_flight += 1
+            return False
+        if self.queued >= self.max_queue and not self._displace_lower(priority):
+            raise Shed(self.retry_after())
+
+        fut: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._seq), fut))
+        self._update_gauges()
+        try:
+            await asyncio.wait({fut}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._release_slot()  # slot was handed over just before the cancel
+            fut.cancel()
+            raise
+        if not fut.done():
+            fut.cancel()
+            self._update_gauges()
+            raise Shed(self.retry_after())
+        fut.result()  # raises Shed when displaced
+        return True
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit:
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            # The slot goes straight to the waiter; it is already counted
+            self.in_flight += 1
+            fut.set_result(True)
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def admit(self, priority: int = PRIORITY_NORMAL) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block, or raise `Shed`."""
+        wait_start = self.clock()
+        try:
+            queued = await self._acquire(priority)
+        except Shed:
+            self._count(priority, "shed")
+            ADMISSION_QUEUE_WAIT.labels(self.name).observe(self.clock() - wait_start)
+            raise
+        start = self.clock()
+        if queued:
+            ADMISSION_QUEUE_WAIT.labels(self.name).observe(start - wait_start)
+            note_queue_wait((start - wait_start) * 1000)
+        self._count(priority, "queued" if queued else "admitted")
+        self._update_gauges()
+
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            if succeeded:
+                # Failed requests are often fast rejections and would skew latency down
+                self.limiter.update(self.clock() - start, self.in_flight)
+                ADMISSION_LIMIT.labels(self.name).set(self.limiter.limit)
+            self._release_slot()
+
+
+# Admission controller of POST /api/v1/webhooks/agentbot (configured from settings in the lifespan)
+agentbot_admission = AdmissionController("agentbot")
+
+
+__all__ = [
+    "AdmissionController",
+    "GradientLimit",
+    "Shed",
+    "PRIORITY_NORMAL",
+    "PRIORITY_HANDOFF",
+    "agentbot_admission",
+]
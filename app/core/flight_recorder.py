@@ -0,0 +1,197 @@
+import heapq
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgi_correlation_id import correlation_id
+
+from app.core.pii import mask_pii as _mask_pii
+
+# Per-request caps so a single record stays constant-size
+MAX_STAGES = 32
+MAX_CALLS = 32
+MAX_NOTES = 16
+
+
+class RequestRecord:
+    """Timings and sizes collected for one request."""
+
+    __slots__ = (
+        "method", "path", "request_id", "started_at", "duration_ms", "status_code",
+        "stages", "calls", "queue_wait_ms", "request_bytes", "response_bytes", "notes",
+    )
+
+    def __init__(self, method: str, path: str) -> None:
+        self.method = method
+        self.path = path
+        self.request_id: Optional[str] = None
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.status_code: Optional[int] = None
+        self.stages: List[Tuple[str, float]] = []
+        self.calls: List[Tuple[str, float, str]] = []
+        self.queue_wait_ms = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.notes: Dict[str, str] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "request_id": self.request_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "status_code": self.status_code,
+            "stages": [{"name": n, "ms": round(ms, 3)} for n, ms in self.stages],
+            "calls": [{"name": n, "ms": round(ms, 3), "status": s} for n, ms, s in self.calls],
+            "queue_wait_ms": round(self.queue_wait_ms, 3),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "notes": dict(self.notes),
+        }
+
+
+_current_record: ContextVar[Optional[RequestRecord]] = ContextVar("flight_record", default=None)
+
+
+def note_stage(name: str, duration_ms: float) -> None:
+    record = _current_record.get()
+    if record is not None and len(record.stages) < MAX_STAGES:
+        record.stages.append((name, duration_ms))
+
+
+def note_call(name: str, duration_ms: float, status: str) -> None:
+    record = _current_record.get()
+    if record is not None and len(record.calls) < MAX_CALLS:
+        record.calls.append((name, duration_ms, status))
+
+
+def note_queue_wait(duration_ms: float) -> None:
+    record = _current_record.get()
+    if record is not None:
+        record.queue_wait_ms += duration_ms
+
+
+def note(key: str, value: Any) -> None:
+    """Attach a free-form value to the current request (PII-masked)."""
+    record = _current_record.get()
+    if record is not None and (key in record.notes or len(record.notes) < MAX_NOTES):
+        record.notes[key] = _mask_pii(str(value))[:256]
+
+
+class FlightRecorder:
+    """Keep the ``size`` slowest requests per route over a sliding window.
+
+    Each route has two fixed-size min-heaps (current and previous window);
+    they are swapped every ``window_seconds``, so old outliers age out and
+    memory never exceeds ``2 * size`` records per route. Recording is
+    O(log size) with a fixed size, i.e. constant time.
+    """
+
+    def __init__(self, size: int = 20, window_seconds: float = 300.0, clock=time.monotonic) -> None:
+        self.size = size
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._window_start = clock()
+        self._current: Dict[str, list] = {}
+        self._previous: Dict[str, list] = {}
+
+    def _rotate(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed < self.window_seconds:
+            return
+        # Skipping more than one window means nothing recent is left
+        self._previous = self._current if elapsed < 2 * self.window_seconds else {}
+        self._current = {}
+        self._window_start = now
+
+    def record(self, route: str, record: RequestRecord) -> None:
+        item = (record.duration_ms, next(self._seq), record)
+        with self._lock:
+            self._rotate(self._clock())
+            heap = self._current.setdefault(route, [])
+            if len(heap) < self.size:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    def snapshot(self, route: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Slowest requests per route, slowest first."""
+        with self._lock:
+            self._rotate(self._clock())
+            routes = set(self._current) | set(self._previous)
+            if route is not None:
+                routes &= {route}
+            merged = {
+                r: heapq.nlargest(self.size, self._current.get(r, []) + self._previous.get(r, []))
+                for r in routes
+            }
+        return {r: [rec.to_dict() for _, _, rec in items] for r, items in sorted(merged.items())}
+
+    def configure(self, size: int, window_seconds: float) -> None:
+        with self._lock:
+            self.size = size
+            self.window_seconds = window_seconds
+            self._current, self._previous = {}, {}
+
+
+recorder = FlightRecorder()
+
+
+class FlightRecorderMiddleware:
+    """Pure ASGI middleware feeding `recorder` with one record per HTTP request."""
+
+    def __init__(self, app, recorder: FlightRecorder = recorder) -> None:
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query = scope.get("query_string", b"").decode("latin-1")
+        path = scope.get("path", "") + (f"?{_mask_pii(query)}" if query else "")
+        record = RequestRecord(scope.get("method", ""), path)
+        token = _current_record.set(record)
+        start = time.perf_counter()
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                record.request_bytes += len(message.get("body", b""))
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                record.status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                record.response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, recording_send)
+        finally:
+            record.duration_ms = (time.perf_counter() - start) * 1000
+            record.request_id = correlation_id.get()
+            _current_record.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            self.recorder.record(f"{record.method} {route_path}", record)
+
+
+__all__ = [
+    "FlightRecorder",
+    "FlightRecorderMiddleware",
+    "RequestRecord",
+    "recorder",
+    "note",
+    "note_stage",
+    "note_call",
+    "note_queue_wait",
+]
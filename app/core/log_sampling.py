@@ -0,0 +1,163 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+
+import structlog
+
+from app.core.metrics import LOG_RECORDS_SAMPLED_OUT
+
+
+@dataclass
+class SamplingRule:
+    """Sampling policy for a logger name (prefix match).
+
+    - ``rate``: events per second allowed per event key (token bucket), or
+      ``None`` for no rate limit.
+    - ``burst``: bucket capacity, i.e. events allowed back-to-back.
+    - ``sample``: probability of keeping an event that passed the rate limit.
+    """
+
+    rate: Optional[float] = None
+    burst: int = 10
+    sample: float = 1.0
+
+
+class _KeyState:
+    __slots__ = ("tokens", "updated", "suppressed")
+
+    def __init__(self, burst: int, now: float) -> None:
+        self.tokens = float(burst)
+        self.updated = now
+        self.suppressed = 0
+
+
+class LogSampler:
+    """Per-event-key rate limiting and probabilistic sampling of log events.
+
+    Events at WARNING or above, and events whose ``duration_ms`` reaches
+    ``slow_ms``, are always kept. Every kept event carries the number of
+    similar events dropped since the previous one (``suppressed``).
+
+    The same instance works as a structlog processor (keyed by logger name
+    and ``event``) and as a stdlib `logging.Filter` (keyed by logger name and
+    call site, since messages are usually pre-formatted f-strings).
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, SamplingRule],
+        slow_ms: Optional[float] = 1000.0,
+        max_keys: int = 10000,
+        clock=time.monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.rules = dict(rules)
+        self.slow_ms = slow_ms
+        self.max_keys = max_keys
+        self._clock = clock
+        self._random = (rng or random.Random()).random
+        self._keys: "OrderedDict[Hashable, _KeyState]" = OrderedDict()
+        self._rule_cache: Dict[str, Optional[SamplingRule]] = {}
+        self._lock = threading.Lock()
+        # Marks the stdlib record emitted for an event already sampled by the
+        # structlog processor, so the filter does not sample it twice.
+        self._local = threading.local()
+
+    @classmethod
+    def from_json(cls, raw: str, slow_ms: Optional[float] = 1000.0) -> "LogSampler":
+        """Build from ``{"logger.name": {"rate": 1, "burst": 5, "sample": 0.1}}``."""
+        data = json.loads(raw) if raw else {}
+        return cls({name: SamplingRule(**cfg) for name, cfg in data.items()}, slow_ms=slow_ms)
+
+    def rule_for(self, logger_name: str) -> Optional[SamplingRule]:
+        """Return the rule with the longest matching logger-name prefix."""
+        try:
+            return self._rule_cache[logger_name]
+        except KeyError:
+            pass
+        best = None
+        best_len = -1
+        for prefix, rule in self.rules.items():
+            if (logger_name == prefix or logger_name.startswith(prefix + ".") or prefix == "") and len(prefix) > best_len:
+                best, best_len = rule, len(prefix)
+        self._rule_cache[logger_name] = best
+        return best
+
+    def decide(self, logger_name: str, key: Hashable, level: int, duration_ms: Any = None) -> Optional[int]:
+        """Return the suppressed count to attach if the event is kept, else ``None``."""
+        rule = self.rule_for(logger_name)
+        if rule is None:
+            return 0
+        always = level >= logging.WARNING or (
+            self.slow_ms is not None and isinstance(duration_ms, (int, float)) and duration_ms >= self.slow_ms
+        )
+        with self._lock:
+            now = self._clock()
+            state = self._keys.get(key)
+            if state is None:
+                state = _KeyState(rule.burst, now)
+                self._keys[key] = state
+                if len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+            else:
+                self._keys.move_to_end(key)
+            keep = always
+            if not always:
+                keep = True
+                if rule.rate is not None:
+                    state.tokens = min(float(rule.burst), state.tokens + (now - state.updated) * rule.rate)
+                    state.updated = now
+                    if state.tokens >= 1.0:
+                        state.tokens -= 1.0
+                    else:
+                        keep = False
+                if keep and rule.sample < 1.0 and self._random() >= rule.sample:
+                    keep = False
+            if not keep:
+                state.suppressed += 1
+                LOG_RECORDS_SAMPLED_OUT.inc()
+                return None
+            suppressed, state.suppressed = state.suppressed, 0
+            return suppressed
+
+    # structlog processor
+    def __call__(self, logger, method_name, event_dict):
+        name = getattr(logger, "name", "") or ""
+        level = logging.getLevelName(str(event_dict.get("level", method_name)).upper())
+        if not isinstance(level, int):
+            level = logging.INFO
+        suppressed = self.decide(name, (name, event_dict.get("event")), level, event_dict.get("duration_ms"))
+        if suppressed is None:
+            raise structlog.DropEvent
+        if suppressed:
+            event_dict["suppressed"] = suppressed
+        self._local.passed = name
+        return event_dict
+
+    # stdlib logging.Filter protocol
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(self._local, "passed", None) == record.name:
+            self._local.passed = None
+            return True
+        suppressed = self.decide(
+            record.name,
+            (record.name, record.pathname, record.lineno),
+            record.levelno,
+            getattr(record, "duration_ms", None),
+        )
+        if suppressed is None:
+            return False
+        if suppressed:
+            record.suppressed = suppressed
+            if not isinstance(record.msg, dict):
+                record.msg = f"{record.getMessage()} (suppressed {suppressed} similar)"
+                record.args = ()
+        return True
+
+
+__all__ = ["LogSampler", "SamplingRule"]
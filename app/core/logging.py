@@ -1,34 +1,34 @@
+import atexit
 import logging
+import os
+import queue
 import sys
-import re
-from typing import Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
 
 import structlog
 
+from app.core.log_sampling import LogSampler
+from app.core.metrics import LOG_QUEUE_DEPTH, LOG_RECORDS_DROPPED, LOG_RECORDS_QUEUED
+from app.core.pii import mask_pii as _mask_pii
 
-def _mask_pii(text: str) -> str:
-    """Mask common PII patterns in a string: emails, phones, CPF/CNPJ-like numbers."""
-    if not text:
-        return text
-    masked = text
-    # Email
-    masked = re.sub(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", "[email_masked]", masked)
-    # Phone numbers (simple BR-ish patterns, keep last 2 digits)
-    masked = re.sub(r"(?:(?:\+?55)?\s*\(?\d{2}\)?\s*)?\d{4,5}[-\s]?\d{4}", "[phone_masked]", masked)
-    # CPF (###.###.###-##) and digits only
-    masked = re.sub(r"\b\d{3}\.\d{3}\.\d{3}-\d{2}\b", "[cpf_masked]", masked)
-    masked = re.sub(r"\b\d{11}\b", "[cpf_masked]", masked)
-    # CNPJ (##.###.###/####-##) and digits only
-    masked = re.sub(r"\b\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}\b", "[cnpj_masked]", masked)
-    masked = re.sub(r"\b\d{14}\b", "[cnpj_masked]", masked)
-    return masked
+
+def _mask_event_dict(event_dict: dict) -> dict:
+    """Mask string values of a structlog event dict in place."""
+    for k, v in list(event_dict.items()):
+        if isinstance(v, str):
+            event_dict[k] = _mask_pii(v)
+    return event_dict
 
 
 class PiiMaskingFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
         try:
+            if isinstance(record.msg, dict):
+                # Deferred structlog event (async mode): rendered by the formatter
+                _mask_event_dict(record.msg)
             # Mask the formatted message content
-            if record.args:
+            elif record.args:
                 # Force message formatting so getMessage picks args
                 msg = record.getMessage()
                 record.msg = _mask_pii(msg)
@@ -41,11 +41,137 @@ class PiiMaskingFilter(logging.Filter):
         return True
 
 
-def configure_logging(level: int = logging.INFO) -> None:
+class _DeferredRenderFormatter(logging.Formatter):
+    """Render structlog event dicts to JSON; plain records keep `%(message)s`.
+
+    Used on the listener side in async mode so JSON rendering happens off the
+    request path.
+    """
+
+    def __init__(self) -> None:
+        super().__init__("%(message)s")
+        self._render = structlog.processors.JSONRenderer()
+
+    def format(self, record: logging.LogRecord) -> str:
+        if isinstance(record.msg, dict):
+            return self._render(None, record.levelname.lower(), dict(record.msg))
+        return super().format(record)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """`QueueHandler` over a bounded queue with an explicit overflow policy.
+
+    - ``drop``: records arriving while the queue is full are discarded and
+      counted in ``dropped`` and the ``log_records_dropped_total`` metric.
+    - ``block``: the caller waits for room (up to ``block_timeout`` seconds
+      when set, after which the record is dropped and counted).
+    """
+
+    OVERFLOW_POLICIES = ("drop", "block")
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue[Any]",
+        overflow: str = "drop",
+        block_timeout: Optional[float] = None,
+    ) -> None:
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"invalid overflow policy: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only freeze %-style args (they may be mutated after the call returns);
+        # PII masking and rendering are left to the listener thread.
+        if record.args and not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = ()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record, timeout=self.block_timeout)
+        else:
+            self.queue.put_nowait(record)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.enqueue(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+        except Exception:
+            self.handleError(record)
+        else:
+            LOG_RECORDS_QUEUED.inc()
+
+
+class _DrainingQueueListener(QueueListener):
+    """`QueueListener` whose stop sentinel waits for room in a bounded queue."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[_DrainingQueueListener] = None
+
+
+def _restart_listener_after_fork() -> None:
+    """Give a forked child (gunicorn ``preload_app``) its own queue and thread.
+
+    Threads do not survive ``fork()`` and the inherited queue's lock may have
+    been held by one, so the child swaps in a fresh queue and starts a new
+    listener thread. Records still queued in the parent stay with the parent.
+    """
+    if _listener is None:
+        return
+    fresh: "queue.Queue[Any]" = queue.Queue(maxsize=_listener.queue.maxsize)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, BoundedQueueHandler):
+            handler.queue = fresh
+    _listener.queue = fresh
+    _listener._thread = None
+    LOG_QUEUE_DEPTH.set_function(fresh.qsize)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def _stdout_handler(formatter: logging.Formatter) -> logging.Handler:
+    handler = logging.StreamHandler(stream=sys.stdout)
+    handler.addFilter(PiiMaskingFilter())
+    handler.setFormatter(formatter)
+    return handler
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    *,
+    async_mode: bool = False,
+    queue_size: int = 10000,
+    overflow: str = "drop",
+    block_timeout: Optional[float] = None,
+    sampler: Optional[LogSampler] = None,
+) -> None:
     """Configure structlog + stdlib logging for JSON output and contextvars.
 
+    With ``async_mode=True`` log calls only enqueue the record on a bounded
+    queue; a background listener thread does PII masking, JSON rendering and
+    the write to stdout, so a slow stdout never blocks the event loop. See
+    `BoundedQueueHandler` for the ``overflow`` policies and call
+    `shutdown_logging` to flush pending records.
+
+    When a `LogSampler` is given it runs first in the structlog chain and as
+    the first filter on the root handler, so suppressed events cost neither
+    masking nor rendering.
+
     This function is safe to call multiple times (idempotent).
     """
+    global _listener
 
     timestamper = structlog.processors.TimeStamper(fmt="iso")
     pre_chain = [
@@ -57,21 +183,32 @@ def configure_logging(level: int = logging.INFO) -> None:
     def pii_processor(logger, method_name, event_dict):
         # Mask string values in structlog events
         try:
-            for k, v in list(event_dict.items()):
-                if isinstance(v, str):
-                    event_dict[k] = _mask_pii(v)
+            _mask_event_dict(event_dict)
         except Exception:
             pass
         return event_dict
 
-    structlog.configure(
-        processors=[
-            *pre_chain,
+    sampling = [sampler] if sampler is not None else []
+
+    if async_mode:
+        # Masking and rendering run in the listener thread (see PiiMaskingFilter
+        # and _DeferredRenderFormatter); exception info must still be captured
+        # in the calling thread.
+        tail = [
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ]
+    else:
+        tail = [
             pii_processor,
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.JSONRenderer(),
-        ],
+        ]
+
+    structlog.configure(
+        processors=[*pre_chain, *sampling, *tail],
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
@@ -80,12 +217,45 @@ def configure_logging(level: int = logging.INFO) -> None:
     # Configure root stdlib logging to go to stdout
     root = logging.getLogger()
     if not root.handlers:
-        handler = logging.StreamHandler(stream=sys.stdout)
-        handler.addFilter(PiiMaskingFilter())
-        handler.setFormatter(logging.Formatter("%(message)s"))
+        if async_mode:
+            log_queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+            handler: logging.Handler = BoundedQueueHandler(
+                log_queue, overflow=overflow, block_timeout=block_timeout
+            )
+            LOG_QUEUE_DEPTH.set_function(log_queue.qsize)
+            _listener = _DrainingQueueListener(
+                log_queue, _stdout_handler(_DeferredRenderFormatter()), respect_handler_level=True
+            )
+            _listener.start()
+            atexit.register(shutdown_logging)
+        else:
+            handler = _stdout_handler(logging.Formatter("%(message)s"))
+        if sampler is not None:
+            # Sample before any other filter (PII masking) runs
+            handler.filters.insert(0, sampler)
         root.addHandler(handler)
 
     root.setLevel(level)
 
 
-__all__ = ["configure_logging"]
+def shutdown_logging() -> None:
+    """Flush and stop the async logging listener, if running.
+
+    Pending records are written before returning. Records logged afterwards go
+    straight to stdout. Safe to call multiple times.
+    """
+    global _listener
+
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, BoundedQueueHandler):
+            root.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        root.addHandler(handler)
+
+
+__all__ = ["configure_logging", "shutdown_logging", "BoundedQueueHandler"]
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.core.metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG, EVENT_LOOP_PENDING_TASKS
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Measure event-loop lag and catch callbacks that block the loop.
+
+    A heartbeat task wakes every ``slow_threshold / 4`` seconds (or every
+    ``interval``, if shorter); every ``interval`` seconds it also records how
+    late it woke up (``event_loop_lag_seconds``) plus the number of pending
+    tasks. A watchdog thread checks the heartbeat at the same pace and, when
+    the loop has not run it for ``slow_threshold`` minus one heartbeat, logs
+    the loop thread's current stack once per stall, pointing at the blocking
+    call. With a heartbeat much shorter than the threshold a block is caught
+    wherever it starts: any block of ``slow_threshold`` or more is reported,
+    and nothing under half of it is.
+    """
+
+    def __init__(self, interval: float = 0.5, slow_threshold: float = 0.1, stack_limit: int = 30) -> None:
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.stack_limit = stack_limit
+        self.beat = min(interval, slow_threshold / 4)
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_sample = loop.time()
+        while True:
+            expected = loop.time() + self.beat
+            await asyncio.sleep(self.beat)
+            now = loop.time()
+            self._heartbeat = time.monotonic()
+            if now >= next_sample:
+                EVENT_LOOP_LAG.observe(max(0.0, now - expected))
+                EVENT_LOOP_PENDING_TASKS.set(len(asyncio.all_tasks(loop)))
+                next_sample = now + self.interval
+
+    def _watch(self) -> None:
+        reported_beat = None
+        # Checked every `beat`, so a block of slow_threshold stays past this
+        # mark for at least one check
+        deadline = self.slow_threshold - self.beat
+        while not self._stop.wait(self.beat):
+            beat = self._heartbeat
+            silent = time.monotonic() - beat
+            if silent < deadline or beat == reported_beat:
+                continue
+            reported_beat = beat
+            EVENT_LOOP_BLOCKED.inc()
+            # The loop missed its wake-up at beat + self.beat and has been busy since
+            stalled = max(0.0, silent - self.beat)
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=self.stack_limit)) if frame else "<unavailable>"
+            del frame
+            logger.warning(
+                "Event loop blocked for at least %.3fs; loop thread stack:\n%s",
+                stalled,
+                stack,
+                extra={"duration_ms": stalled * 1000},
+            )
+
+    def start(self) -> None:
+        """Start monitoring the running loop (call from within the loop)."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+
+__all__ = ["LoopMonitor"]
@@ -0,0 +1,284 @@
+import functools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.flight_recorder import note_call
+from app.core.tracing import span
+
+# Metrics are registered on the default registry, which is what the
+# `Instrumentator` exposes at `/metrics`. Gauges declare a multiprocess mode so
+# they aggregate correctly when PROMETHEUS_MULTIPROC_DIR is set.
+
+# Async logging queue
+LOG_RECORDS_QUEUED = Counter(
+    "log_records_queued_total",
+    "Log records handed to the async logging queue.",
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the async logging queue was full.",
+)
+LOG_RECORDS_SAMPLED_OUT = Counter(
+    "log_records_sampled_out_total",
+    "Log records suppressed by the log sampler.",
+)
+LOG_QUEUE_DEPTH = Gauge(
+    "log_queue_depth",
+    "Log records waiting in the async logging queue.",
+    multiprocess_mode="livesum",
+)
+
+# Outbound dependencies (chatwoot, n8n, openai)
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_request_duration_seconds",
+    "Duration of calls to external dependencies.",
+    ["dependency", "operation"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+DEPENDENCY_REQUESTS = Counter(
+    "dependency_requests_total",
+    "Calls to external dependencies by outcome (HTTP status code, 2xx or exception name).",
+    ["dependency", "operation", "status"],
+)
+DEPENDENCY_IN_FLIGHT = Gauge(
+    "dependency_requests_in_flight",
+    "Calls to external dependencies currently in progress.",
+    ["dependency", "operation"],
+    multiprocess_mode="livesum",
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "Tokens reported in the OpenAI usage field.",
+    ["operation", "model", "kind"],
+)
+
+OPENAI_CACHED_RATIO = Histogram(
+    "openai_prompt_cached_ratio",
+    "Share of prompt tokens served from the provider's prompt cache, per call.",
+    ["operation", "model"],
+    buckets=(0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+PROMPT_TEMPLATE_INFO = Gauge(
+    "openai_prompt_template_info",
+    "Registered prompt templates and their version hash (value is always 1).",
+    ["template", "version"],
+    multiprocess_mode="max",
+)
+
+# Background health prober
+DEPENDENCY_UP = Gauge(
+    "dependency_up",
+    "Last health probe result per dependency (1 up, 0 down).",
+    ["dependency"],
+    multiprocess_mode="livemin",
+)
+DEPENDENCY_PROBE_LATENCY = Gauge(
+    "dependency_probe_latency_seconds",
+    "Latency of the last health probe per dependency.",
+    ["dependency"],
+    multiprocess_mode="livemax",
+)
+
+# Event loop health
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when the loop monitor should have woken up and when it did.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_PENDING_TASKS = Gauge(
+    "event_loop_pending_tasks",
+    "asyncio tasks not yet done.",
+    multiprocess_mode="livesum",
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total",
+    "Times the event loop was blocked longer than the slow-callback threshold.",
+)
+
+# Admission control (app/core/admission.py)
+ADMISSION_REQUESTS = Counter(
+    "admission_requests_total",
+    "Admission decisions: admitted (immediately), queued (admitted after waiting) or shed.",
+    ["route", "priority", "outcome"],
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time requests spent queued before being admitted or shed.",
+    ["route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+ADMISSION_LIMIT = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive concurrency limit.",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests currently holding an admission slot.",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot.",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+
+# Message debouncing of the agentbot webhook (api/services/debounce.py)
+TURN_MESSAGES = Histogram(
+    "agentbot_turn_messages",
+    "User messages merged into one agentbot turn by the debounce window.",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 20),
+)
+DEBOUNCE_WAIT = Histogram(
+    "agentbot_debounce_wait_seconds",
+    "Latency added to a turn while waiting for follow-up messages.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0),
+)
+
+# Prompt budgeting of OpenAIClient (api/services/prompt_budget.py)
+PROMPT_TOKENS_SAVED = Counter(
+    "openai_prompt_tokens_saved_total",
+    "Prompt tokens removed before sending: whitespace normalization or truncation of oversized fields.",
+    ["operation", "reason"],
+)
+PROMPT_TRUNCATIONS = Counter(
+    "openai_prompt_truncations_total",
+    "Prompt fields truncated to fit the operation's input budget.",
+    ["operation", "field"],
+)
+PROMPT_MAX_TOKENS = Gauge(
+    "openai_max_tokens",
+    "max_tokens sent on the latest call, adjusted from observed completion lengths.",
+    ["operation"],
+    multiprocess_mode="livemax",
+)
+
+# Follow-up scheduler (api/services/follow_up_scheduler.py)
+FOLLOW_UPS = Counter(
+    "follow_ups_total",
+    "Follow-ups by outcome: scheduled, cancelled, sent, skipped "
+    "(claimed elsewhere or cancelled while firing), retried, failed.",
+    ["outcome"],
+)
+FOLLOW_UPS_PENDING = Gauge(
+    "follow_ups_pending",
+    "Follow-ups waiting in the timing wheel of this process.",
+    multiprocess_mode="livesum",
+)
+FOLLOW_UP_LAG = Histogram(
+    "follow_up_fire_lag_seconds",
+    "Delay between a follow-up's due time and the moment it was fired.",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 300, 900),
+)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def _status_of(exc: BaseException) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return str(exc.response.status_code)
+    # openai.APIStatusError and friends expose `status_code`
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return str(status)
+    return type(exc).__name__
+
+
+@asynccontextmanager
+async def track_dependency(dependency: str, operation: str) -> AsyncIterator[None]:
+    """Record latency, in-flight count and outcome of one dependency call.
+
+    The call is also wrapped in a ``<dependency>.<operation>`` tracing span
+    and reported to the flight recorder.
+    """
+    in_flight = DEPENDENCY_IN_FLIGHT.labels(dependency, operation)
+    in_flight.inc()
+    status = "2xx"
+    start = time.perf_counter()
+    try:
+        with span(f"{dependency}.{operation}"):
+            yield
+    except BaseException as exc:
+        status = _status_of(exc)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        in_flight.dec()
+        DEPENDENCY_LATENCY.labels(dependency, operation).observe(elapsed)
+        DEPENDENCY_REQUESTS.labels(dependency, operation, status).inc()
+        note_call(f"{dependency}.{operation}", elapsed * 1000, status)
+
+
+def instrument_dependency(dependency: str, operation: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator form of `track_dependency`; ``operation`` defaults to the function name."""
+
+    def decorator(fn: F) -> F:
+        op = operation or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            async with track_dependency(dependency, op):
+                return await fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def record_openai_usage(operation: str, model: str, usage: Any) -> None:
+    """Count prompt/completion/cached tokens from an OpenAI ``usage`` object (if present)."""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            OPENAI_TOKENS.labels(operation, model, kind).inc(tokens)
+    # Provider-side prompt cache hits (prefix identical to a recent call)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+    if cached:
+        OPENAI_TOKENS.labels(operation, model, "cached").inc(cached)
+    if prompt_tokens:
+        OPENAI_CACHED_RATIO.labels(operation, model).observe(cached / prompt_tokens)
+
+
+__all__ = [
+    "LOG_RECORDS_QUEUED",
+    "LOG_RECORDS_DROPPED",
+    "LOG_RECORDS_SAMPLED_OUT",
+    "LOG_QUEUE_DEPTH",
+    "DEPENDENCY_LATENCY",
+    "DEPENDENCY_REQUESTS",
+    "DEPENDENCY_IN_FLIGHT",
+    "OPENAI_TOKENS",
+    "OPENAI_CACHED_RATIO",
+    "PROMPT_TEMPLATE_INFO",
+    "DEPENDENCY_UP",
+    "DEPENDENCY_PROBE_LATENCY",
+    "EVENT_LOOP_LAG",
+    "EVENT_LOOP_PENDING_TASKS",
+    "EVENT_LOOP_BLOCKED",
+    "ADMISSION_REQUESTS",
+    "ADMISSION_QUEUE_WAIT",
+    "ADMISSION_LIMIT",
+    "ADMISSION_IN_FLIGHT",
+    "ADMISSION_QUEUE_DEPTH",
+    "TURN_MESSAGES",
+    "DEBOUNCE_WAIT",
+    "PROMPT_TOKENS_SAVED",
+    "PROMPT_TRUNCATIONS",
+    "PROMPT_MAX_TOKENS",
+    "FOLLOW_UPS",
+    "FOLLOW_UPS_PENDING",
+    "FOLLOW_UP_LAG",
+    "track_dependency",
+    "instrument_dependency",
+    "record_openai_usage",
+]
@@ -3,12 +3,17 @@ from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.gzip import GZipMiddleware
 from asgi_correlation_id import CorrelationIdMiddleware
 
+from app.core.flight_recorder import FlightRecorderMiddleware, recorder
 from app.core.settings import settings
 
 
 def add_middlewares(app: FastAPI) -> None:
     """Register common middlewares on the FastAPI application."""
 
+    # slow-request flight recorder; innermost so the request id is already set
+    recorder.configure(settings.FLIGHT_RECORDER_SIZE, settings.FLIGHT_RECORDER_WINDOW_SECONDS)
+    app.add_middleware(FlightRecorderMiddleware)
+
     # correlation id (request id) support
     app.add_middleware(CorrelationIdMiddleware)
 
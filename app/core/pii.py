@@ -0,0 +1,22 @@
+import re
+
+
+def mask_pii(text: str) -> str:
+    """Mask common PII patterns in a string: emails, phones, CPF/CNPJ-like numbers."""
+    if not text:
+        return text
+    masked = text
+    # Email
+    masked = re.sub(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", "[email_masked]", masked)
+    # Phone numbers (simple BR-ish patterns, keep last 2 digits)
+    masked = re.sub(r"(?:(?:\+?55)?\s*\(?\d{2}\)?\s*)?\d{4,5}[-\s]?\d{4}", "[phone_masked]", masked)
+    # CPF (###.###.###-##) and digits only
+    masked = re.sub(r"\b\d{3}\.\d{3}\.\d{3}-\d{2}\b", "[cpf_masked]", masked)
+    masked = re.sub(r"\b\d{11}\b", "[cpf_masked]", masked)
+    # CNPJ (##.###.###/####-##) and digits only
+    masked = re.sub(r"\b\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}\b", "[cnpj_masked]", masked)
+    masked = re.sub(r"\b\d{14}\b", "[cnpj_masked]", masked)
+    return masked
+
+
+__all__ = ["mask_pii"]
@@ -0,0 +1,144 @@
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Collapsed stacks beyond this many distinct entries are folded together
+MAX_DISTINCT_STACKS = 5000
+MAX_STACK_DEPTH = 128
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile or snapshot is already in progress."""
+
+
+class SamplingProfiler:
+    """Time-bounded statistical profiler for a single thread.
+
+    Samples the target thread's stack from a separate thread via
+    `sys._current_frames`, so the profiled thread (usually the event loop)
+    runs uninstrumented. Output is in collapsed-stack format
+    (``frame;frame;frame count``), ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, max_seconds: float = 30.0, min_interval: float = 0.001) -> None:
+        self.max_seconds = max_seconds
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+    def profile(self, thread_id: int, seconds: float, interval: float = 0.005) -> str:
+        """Sample ``thread_id`` for ``seconds`` (blocking; call from a worker thread)."""
+        seconds = max(0.0, min(seconds, self.max_seconds))
+        interval = max(interval, self.min_interval)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already running")
+        try:
+            stacks: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                if frame is None:
+                    break
+                labels: List[str] = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(self._frame_label(frame))
+                    frame = frame.f_back
+                key = ";".join(reversed(labels))
+                if key in stacks or len(stacks) < MAX_DISTINCT_STACKS:
+                    stacks[key] += 1
+                else:
+                    stacks["[truncated]"] += 1
+                del frame
+                time.sleep(interval)
+            return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        finally:
+            self._lock.release()
+
+
+class MemoryProfiler:
+    """`tracemalloc` snapshots diffed against the previous snapshot.
+
+    Tracing starts on the first snapshot and stops automatically after
+    ``max_seconds`` (or on `stop`), bounding the allocation overhead.
+    """
+
+    def __init__(self, nframes: int = 10, max_seconds: float = 600.0) -> None:
+        self.nframes = nframes
+        self.max_seconds = max_seconds
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._started_at: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def _filtered_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ]
+        )
+
+    def snapshot(self, limit: int = 25, key_type: str = "lineno") -> Dict[str, Any]:
+        """Take a snapshot (blocking) and return the top growth since the previous one."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("a snapshot is already running")
+        try:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.nframes)
+                self._started_at = time.time()
+                self._previous = None
+                self._timer = threading.Timer(self.max_seconds, self.stop)
+                self._timer.daemon = True
+                self._timer.start()
+            current = self._filtered_snapshot()
+            if self._previous is None:
+                stats = [
+                    {"location": str(s.traceback), "size_kb": round(s.size / 1024, 1), "count": s.count}
+                    for s in current.statistics(key_type)[:limit]
+                ]
+            else:
+                stats = [
+                    {
+                        "location": str(s.traceback),
+                        "size_kb": round(s.size / 1024, 1),
+                        "size_diff_kb": round(s.size_diff / 1024, 1),
+                        "count_diff": s.count_diff,
+                    }
+                    for s in current.compare_to(self._previous, key_type)[:limit]
+                ]
+            compared = self._previous is not None
+            self._previous = current
+            traced, peak = tracemalloc.get_traced_memory()
+            return {
+                "tracing_since": self._started_at,
+                "compared_to_previous": compared,
+                "traced_kb": round(traced / 1024, 1),
+                "peak_kb": round(peak / 1024, 1),
+                "top": stats,
+            }
+        finally:
+            self._lock.release()
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._previous = None
+        self._started_at = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+__all__ = ["SamplingProfiler", "MemoryProfiler", "ProfilerBusy"]
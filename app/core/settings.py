@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
 from pydantic import AnyUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -23,17 +25,141 @@ class Settings(BaseSettings):
     DB_NAME: str = "app"
     DB_USER: str = "app"
     DB_PASSWORD: str = "change-me"
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+
+    # Lead persistence (api/services/lead_store.py)
+    LEAD_STORE_ENABLED: bool = False
+    # Qualify the lead (one LLM call over the local transcript) when it is created or schedules a meeting
+    LEAD_QUALIFICATION_ENABLED: bool = True
+
+    # Lead export endpoint (/api/v1/exports/leads); disabled while EXPORT_TOKEN is unset
+    EXPORT_TOKEN: Optional[str] = None
+    EXPORT_BATCH_SIZE: int = 1000
 
     # Redis
     REDIS_URL: str = "redis://redis:6379/0"
 
+    # Conversation state cache (api/services/state_store.py)
+    STATE_STORE_ENABLED: bool = False
+    STATE_STORE_TTL_SECONDS: int = 30 * 24 * 3600
+    STATE_SYNC_INTERVAL: float = 1.0
+
+    # Admission control of the agentbot webhook (app/core/admission.py)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_INITIAL_LIMIT: int = 50
+    ADMISSION_MIN_LIMIT: int = 5
+    ADMISSION_MAX_LIMIT: int = 500
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_MAX_QUEUE: int = 100
+
+    # Local conversation transcripts (api/services/transcripts.py)
+    TRANSCRIPTS_ENABLED: bool = False
+    TRANSCRIPTS_PATH: str = "data/transcripts.db"
+    TRANSCRIPTS_RETENTION_DAYS: float = 90
+    TRANSCRIPTS_MAX_MESSAGES: int = 200
+    TRANSCRIPTS_COMPACT_INTERVAL: float = 3600.0
+
+    # Follow-up scheduler (api/services/follow_up_scheduler.py)
+    FOLLOW_UP_ENABLED: bool = False
+    FOLLOW_UP_STORE: str = "sqlite"  # sqlite | redis
+    FOLLOW_UP_PATH: str = "data/follow_ups.db"
+    FOLLOW_UP_DELAY_SECONDS: float = 24 * 3600
+    FOLLOW_UP_TYPE: str = "reengajamento"
+    FOLLOW_UP_BATCH_SIZE: int = 100
+    FOLLOW_UP_CONCURRENCY: int = 10
+    FOLLOW_UP_MAX_ATTEMPTS: int = 3
+    FOLLOW_UP_NOTIFY_N8N: bool = False
+
+    # Prompt budgets of OpenAIClient in tokens per operation (api/services/prompt_budget.py)
+    PROMPT_BUDGETS: Dict[str, int] = {
+        "analyze_message_intent": 1000,
+        "generate_response": 1500,
+        "handle_objection": 1200,
+        "qualify_lead": 3000,
+        "qualify_lead_incremental": 2000,
+        "generate_follow_up_message": 1200,
+        "extract_contact_info": 800,
+    }
+    PROMPT_DEFAULT_BUDGET: int = 2000
+    PROMPT_DYNAMIC_MAX_TOKENS: bool = True
+
+    # Incremental lead qualification over the transcript (api/domain/bot_logic.py)
+    QUALIFY_INCREMENTAL: bool = True
+    QUALIFY_SUMMARY_THRESHOLD_TOKENS: int = 600
+    QUALIFY_MAX_NEW_MESSAGES: int = 40
+
+    # Debounce of message bursts per conversation (api/services/debounce.py); 0 = off.
+    # Per process: with several gunicorn workers only messages landing on the same worker are merged
+    DEBOUNCE_WINDOW_MS: int = 0
+    DEBOUNCE_MAX_WAIT_MS: int = 5000
+    DEBOUNCE_MAX_MESSAGES: int = 10
+
+    # Multi-tenant routing (api/services/tenants.py); empty file = single tenant from env
+    TENANTS_FILE: str = ""
+    TENANTS_RELOAD_SECONDS: float = 5.0
+    TENANT_SCHEDULER_CONCURRENCY: int = 32
+    TENANT_HTTP_MAX_CONNECTIONS: int = 20
+
+    # Worker (app/workers/worker.py)
+    WORKER_CONCURRENCY: int = 50
+    WORKER_VISIBILITY_TIMEOUT: float = 60.0
+    WORKER_MAX_ATTEMPTS: int = 5
+    WORKER_RETRY_BASE_DELAY: float = 1.0
+    WORKER_DRAIN_TIMEOUT: float = 30.0
+
     # Chatwoot
     CHATWOOT_WEBHOOK_SECRET: str
+    CHATWOOT_BASE_URL: Optional[str] = None
+    CHATWOOT_ACCESS_TOKEN: Optional[str] = None
+
+    # n8n
+    N8N_BASE_URL: Optional[str] = None
+    N8N_API_KEY: Optional[str] = None
+
+    # Background health prober (api/services/health_prober.py); per-dependency
+    # intervals fall back to HEALTH_PROBE_INTERVAL
+    HEALTH_PROBE_INTERVAL: float = 10.0
+    HEALTH_PROBE_INTERVAL_CHATWOOT: Optional[float] = None
+    HEALTH_PROBE_INTERVAL_N8N: Optional[float] = None
+    HEALTH_PROBE_INTERVAL_REDIS: Optional[float] = None
 
     # Observability
     SENTRY_DSN: Optional[str] = None
     PROMETHEUS_ENABLED: bool = True
 
+    # Logging
+    LOG_ASYNC: bool = False
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_QUEUE_OVERFLOW: str = "drop"  # drop | block
+    LOG_QUEUE_BLOCK_TIMEOUT: Optional[float] = None
+    # JSON: {"logger.name": {"rate": <events/s per key>, "burst": <n>, "sample": <0..1>}}
+    LOG_SAMPLING_RULES: str = ""
+    LOG_SLOW_MS: float = 1000.0
+
+    # Event loop monitor
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.5
+    LOOP_SLOW_CALLBACK_SECONDS: float = 0.1
+
+    # Tracing
+    TRACING_EXPORTER: str = ""  # memory | jsonl | otlp (empty disables)
+    TRACING_SAMPLE_RATE: float = 0.1
+    TRACING_JSONL_PATH: str = "logs/spans.jsonl"
+    TRACING_RING_SIZE: int = 2048
+    TRACING_OTLP_ENDPOINT: Optional[str] = None
+
+    # Debug endpoints (/api/v1/debug/*); disabled while DEBUG_TOKEN is unset
+    DEBUG_TOKEN: Optional[str] = None
+    FLIGHT_RECORDER_SIZE: int = 20
+    FLIGHT_RECORDER_WINDOW_SECONDS: float = 300.0
+    DEBUG_PROFILING_ENABLED: bool = False
+    PROFILING_MAX_SECONDS: float = 30.0
+    TRACEMALLOC_MAX_SECONDS: float = 600.0
+
+    # Startup: import heavy SDKs (openai) in a background thread after boot
+    WARM_IMPORTS: bool = True
+
     # Pydantic settings config
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -49,5 +175,21 @@ class Settings(BaseSettings):
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
 
+    @property
+    def database_dsn(self) -> str:
+        """Return a plain libpq DSN (as expected by asyncpg)."""
+        return self.database_url.replace("postgresql+psycopg://", "postgresql://", 1)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build the settings on first use (reads env/.env once per process)."""
+    return Settings()
+
 
-settings = Settings()
+def __getattr__(name: str) -> Any:
+    # Keep `from app.core.settings import settings` working without
+    # instantiating Settings() when the module is merely imported.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
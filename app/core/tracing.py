@@ -0,0 +1,323 @@
+import functools
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+
+import httpx
+from asgi_correlation_id import correlation_id
+
+from app.core.flight_recorder import note_stage
+
+
+class Span:
+    """A timed unit of work. Times are epoch nanoseconds."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Receives finished spans. ``export`` is called on the request path and must be cheap."""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keep the last ``maxlen`` finished spans in a ring buffer."""
+
+    def __init__(self, maxlen: int = 2048) -> None:
+        self._spans: Deque[Span] = deque(maxlen=maxlen)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self) -> List[Span]:
+        return list(self._spans)
+
+
+class _BatchingExporter(SpanExporter):
+    """Buffer spans and write them in batches from a background thread.
+
+    The buffer is bounded; when the writer falls behind the oldest spans are
+    dropped rather than growing memory or blocking requests.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, max_buffer: int = 10000) -> None:
+        self._buffer: Deque[Span] = deque(maxlen=max_buffer)
+        self._interval = flush_interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        self._buffer.append(span)
+
+    def _drain(self) -> None:
+        batch = []
+        while self._buffer:
+            try:
+                batch.append(self._buffer.popleft())
+            except IndexError:
+                break
+        if batch:
+            try:
+                self._write(batch)
+            except Exception:
+                # Never let tracing break the process
+                pass
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._drain()
+
+    def _write(self, batch: List[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._drain()
+
+
+class JsonlSpanExporter(_BatchingExporter):
+    """Append spans as JSON lines to ``path``."""
+
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        super().__init__(**kwargs)
+
+    def _write(self, batch: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in batch))
+
+
+class OtlpSpanExporter(_BatchingExporter):
+    """Send spans to an OTLP/HTTP collector (JSON encoding, ``<endpoint>/v1/traces``)."""
+
+    def __init__(self, endpoint: str, service_name: str = "mrdom-sdr-api", **kwargs: Any) -> None:
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=5.0)
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def _attr(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _write(self, batch: List[Span]) -> None:
+        spans = [
+            {
+                "traceId": s.trace_id.replace("-", "")[:32].rjust(32, "0"),
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [self._attr(k, v) for k, v in s.attributes.items()],
+                "status": {"code": 2 if s.status == "error" else 1},
+            }
+            for s in batch
+        ]
+        body = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [self._attr("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+        self._client.post(self.url, json=body)
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        self._client.close()
+
+
+# Marks a trace that lost the sampling decision so nested spans skip work too
+_UNSAMPLED = object()
+_current_span: ContextVar[Any] = ContextVar("current_span", default=None)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+class Tracer:
+    """Create spans and hand finished ones to an exporter.
+
+    The sampling decision is taken once per trace, at the root span. The trace
+    id is the request id set by `CorrelationIdMiddleware` when available, so
+    spans can be joined with request logs. Without an exporter, `span` is a
+    near no-op.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._random = random.random
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        parent = _current_span.get()
+        exporter = self.exporter
+        if parent is _UNSAMPLED or exporter is None:
+            yield None
+            return
+        if parent is None:
+            if self._random() >= self.sample_rate:
+                token = _current_span.set(_UNSAMPLED)
+                try:
+                    yield None
+                finally:
+                    _current_span.reset(token)
+                return
+            trace_id = correlation_id.get() or secrets.token_hex(16)
+            parent_id = None
+        else:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+
+        current = Span(name, trace_id, parent_id, attributes)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as exc:
+            current.status = "error"
+            current.attributes["error"] = type(exc).__name__
+            raise
+        finally:
+            current.end_ns = time.time_ns()
+            _current_span.reset(token)
+            exporter.export(current)
+
+    def configure(self, exporter: Optional[SpanExporter], sample_rate: float = 1.0) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def shutdown(self) -> None:
+        exporter, self.exporter = self.exporter, None
+        if exporter is not None:
+            exporter.shutdown()
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attributes: Any):
+    """Open a span on the process-wide tracer (context manager)."""
+    return tracer.span(name, **attributes)
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Span for a request pipeline stage.
+
+    Unlike a plain span, the stage duration is always reported to the flight
+    recorder, whether or not the trace is sampled.
+    """
+    start = time.perf_counter()
+    try:
+        with tracer.span(name, **attributes) as current:
+            yield current
+    finally:
+        note_stage(name, (time.perf_counter() - start) * 1000)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator wrapping an async function in a span."""
+
+    def decorator(fn: F) -> F:
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with tracer.span(span_name):
+                return await fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def build_exporter(
+    kind: str,
+    jsonl_path: str = "logs/spans.jsonl",
+    ring_size: int = 2048,
+    otlp_endpoint: Optional[str] = None,
+) -> Optional[SpanExporter]:
+    """Build an exporter from its name: ``memory``, ``jsonl``, ``otlp`` or empty (disabled)."""
+    kind = (kind or "").strip().lower()
+    if not kind or kind == "none":
+        return None
+    if kind == "memory":
+        return InMemorySpanExporter(maxlen=ring_size)
+    if kind == "jsonl":
+        return JsonlSpanExporter(jsonl_path)
+    if kind == "otlp":
+        if not otlp_endpoint:
+            raise ValueError("TRACING_OTLP_ENDPOINT is required for the otlp exporter")
+        return OtlpSpanExporter(otlp_endpoint)
+    raise ValueError(f"unknown tracing exporter: {kind}")
+
+
+__all__ = [
+    "Span",
+    "SpanExporter",
+    "InMemorySpanExporter",
+    "JsonlSpanExporter",
+    "OtlpSpanExporter",
+    "Tracer",
+    "tracer",
+    "span",
+    "stage",
+    "traced",
+    "build_exporter",
+]
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import time
+import uuid
+from typing import Any, Dict, Optional, Set
+
+import httpx
+
+from app.workers.tasks import TASKS, TaskContext
+
+logger = logging.getLogger(__name__)
+
+# Move due jobs from the delayed zset back to the queue (atomic, bounded batch)
+_PROMOTE_SCRIPT = """
+local jobs = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job in ipairs(jobs) do
+    redis.call('ZREM', KEYS[1], job)
+    redis.call('LPUSH', KEYS[2], job)
+end
+return #jobs
+"""
+
+# Requeue jobs whose lease expired; only the caller that removes the lease requeues
+_REAP_SCRIPT = """
+local jobs = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job in ipairs(jobs) do
+    if redis.call('ZREM', KEYS[1], job) == 1 then
+        redis.call('LREM', KEYS[2], 1, job)
+        redis.call('RPUSH', KEYS[3], job)
+    end
+end
+return #jobs
+"""
+
+
+class QueueKeys:
+    def __init__(self, name: str) -> None:
+        self.pending = f"queue:{name}"
+        self.processing = f"queue:{name}:processing"
+        self.leases = f"queue:{name}:leases"
+        self.delayed = f"queue:{name}:delayed"
+        self.dead = f"queue:{name}:dead"
+
+
+def make_job(task: str, payload: Dict[str, Any]) -> str:
+    return json.dumps(
+        {"id": uuid.uuid4().hex, "task": task, "payload": payload, "attempts": 0, "enqueued_at": time.time()},
+        separators=(",", ":"),
+    )
+
+
+async def enqueue(redis: Any, task: str, payload: Dict[str, Any], queue: str = "events") -> None:
+    """Push a job for `AsyncWorker` (``redis`` is a ``redis.asyncio`` client)."""
+    await redis.lpush(QueueKeys(queue).pending, make_job(task, payload))
+
+
+class AsyncWorker:
+    """asyncio job runtime with reliable delivery over Redis lists.
+
+    - Jobs are moved atomically from the queue to a processing list
+      (BRPOPLPUSH) and get a lease (visibility timeout) in a zset.
+    - Up to ``concurrency`` jobs run at once, sharing one pooled HTTP client.
+    - Acknowledgement removes the job from the processing list and its lease.
+      Expired leases (crashed or stuck workers) are requeued by any worker.
+    - Failures are retried with exponential backoff and jitter via a delayed
+      zset. After ``max_attempts`` the job goes to a dead-letter list.
+    - SIGTERM/SIGINT stop fetching and wait up to ``drain_timeout`` for
+      in-flight jobs. Unfinished jobs are redelivered after their lease expires.
+    """
+
+    def __init__(
+        self,
+        redis: Any,
+        queue: str = "events",
+        concurrency: int = 50,
+        visibility_timeout: float = 60.0,
+        max_attempts: int = 5,
+        retry_base_delay: float = 1.0,
+        retry_max_delay: float = 300.0,
+        drain_timeout: float = 30.0,
+        poll_timeout: int = 1,
+        http: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        self.redis = redis
+        self.keys = QueueKeys(queue)
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.drain_timeout = drain_timeout
+        self.poll_timeout = poll_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._http = http
+        self._owns_http = http is None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._running: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._promote = redis.register_script(_PROMOTE_SCRIPT)
+        self._reap = redis.register_script(_REAP_SCRIPT)
+        self.processed = 0
+        self.failed = 0
+
+    @classmethod
+    def from_settings(cls) -> "AsyncWorker":
+        import redis.asyncio as aioredis
+
+        from app.core.settings import settings
+
+        return cls(
+            aioredis.from_url(settings.REDIS_URL),
+            concurrency=settings.WORKER_CONCURRENCY,
+            visibility_timeout=settings.WORKER_VISIBILITY_TIMEOUT,
+            max_attempts=settings.WORKER_MAX_ATTEMPTS,
+            retry_base_delay=settings.WORKER_RETRY_BASE_DELAY,
+            drain_timeout=settings.WORKER_DRAIN_TIMEOUT,
+        )
+
+    def backoff(self, attempts: int) -> float:
+        """Full-jitter exponential backoff for the given attempt count."""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1)))
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def _ack(self, raw: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.keys.processing, 1, raw)
+            pipe.zrem(self.keys.leases, raw)
+            await pipe.execute()
+
+    async def _retry_or_bury(self, raw: str, job: Dict[str, Any], error: BaseException) -> None:
+        job["attempts"] = job.get("attempts", 0) + 1
+        job["last_error"] = f"{type(error).__name__}: {error}"[:500]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.keys.processing, 1, raw)
+            pipe.zrem(self.keys.leases, raw)
+            if job["attempts"] < self.max_attempts:
+                retry_at = time.time() + self.backoff(job["attempts"])
+                pipe.zadd(self.keys.delayed, {json.dumps(job, separators=(",", ":")): retry_at})
+            else:
+                pipe.lpush(self.keys.dead, json.dumps(job, separators=(",", ":")))
+            await pipe.execute()
+
+    async def _extend_lease(self, raw: str) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            await self.redis.zadd(self.keys.leases, {raw: time.time() + self.visibility_timeout}, xx=True)
+
+    async def _run_job(self, raw: str, ctx: TaskContext) -> None:
+        keeper = asyncio.create_task(self._extend_lease(raw))
+        job: Dict[str, Any] = {}
+        try:
+            job = json.loads(raw)
+            handler = TASKS.get(job.get("task"))
+            if handler is None:
+                raise LookupError(f"unknown task: {job.get('task')}")
+            await handler(job.get("payload") or {}, ctx)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Job {job.get('id')} ({job.get('task')}) falhou: {type(e).__name__}: {e}")
+            await self._retry_or_bury(raw, job if isinstance(job, dict) else {"raw": raw}, e)
+        else:
+            self.processed += 1
+            await self._ack(raw)
+        finally:
+            keeper.cancel()
+            self._slots.release()
+
+    async def _fetch(self) -> Optional[str]:
+        raw = await self.redis.brpoplpush(self.keys.pending, self.keys.processing, timeout=self.poll_timeout)
+        if raw is None:
+            return None
+        raw = raw.decode() if isinstance(raw, bytes) else raw
+        await self.redis.zadd(self.keys.leases, {raw: time.time() + self.visibility_timeout})
+        return raw
+
+    async def _maintenance(self) -> None:
+        """Promote due retries, reclaim expired leases, lease orphaned jobs."""
+        while not self._stopping.is_set():
+            now = time.time()
+            try:
+                await self._promote(keys=[self.keys.delayed, self.keys.pending], args=[now, 500])
+                await self._reap(
+                    keys=[self.keys.leases, self.keys.processing, self.keys.pending], args=[now, 500]
+                )
+                # A worker may die between BRPOPLPUSH and ZADD; give such jobs a lease
+                orphans = await self.redis.lrange(self.keys.processing, -500, -1)
+                if orphans:
+                    await self.redis.zadd(
+                        self.keys.leases, {o: now + self.visibility_timeout for o in orphans}, nx=True
+                    )
+            except Exception as e:
+                logger.warning(f"Manutenção da fila falhou: {type(e).__name__}: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, install_signal_handlers: bool = True) -> None:
+        loop = asyncio.get_running_loop()
+        if install_signal_handlers:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, self.stop)
+        if self._http is None:
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            self._http = httpx.AsyncClient(timeout=30.0, limits=limits)
+        ctx = TaskContext(self._http)
+        maintenance = loop.create_task(self._maintenance())
+        logger.info(f"Worker {self.worker_id} consumindo {self.keys.pending} (concorrência={self.concurrency})")
+        try:
+            while not self._stopping.is_set():
+                await self._slots.acquire()
+                if self._stopping.is_set():
+                    self._slots.release()
+                    break
+                try:
+                    raw = await self._fetch()
+                except Exception as e:
+                    self._slots.release()
+                    logger.warning(f"Erro ao buscar job: {type(e).__name__}: {e}")
+                    await asyncio.sleep(1.0)
+                    continue
+                if raw is None:
+                    self._slots.release()
+                    continue
+                job_task = loop.create_task(self._run_job(raw, ctx))
+                self._running.add(job_task)
+                job_task.add_done_callback(self._running.discard)
+        finally:
+            self._stopping.set()
+            if self._running:
+                logger.info(f"Drenando {len(self._running)} jobs em andamento")
+                _, pending = await asyncio.wait(set(self._running), timeout=self.drain_timeout)
+                for t in pending:
+                    t.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            await maintenance
+            if self._owns_http and self._http is not None:
+                await self._http.aclose()
+                self._http = None
+
+
+__all__ = ["AsyncWorker", "QueueKeys", "enqueue", "make_job"]
@@ -0,0 +1,52 @@
+from typing import Any, Awaitable, Callable, Dict
+
+import httpx
+
+TaskHandler = Callable[[Dict[str, Any], "TaskContext"], Awaitable[Any]]
+
+TASKS: Dict[str, TaskHandler] = {}
+
+
+class TaskContext:
+    """Resources shared by every job running in a worker process."""
+
+    def __init__(self, http: httpx.AsyncClient) -> None:
+        self.http = http
+
+
+def task(name: str) -> Callable[[TaskHandler], TaskHandler]:
+    """Register an async job handler under ``name``."""
+
+    def decorator(fn: TaskHandler) -> TaskHandler:
+        TASKS[name] = fn
+        return fn
+
+    return decorator
+
+
+@task("n8n.trigger")
+async def n8n_trigger(payload: Dict[str, Any], ctx: TaskContext) -> Any:
+    from api.services.n8n_client import trigger
+
+    return await trigger(payload["slug"], payload.get("data", {}), client=ctx.http)
+
+
+@task("chatwoot.reply")
+async def chatwoot_reply(payload: Dict[str, Any], ctx: TaskContext) -> Any:
+    from api.services.chatwoot_client import ChatwootClient
+
+    return await ChatwootClient(http_client=ctx.http).reply(
+        payload["account_id"], payload["conversation_id"], payload["content"], payload.get("private", False)
+    )
+
+
+@task("chatwoot.set_attributes")
+async def chatwoot_set_attributes(payload: Dict[str, Any], ctx: TaskContext) -> Any:
+    from api.services.chatwoot_client import ChatwootClient
+
+    return await ChatwootClient(http_client=ctx.http).set_attributes(
+        payload["account_id"], payload["conversation_id"], **payload["attributes"]
+    )
+
+
+__all__ = ["TASKS", "TaskContext", "task"]
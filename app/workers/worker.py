@@ -1,10 +1,8 @@
-from rq import Worker, Queue
-from redis import Redis
-from app.core.settings import settings
+import asyncio
 
-listen = ["events"]
-redis = Redis.from_url(settings.REDIS_URL)
+from app.core.logging import configure_logging
+from app.workers.async_worker import AsyncWorker
 
 if __name__ == "__main__":
-    worker = Worker(map(Queue, listen), connection=redis)
-    worker.work(with_scheduler=True)
+    configure_logging()
+    asyncio.run(AsyncWorker.from_settings().run())
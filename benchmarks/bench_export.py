@@ -0,0 +1,123 @@
+"""Rows per second and peak RSS of the streaming lead export.
+
+Feeds synthetic leads through ``export_leads`` for every format and
+compression and each ``--rows`` count. Every run happens in a fresh
+subprocess so its peak RSS (``ru_maxrss``) is its own: with a streaming
+pipeline, peak RSS should stay flat as the row count grows. Output is
+discarded after counting bytes:
+
+    python -m benchmarks.bench_export --rows 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from api.services.lead_export import ExportStats, export_leads, has_pyarrow, has_zstandard, make_encoder  # noqa: E402
+
+PAINS = [
+    "Perdemos leads porque o follow-up é manual",
+    "Queremos saber o preço do plano anual",
+    "O time comercial usa planilha para tudo",
+    "Precisamos agendar uma demonstração",
+    "",
+]
+
+
+async def synthetic_leads(rows: int) -> AsyncIterator[Dict[str, Any]]:
+    rng = random.Random(rows)
+    for i in range(1, rows + 1):
+        yield {
+            "account_id": "1",
+            "conversation_id": i,
+            "attributes": {
+                "nome": f"Lead{i}",
+                "sobrenome": "Silva",
+                "empresa": f"Empresa {i % 997}",
+                "email": f"lead{i}@example.com",
+                "celular": f"+55 11 9{i:08d}",
+                "time_vendas": rng.randint(0, 20),
+                "ferramentas": "RD Station, planilha",
+                "dor_principal": rng.choice(PAINS) or None,
+            },
+            "updated_at": 1767225600 + i,
+        }
+
+
+async def run_one(rows: int, fmt: str, compression: str, batch_size: int) -> Dict[str, Any]:
+    stats = ExportStats()
+    encoder = make_encoder(fmt, compression or None)
+    start = time.perf_counter()
+    async for _ in export_leads(synthetic_leads(rows), encoder, batch_size=batch_size, stats=stats):
+        pass
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": stats.rows,
+        "format": fmt,
+        "compression": compression or "-",
+        "mb": stats.bytes / 1e6,
+        "rows_per_s": stats.rows / elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def configs(formats: List[str]) -> List[tuple]:
+    result = []
+    for fmt in formats:
+        if fmt == "parquet" and not has_pyarrow:
+            print("skipping parquet: pyarrow not installed", file=sys.stderr)
+            continue
+        for compression in ("", "gzip", "zstd"):
+            if compression == "zstd" and not has_zstandard:
+                continue
+            result.append((fmt, compression))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "jsonl", "parquet"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--child", nargs=3, metavar=("ROWS", "FORMAT", "COMPRESSION"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        rows, fmt, compression = args.child
+        print(json.dumps(asyncio.run(run_one(int(rows), fmt, compression, args.batch_size))))
+        return
+
+    if not has_zstandard:
+        print("skipping zstd: zstandard not installed", file=sys.stderr)
+    results = []
+    for rows in args.rows:
+        for fmt, compression in configs(args.formats):
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_export", "--child", str(rows), fmt, compression,
+                 "--batch-size", str(args.batch_size)],
+                capture_output=True, text=True, check=True,
+            )
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'rows':>9} {'format':<8} {'comp':<5} {'MB':>8} {'rows/s':>10} {'peak RSS MB':>12}")
+    for row in results:
+        print(
+            f"{row['rows']:>9} {row['format']:<8} {row['compression']:<5} {row['mb']:>8.1f} "
+            f"{row['rows_per_s']:>10.0f} {row['peak_rss_mb']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
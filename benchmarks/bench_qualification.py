@@ -0,0 +1,128 @@
+"""Prompt tokens and latency of lead qualification vs. conversation length.
+
+Replays synthetic conversations through ``BotLogic`` and qualifies the lead
+after every user message, once sending the full history (``qualify_lead``)
+and once in incremental mode (rolling summary + new turns,
+``qualify_lead_incremental``). The model is simulated: each call sleeps
+``--base-ms`` plus ``--ms-per-1k`` per thousand prompt tokens, so the
+numbers show how cost scales, not what a given provider charges:
+
+    python -m benchmarks.bench_qualification --lengths 10 50 100 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from api.domain.bot_logic import BotLogic  # noqa: E402
+from api.services.prompt_budget import estimate_tokens  # noqa: E402
+from api.services.transcripts import TranscriptStore  # noqa: E402
+from app.core.settings import settings  # noqa: E402
+
+USER_LINES = [
+    "Somos uma empresa de {n} pessoas e o time comercial usa planilha para tudo",
+    "Hoje perdemos muito lead porque ninguém faz follow-up no prazo certo",
+    "Quem decide a compra sou eu junto com o diretor financeiro",
+    "Temos orçamento aprovado para o próximo trimestre, algo perto de {n} mil",
+    "Usamos RD Station e um CRM antigo que ninguém gosta",
+    "Queria entender como funciona a integração com WhatsApp",
+    "Precisamos resolver isso antes de {n} de dezembro",
+    "Pode me mandar uma proposta com os valores?",
+]
+ASSISTANT_LINES = [
+    "Entendi! E hoje quantas pessoas atendem os leads que chegam?",
+    "Faz sentido. Qual é a maior dificuldade do time no dia a dia?",
+    "Perfeito, obrigado pelo contexto. Quem mais participa da decisão?",
+    "Ótimo. Posso sugerir dois horários para uma conversa com um especialista?",
+]
+
+
+class SimulatedChat:
+    """Stand-in for ``OpenAIClient._chat`` that records prompt sizes."""
+
+    def __init__(self, base_ms: float, ms_per_1k: float) -> None:
+        self.base_ms = base_ms
+        self.ms_per_1k = ms_per_1k
+        self.prompt_tokens: List[int] = []
+
+    async def __call__(self, operation: str, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        tokens = estimate_tokens(system) + estimate_tokens(prompt)
+        self.prompt_tokens.append(tokens)
+        await asyncio.sleep((self.base_ms + self.ms_per_1k * tokens / 1000) / 1000)
+        result: Dict[str, Any] = {"qualification_score": 70, "need_level": "high", "timeline": "trimestre"}
+        if "conversation_summary" in prompt:
+            result["conversation_summary"] = " ".join(["resumo"] * 100)
+        return json.dumps(result)
+
+
+async def replay(bot: BotLogic, chat: SimulatedChat, conversation_id: int, length: int, incremental: bool) -> Dict[str, float]:
+    rng = random.Random(conversation_id)
+    latencies: List[float] = []
+    for i in range(length):
+        role = "user" if i % 2 == 0 else "assistant"
+        line = rng.choice(USER_LINES if role == "user" else ASSISTANT_LINES).format(n=rng.randint(5, 90))
+        bot.transcripts.append(1, conversation_id, role, line)
+        if role != "user":
+            continue
+        bot.transcripts.flush()
+        start = time.perf_counter()
+        if incremental:
+            await bot.qualify_lead_incremental(1, conversation_id)
+        else:
+            await bot.qualify_lead(await bot.conversation_history(1, conversation_id, limit=length))
+        latencies.append(time.perf_counter() - start)
+    return {
+        "last_prompt_tokens": chat.prompt_tokens[-1],
+        "total_prompt_tokens": sum(chat.prompt_tokens),
+        "last_latency_ms": latencies[-1] * 1000,
+        "mean_latency_ms": sum(latencies) / len(latencies) * 1000,
+    }
+
+
+async def run(lengths: List[int], base_ms: float, ms_per_1k: float) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TranscriptStore(os.path.join(tmp, "transcripts.db"), max_messages=max(lengths) + 1)
+        bot = BotLogic()
+        bot.transcripts = store
+        conversation_id = 0
+        for length in lengths:
+            for mode in ("full", "incremental"):
+                conversation_id += 1
+                chat = SimulatedChat(base_ms, ms_per_1k)
+                bot.openai_client._chat = chat
+                row = await replay(bot, chat, conversation_id, length, incremental=mode == "incremental")
+                results.append({"messages": length, "mode": mode, **row})
+        store.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 25, 50, 100, 200])
+    parser.add_argument("--base-ms", type=float, default=5.0, help="simulated fixed latency per call")
+    parser.add_argument("--ms-per-1k", type=float, default=20.0, help="simulated latency per 1k prompt tokens")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.lengths, args.base_ms, args.ms_per_1k))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"summary threshold: {settings.QUALIFY_SUMMARY_THRESHOLD_TOKENS} tokens")
+    print(f"{'messages':>8} {'mode':<12} {'last tok':>9} {'total tok':>10} {'last ms':>8} {'mean ms':>8}")
+    for row in results:
+        print(
+            f"{row['messages']:>8} {row['mode']:<12} {row['last_prompt_tokens']:>9} {row['total_prompt_tokens']:>10} "
+            f"{row['last_latency_ms']:>8.1f} {row['mean_latency_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
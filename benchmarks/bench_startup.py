@@ -0,0 +1,74 @@
+"""Time-to-first-request of the API process.
+
+Spawns ``uvicorn api.main:app`` on a free port, polls ``/api/v1/health`` until it
+answers 200 and reports the elapsed wall time, repeated ``--runs`` times:
+
+    python -m benchmarks.bench_startup --runs 5
+
+Pair with ``python -m benchmarks.import_audit api.main`` to see where the
+import part of that time goes.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(app: str, path: str, timeout: float) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "LOOP_MONITOR_ENABLED": "false"},
+    )
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise SystemExit(f"uvicorn exited with status {proc.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}{path}", timeout=1.0).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.005)
+        raise SystemExit(f"no response within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="api.main:app")
+    parser.add_argument("--path", default="/api/v1/health")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    # One unmeasured run so .pyc files exist, as in a built image
+    time_to_first_request(args.app, args.path, args.timeout)
+    samples = [time_to_first_request(args.app, args.path, args.timeout) for _ in range(args.runs)]
+    print(json.dumps({
+        "app": args.app,
+        "runs": args.runs,
+        "min_ms": round(min(samples) * 1000, 1),
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Jobs/second of the asyncio worker vs. the RQ fork-per-job worker.
+
+Both run the same simulated I/O-bound job (sleep ``--latency`` seconds, like
+a call to Chatwoot/n8n/OpenAI) against a local Redis:
+
+    python -m benchmarks.bench_worker --redis redis://localhost:6379/15 --jobs 2000
+
+The RQ side is skipped when ``rq`` is not installed. The selected Redis
+database is flushed before each run.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.workers.async_worker import AsyncWorker, QueueKeys, make_job
+from app.workers.tasks import task
+
+
+@task("bench.io")
+async def _bench_io(payload, ctx):
+    await asyncio.sleep(payload["latency"])
+
+
+def rq_io_job(latency: float) -> None:
+    time.sleep(latency)
+
+
+async def bench_async(url: str, jobs: int, latency: float, concurrency: int) -> float:
+    import redis.asyncio as aioredis
+
+    redis = aioredis.from_url(url)
+    await redis.flushdb()
+    keys = QueueKeys("bench")
+    await redis.lpush(keys.pending, *[make_job("bench.io", {"latency": latency}) for _ in range(jobs)])
+    worker = AsyncWorker(redis, queue="bench", concurrency=concurrency, poll_timeout=1)
+    start = time.perf_counter()
+    runner = asyncio.create_task(worker.run(install_signal_handlers=False))
+    while worker.processed < jobs:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    worker.stop()
+    await runner
+    await redis.aclose()
+    return jobs / elapsed
+
+
+def bench_rq(url: str, jobs: int, latency: float):
+    try:
+        from rq import Queue, Worker
+    except ImportError:
+        return None
+    from redis import Redis
+
+    redis = Redis.from_url(url)
+    redis.flushdb()
+    queue = Queue("bench", connection=redis)
+    for _ in range(jobs):
+        queue.enqueue(rq_io_job, latency)
+    start = time.perf_counter()
+    Worker([queue], connection=redis).work(burst=True)
+    return jobs / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis", default="redis://localhost:6379/15")
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--rq-jobs", type=int, default=200, help="RQ is much slower; use fewer jobs")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    results = {
+        "latency_s": args.latency,
+        "async_jobs_per_s": round(asyncio.run(bench_async(args.redis, args.jobs, args.latency, args.concurrency)), 1),
+    }
+    rq_rate = bench_rq(args.redis, args.rq_jobs, args.latency)
+    results["rq_jobs_per_s"] = round(rq_rate, 1) if rq_rate is not None else None
+    if rq_rate:
+        results["speedup"] = round(results["async_jobs_per_s"] / rq_rate, 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
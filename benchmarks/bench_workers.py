@@ -0,0 +1,130 @@
+"""CPU-to-worker sizing: throughput and latency of gunicorn with N workers.
+
+Starts ``gunicorn api.main:app`` with ``compose/gunicorn.conf.py`` for each
+worker count, drives it with ``--drivers`` load processes for ``--duration``
+seconds, and prints req/s and p50/p99 per count:
+
+    python -m benchmarks.bench_workers --workers 1,2,4,8 --duration 15
+
+The default target (``/api/v1/assistant/preview`` with ``dry_run``) runs
+request parsing, validation and middlewares without external calls, i.e.
+the CPU-bound share of a webhook turn. The suggested worker count is the
+smallest one within 5% of the best throughput. Run the drivers on another
+machine (``--url``) when the host has few cores, or they compete with the
+workers for CPU.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+_CONFIG = str(Path(__file__).resolve().parents[1] / "compose" / "gunicorn.conf.py")
+_BODY = {"message": "Quero saber os planos", "dry_run": True}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _drive(url: str, duration: float, connections: int) -> List[float]:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=connections)) as client:
+
+        async def loop() -> None:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                r = await client.post(url, json=_BODY)
+                if r.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(loop() for _ in range(connections)))
+    return latencies
+
+
+def _driver(args) -> List[float]:
+    return asyncio.run(_drive(*args))
+
+
+def _wait_ready(base: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"{base}/api/v1/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    raise SystemExit("gunicorn did not become ready")
+
+
+def run(workers: int, path: str, duration: float, drivers: int, connections: int) -> Dict[str, float]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "APP_PORT": str(port),
+        "PROMETHEUS_MULTIPROC_DIR": f"/tmp/bench-workers-{port}",
+        "LOOP_MONITOR_ENABLED": "false",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", _CONFIG, "api.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base, proc)
+        with multiprocessing.Pool(drivers) as pool:
+            results = pool.map(_driver, [(base + path, duration, connections)] * drivers)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    latencies = sorted(latency for chunk in results for latency in chunk)
+    if not latencies:
+        raise SystemExit(f"no successful requests to {path}")
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, cpus, 2 * cpus})))
+    parser.add_argument("--path", default="/api/v1/assistant/preview")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--drivers", type=int, default=max(1, min(4, cpus // 2)))
+    parser.add_argument("--connections", type=int, default=32, help="concurrent connections per driver")
+    args = parser.parse_args()
+
+    rows = [
+        run(int(n), args.path, args.duration, args.drivers, args.connections)
+        for n in args.workers.split(",")
+    ]
+    best = max(r["rps"] for r in rows)
+    suggested = min(r["workers"] for r in rows if r["rps"] >= 0.95 * best)
+    print(json.dumps({"cpus": cpus, "results": rows, "suggested_workers": suggested}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
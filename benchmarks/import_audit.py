@@ -0,0 +1,98 @@
+"""Import-time audit of a module, based on ``python -X importtime``.
+
+Runs the import in a fresh interpreter and reports the slowest modules
+(cumulative) and the top-level packages with the most self time:
+
+    python -m benchmarks.import_audit api.main --top 20
+    python -m benchmarks.import_audit api.main --budget-ms 900 --forbid openai,redis,asyncpg
+
+Exits with status 1 when the total exceeds ``--budget-ms`` or when any
+``--forbid`` package was imported, so it can guard cold start in CI.
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+class ImportEntry(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportEntry]:
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append(ImportEntry(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def run_importtime(module: str, python: str = sys.executable) -> List[ImportEntry]:
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def summarize(entries: List[ImportEntry], top: int) -> Dict[str, object]:
+    by_package: Dict[str, int] = defaultdict(int)
+    for entry in entries:
+        by_package[entry.module.split(".")[0]] += entry.self_us
+    total_us = sum(e.cumulative_us for e in entries if e.depth == 0)
+    slowest = sorted(entries, key=lambda e: e.cumulative_us, reverse=True)[:top]
+    packages = sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(entries),
+        "slowest": [{"module": e.module, "cumulative_ms": round(e.cumulative_us / 1000, 1)} for e in slowest],
+        "packages": [{"package": p, "self_ms": round(us / 1000, 1)} for p, us in packages],
+        "imported": sorted(by_package),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="api.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--forbid", default="", help="comma-separated packages that must not be imported")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = summarize(run_importtime(args.module), args.top)
+    forbidden = [p for p in filter(None, args.forbid.split(",")) if p in report["imported"]]
+    over_budget = args.budget_ms is not None and report["total_ms"] > args.budget_ms
+
+    if args.json:
+        print(json.dumps({**report, "forbidden_imported": forbidden}, indent=2))
+    else:
+        print(f"import {args.module}: {report['total_ms']} ms, {report['modules']} modules")
+        print("\nslowest (cumulative):")
+        for row in report["slowest"]:
+            print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+        print("\npackages (self time):")
+        for row in report["packages"]:
+            print(f"  {row['self_ms']:>9.1f} ms  {row['package']}")
+        if forbidden:
+            print(f"\nforbidden packages imported: {', '.join(forbidden)}")
+        if over_budget:
+            print(f"\nover budget: {report['total_ms']} ms > {args.budget_ms} ms")
+    sys.exit(1 if forbidden or over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
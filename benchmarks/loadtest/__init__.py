@@ -0,0 +1,9 @@
+"""Self-contained load test of ``POST /api/v1/webhooks/agentbot``.
+
+- ``fakes``: localhost stand-ins for Chatwoot, n8n and OpenAI with
+  configurable latency distributions and error rates
+- ``driver``: open-loop generator of HMAC-signed webhook traffic that
+  reports latency percentiles, throughput and an error breakdown
+- ``python -m benchmarks.loadtest``: starts the fakes and the API (uvicorn
+  or gunicorn) wired to them, then runs the driver
+"""
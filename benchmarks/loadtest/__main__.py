@@ -0,0 +1,118 @@
+"""Run fakes + API + driver in one command.
+
+    python -m benchmarks.loadtest --rate 100 --duration 30
+    python -m benchmarks.loadtest --server gunicorn --workers 4 --openai lognormal:900:0.5 --error-rate chatwoot=0.01
+    python -m benchmarks.loadtest --url http://staging:8000   # only the driver, fakes must already be wired
+
+The API process gets ``CHATWOOT_BASE_URL``, ``N8N_BASE_URL`` and
+``OPENAI_BASE_URL`` pointing at the fakes, plus a random HMAC secret that
+the driver signs with. The JSON report goes to stdout.
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from .driver import add_driver_args, run
+from .fakes import add_behavior_args
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _free_port(count: int = 1) -> int:
+    """First of ``count`` consecutive free ports."""
+    while True:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            base = sock.getsockname()[1]
+        if base + count > 65535:
+            continue
+        try:
+            for offset in range(1, count):
+                with socket.socket() as sock:
+                    sock.bind(("127.0.0.1", base + offset))
+            return base
+        except OSError:
+            continue
+
+
+def _wait_http(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{proc.args[:4]} exited with status {proc.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise SystemExit(f"{url} did not come up")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="existing API; skips starting fakes and server")
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers")
+    add_behavior_args(parser)
+    add_driver_args(parser)
+    args = parser.parse_args()
+
+    if args.url:
+        summary = asyncio.run(run(args.url, args.secret, args.rate, args.duration, args.conversations, timeout=args.timeout))
+        print(json.dumps(summary, indent=2))
+        return
+
+    fake_port, api_port = _free_port(3), _free_port()
+    secret = secrets.token_hex(16)
+    fake_args = [f"--chatwoot={args.chatwoot}", f"--n8n={args.n8n}", f"--openai={args.openai}"]
+    fake_args += [f"--error-rate={rate}" for rate in args.error_rate]
+    env = {
+        **os.environ,
+        "CHATWOOT_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "CHATWOOT_ACCESS_TOKEN": "loadtest",
+        "CHATWOOT_ACCOUNT_ID": "1",
+        "CHATWOOT_HMAC_SECRET": secret,
+        "CHATWOOT_WEBHOOK_SECRET": os.getenv("CHATWOOT_WEBHOOK_SECRET", secret),
+        "N8N_BASE_URL": f"http://127.0.0.1:{fake_port + 1}",
+        "N8N_API_KEY": "loadtest",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port + 2}/v1",
+        "OPENAI_API_KEY": "loadtest",
+        "APP_PORT": str(api_port),
+        "WEB_CONCURRENCY": str(args.workers),
+    }
+    if args.server == "gunicorn":
+        env["PROMETHEUS_MULTIPROC_DIR"] = f"/tmp/loadtest-metrics-{api_port}"
+        server_cmd = [sys.executable, "-m", "gunicorn", "-c", str(_REPO_ROOT / "compose" / "gunicorn.conf.py"), "api.main:app"]
+    else:
+        server_cmd = [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(api_port), "--log-level", "warning"]
+
+    fakes_cmd = [sys.executable, "-m", "benchmarks.loadtest.fakes", f"--port={fake_port}", *fake_args]
+    fakes = subprocess.Popen(fakes_cmd, cwd=_REPO_ROOT)
+    server = None
+    try:
+        _wait_http(f"http://127.0.0.1:{fake_port}/api/v1/accounts/1", fakes)
+        server = subprocess.Popen(server_cmd, env=env, cwd=_REPO_ROOT, stdout=subprocess.DEVNULL)
+        api_url = f"http://127.0.0.1:{api_port}"
+        _wait_http(f"{api_url}/api/v1/health", server)
+        summary = asyncio.run(run(api_url, secret, args.rate, args.duration, args.conversations, timeout=args.timeout))
+        summary["server"] = {"kind": args.server, "workers": args.workers if args.server == "gunicorn" else 1}
+        summary["fakes"] = {"chatwoot": args.chatwoot, "n8n": args.n8n, "openai": args.openai, "error_rate": args.error_rate}
+        print(json.dumps(summary, indent=2))
+    finally:
+        for proc in (server, fakes):
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
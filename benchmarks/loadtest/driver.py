@@ -0,0 +1,155 @@
+"""Open-loop driver of HMAC-signed ``agentbot`` webhooks.
+
+Sends ``--rate`` requests/second for ``--duration`` seconds, walking each of
+``--conversations`` conversations through the SDR script (name, company,
+e-mail, team size, tools, pain). Latency is measured from the *scheduled*
+send time, so a slow server cannot hide queueing (no coordinated omission):
+
+    python -m benchmarks.loadtest.driver --url http://127.0.0.1:8000 --rate 200 --duration 30
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+WEBHOOK_PATH = "/api/v1/webhooks/agentbot"
+
+SCRIPT = (
+    "Oi, meu nome é Ana Souza",
+    "Acme Ltda",
+    "ana.souza@acme.com.br",
+    "11987654321",
+    "12 pessoas",
+    "HubSpot e WhatsApp",
+    "integracao_mkt_vendas",
+    "Obrigada!",
+)
+
+
+def sign(body: bytes, secret: str) -> str:
+    return hmac.new(secret.encode(), msg=body, digestmod=hashlib.sha256).hexdigest()
+
+
+def webhook_body(account_id: int, conversation_id: int, text: str) -> bytes:
+    return json.dumps({
+        "event": "message_created",
+        "account": {"id": account_id},
+        "conversation": {"id": conversation_id},
+        "message": {"content": text, "message_type": "incoming"},
+    }).encode()
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Report:
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.outcomes: Counter = Counter()
+
+    def add(self, latency: float, outcome: str) -> None:
+        self.outcomes[outcome] += 1
+        if outcome == "200":
+            self.latencies.append(latency)
+
+    def summary(self, elapsed: float, target_rate: float) -> Dict[str, Any]:
+        values = sorted(self.latencies)
+        total = sum(self.outcomes.values())
+
+        def ms(v: Optional[float]) -> Optional[float]:
+            return None if v is None else round(v * 1000, 1)
+
+        return {
+            "target_rps": target_rate,
+            "requests": total,
+            "ok": len(values),
+            "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+            "error_rate": round(1 - len(values) / total, 4) if total else 0.0,
+            "p50_ms": ms(percentile(values, 0.50)),
+            "p95_ms": ms(percentile(values, 0.95)),
+            "p99_ms": ms(percentile(values, 0.99)),
+            "max_ms": ms(values[-1] if values else None),
+            "outcomes": dict(self.outcomes.most_common()),
+        }
+
+
+async def run(
+    url: str,
+    secret: str,
+    rate: float,
+    duration: float,
+    conversations: int = 100,
+    account_id: int = 1,
+    timeout: float = 30.0,
+    max_in_flight: int = 2000,
+) -> Dict[str, Any]:
+    report = Report()
+    turns = [0] * conversations
+    in_flight = asyncio.Semaphore(max_in_flight)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+
+        async def fire(scheduled: float, conversation_id: int, text: str) -> None:
+            body = webhook_body(account_id, conversation_id, text)
+            headers = {"Content-Type": "application/json", "X-Chatwoot-Signature": sign(body, secret)}
+            try:
+                response = await client.post(WEBHOOK_PATH, content=body, headers=headers)
+                outcome = str(response.status_code)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            finally:
+                in_flight.release()
+            report.add(time.perf_counter() - scheduled, outcome)
+
+        tasks = []
+        start = time.perf_counter()
+        total = int(rate * duration)
+        for i in range(total):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            slot, turn = i % conversations, turns[i % conversations]
+            turns[slot] += 1
+            text = SCRIPT[turn % len(SCRIPT)]
+            # Each finished script continues on a fresh conversation id
+            conversation_id = 1 + slot + conversations * (turn // len(SCRIPT))
+            await in_flight.acquire()
+            tasks.append(asyncio.create_task(fire(scheduled, conversation_id, text)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    return report.summary(elapsed, rate)
+
+
+def add_driver_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--rate", type=float, default=50.0, help="target requests/second")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--secret", default=os.getenv("CHATWOOT_HMAC_SECRET", os.getenv("HMAC_SECRET", "changeme")))
+    parser.add_argument("--timeout", type=float, default=30.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    add_driver_args(parser)
+    args = parser.parse_args()
+    summary = asyncio.run(run(args.url, args.secret, args.rate, args.duration, args.conversations, timeout=args.timeout))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
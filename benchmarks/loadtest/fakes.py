@@ -0,0 +1,230 @@
+"""Fake Chatwoot, n8n and OpenAI servers for load tests.
+
+Each fake is a small FastAPI app wrapped in a latency/error middleware:
+
+    python -m benchmarks.loadtest.fakes --port 9100 \\
+        --chatwoot lognormal:40:0.5 --openai lognormal:600:0.4 --error-rate openai=0.02
+
+Chatwoot listens on ``--port``, n8n on ``--port + 1`` and OpenAI on
+``--port + 2``. A latency spec is ``fixed:<ms>``, ``uniform:<min_ms>:<max_ms>``,
+``exponential:<mean_ms>`` or ``lognormal:<median_ms>:<sigma>``.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class Behavior:
+    """Latency distribution and failure rate of one fake service."""
+
+    distribution: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+
+    @classmethod
+    def parse(cls, spec: str, error_rate: float = 0.0) -> "Behavior":
+        kind, *params = spec.split(":")
+        if kind not in {"fixed", "uniform", "exponential", "lognormal"}:
+            raise ValueError(f"unknown latency distribution: {kind}")
+        values = [float(p) for p in params] + [0.0, 0.0]
+        return cls(kind, values[0], values[1], error_rate)
+
+    def delay(self, rng: random.Random = random) -> float:
+        """Sampled latency in seconds."""
+        if self.distribution == "uniform":
+            ms = rng.uniform(self.a, self.b)
+        elif self.distribution == "exponential":
+            ms = rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        elif self.distribution == "lognormal":
+            ms = rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        else:
+            ms = self.a
+        return ms / 1000
+
+    def fails(self, rng: random.Random = random) -> bool:
+        return rng.random() < self.error_rate
+
+
+def _with_behavior(app: FastAPI, behavior: Behavior) -> FastAPI:
+    @app.middleware("http")
+    async def simulate(request: Request, call_next):
+        await asyncio.sleep(behavior.delay())
+        if behavior.fails():
+            return JSONResponse({"error": "injected failure"}, status_code=behavior.error_status)
+        return await call_next(request)
+
+    return app
+
+
+def chatwoot_app(behavior: Behavior) -> FastAPI:
+    """Conversations keep their custom_attributes in memory across turns."""
+    app = FastAPI()
+    conversations: Dict[str, Dict[str, Any]] = {}
+    message_ids = itertools.count(1)
+
+    def conversation(account_id: str, conversation_id: str) -> Dict[str, Any]:
+        key = f"{account_id}:{conversation_id}"
+        if key not in conversations:
+            conversations[key] = {"id": int(conversation_id), "status": "pending", "custom_attributes": {}}
+        return conversations[key]
+
+    @app.get("/api/v1/accounts/{account_id}")
+    async def account(account_id: str):
+        return {"id": int(account_id), "name": "loadtest"}
+
+    @app.get("/api/v1/accounts/{account_id}/conversations/{conversation_id}")
+    async def get_conversation(account_id: str, conversation_id: str):
+        return conversation(account_id, conversation_id)
+
+    @app.patch("/api/v1/accounts/{account_id}/conversations/{conversation_id}")
+    async def update_conversation(account_id: str, conversation_id: str, request: Request):
+        body = await request.json()
+        conv = conversation(account_id, conversation_id)
+        conv["custom_attributes"].update(body.get("custom_attributes") or {})
+        if "status" in body:
+            conv["status"] = body["status"]
+        return conv
+
+    @app.post("/api/v1/accounts/{account_id}/conversations/{conversation_id}/messages")
+    async def create_message(account_id: str, conversation_id: str, request: Request):
+        body = await request.json()
+        return {"id": next(message_ids), "content": body.get("content"), "message_type": "outgoing"}
+
+    return _with_behavior(app, behavior)
+
+
+def n8n_app(behavior: Behavior) -> FastAPI:
+    app = FastAPI()
+    execution_ids = itertools.count(1)
+
+    @app.post("/webhook/{slug}")
+    async def webhook(slug: str):
+        if slug == "schedule_meeting":
+            return {"ok": True, "link_meet": "https://meet.example.com/loadtest"}
+        return {"ok": True}
+
+    @app.get("/api/v1/workflows")
+    async def workflows():
+        return {"data": [{"id": "1", "name": "create_lead", "active": True}]}
+
+    @app.post("/api/v1/workflows/{workflow_id}/execute")
+    async def execute(workflow_id: str):
+        return {"data": {"executionId": str(next(execution_ids))}}
+
+    @app.get("/api/v1/executions/{execution_id}")
+    async def execution(execution_id: str):
+        return {"id": execution_id, "finished": True, "status": "success"}
+
+    return _with_behavior(app, behavior)
+
+
+_COMPLETION = json.dumps({
+    "intent": "interesse",
+    "interest_level": "alto",
+    "objection_type": None,
+    "next_steps": "agendar demonstração",
+    "urgency": "média",
+    "confidence": 0.8,
+})
+
+
+def openai_app(behavior: Behavior) -> FastAPI:
+    """Chat completions with a fixed JSON answer and plausible usage numbers."""
+    app = FastAPI()
+    ids = itertools.count(1)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        completion_tokens = len(_COMPLETION) // 4
+        return {
+            "id": f"chatcmpl-{next(ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": _COMPLETION},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return _with_behavior(app, behavior)
+
+
+async def serve_fakes(
+    port: int,
+    chatwoot: Behavior,
+    n8n: Behavior,
+    openai: Behavior,
+    host: str = "127.0.0.1",
+    started: Optional[asyncio.Event] = None,
+) -> None:
+    """Run the three fakes on ``port``, ``port + 1`` and ``port + 2`` until cancelled."""
+    servers = [
+        uvicorn.Server(uvicorn.Config(app, host=host, port=port + offset, log_level="warning", access_log=False))
+        for offset, app in enumerate((chatwoot_app(chatwoot), n8n_app(n8n), openai_app(openai)))
+    ]
+    tasks = [asyncio.create_task(server.serve()) for server in servers]
+    while not all(server.started for server in servers):
+        await asyncio.sleep(0.01)
+    if started is not None:
+        started.set()
+    await asyncio.gather(*tasks)
+
+
+def add_behavior_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--chatwoot", default="lognormal:40:0.5", help="Chatwoot latency spec")
+    parser.add_argument("--n8n", default="lognormal:80:0.5", help="n8n latency spec")
+    parser.add_argument("--openai", default="lognormal:600:0.4", help="OpenAI latency spec")
+    parser.add_argument(
+        "--error-rate",
+        action="append",
+        default=[],
+        metavar="SERVICE=RATE",
+        help="injected failure rate, e.g. chatwoot=0.01 (repeatable)",
+    )
+
+
+def behaviors_from_args(args: argparse.Namespace) -> Dict[str, Behavior]:
+    rates = {}
+    for item in args.error_rate:
+        service, _, rate = item.partition("=")
+        rates[service] = float(rate)
+    return {
+        service: Behavior.parse(getattr(args, service), rates.get(service, 0.0))
+        for service in ("chatwoot", "n8n", "openai")
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_behavior_args(parser)
+    args = parser.parse_args()
+    behaviors = behaviors_from_args(args)
+    asyncio.run(serve_fakes(args.port, behaviors["chatwoot"], behaviors["n8n"], behaviors["openai"], host=args.host))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Microbenchmarks of the per-message code paths.
+
+Covers bot_logic (``step_transition_v2``, ``classify_intent``,
+``should_handoff``, ``extract_name``, ``compute_fit_primary``), the
+``State``/``QualifyPayload`` models, PII masking and the webhook HMAC check,
+over seeded, generated corpora:
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --save-baseline .benchmarks/micro.json      # once, on a quiet machine
+    python -m benchmarks.micro --baseline .benchmarks/micro.json --threshold 0.15
+
+With ``--baseline`` the run exits with status 1 when any benchmark's median
+time per op is more than ``--threshold`` (fraction) slower than the baseline.
+Baselines are machine-specific; compare runs from the same host.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Sequence
+
+os.environ.setdefault("CHATWOOT_HMAC_SECRET", "bench-secret")
+
+from api.domain.bot_logic import (  # noqa: E402
+    classify_intent,
+    compute_fit_primary,
+    extract_name,
+    should_handoff,
+    step_transition_v2,
+)
+from api.domain.models import QualifyPayload, State  # noqa: E402
+from api.routers import chatwoot_agentbot  # noqa: E402
+from app.core.logging import _mask_pii  # noqa: E402
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João"]
+LAST_NAMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa", "Almeida", "Ferreira", "Gomes"]
+COMPANIES = ["Acme Ltda", "Rocket SA", "Padaria Central", "Loja do Zé", "TechNova", "Grupo Horizonte"]
+TOOLS = ["HubSpot", "RD Station", "Pipedrive", "WhatsApp Business", "planilhas", "Salesforce", "nenhuma"]
+PAINS = ["pos_nao_venda", "integracao_mkt_vendas", "automacao", "mensageria", "outro"]
+FILLER = [
+    "Oi, tudo bem?", "Quero agendar uma reunião para semana que vem", "Quanto custa o plano anual?",
+    "Estou com um problema no suporte", "Quero falar com um atendente humano", "Vocês integram com o CRM?",
+    "O atendimento foi péssimo, quero cancelar", "Bom dia! Vi o anúncio no Instagram",
+    "Tenho um time de 15 vendedores e usamos WhatsApp para tudo, queria entender como vocês ajudam",
+]
+
+
+def _person(rng: random.Random) -> Dict[str, Any]:
+    nome, sobrenome = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    start = datetime(2025, 9, 1, 9, tzinfo=timezone(timedelta(hours=-3))) + timedelta(hours=rng.randrange(0, 400))
+    return {
+        "nome": nome,
+        "sobrenome": sobrenome,
+        "empresa": rng.choice(COMPANIES),
+        "cargo": rng.choice(["CEO", "Head de Vendas", "SDR", "Gerente Comercial"]),
+        "email": f"{nome.lower()}.{sobrenome.lower()}{rng.randrange(100)}@example.com",
+        "celular": f"+55 11 9{rng.randrange(1000, 9999)}-{rng.randrange(1000, 9999)}",
+        "time_vendas": rng.randrange(1, 60),
+        "ferramentas": ", ".join(rng.sample(TOOLS, 2)),
+        "dor_principal": rng.choice(PAINS),
+        "horario1": start.isoformat(),
+        "horario2": (start + timedelta(days=1)).isoformat(),
+    }
+
+
+def build_corpus(size: int, seed: int = 42) -> Dict[str, List[Any]]:
+    rng = random.Random(seed)
+    people = [_person(rng) for _ in range(size)]
+    messages = []
+    for p in people:
+        messages.append(rng.choice([
+            f"Oi, meu nome é {p['nome']} {p['sobrenome']}",
+            f"Meu e-mail é {p['email']} e o celular {p['celular']}",
+            f"Somos {p['time_vendas']} pessoas no time, usamos {p['ferramentas']}",
+            rng.choice(FILLER),
+            f"{rng.choice(FILLER)} CPF 123.456.789-0{rng.randrange(10)}",
+        ]))
+    # Each conversation is a scripted sequence of turns through the SDR flow
+    turns = [
+        (f"{p['nome']} {p['sobrenome']}", p["empresa"], p["email"], p["celular"],
+         f"{p['time_vendas']} vendedores", p["ferramentas"], p["dor_principal"])
+        for p in people
+    ]
+    states = [State(**{k: p[k] for k in ("nome", "sobrenome", "empresa", "email", "time_vendas")}) for p in people]
+    bodies = [json.dumps({"event": "message_created", "message": {"content": m}}).encode() for m in messages]
+    return {"people": people, "messages": messages, "turns": turns, "states": states, "bodies": bodies}
+
+
+class _SignedRequest:
+    """Just enough of a Starlette Request for ``verify_request``."""
+
+    def __init__(self, body: bytes, secret: str):
+        self._body = body
+        self.headers = {"X-Chatwoot-Signature": "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()}
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+def _run_coro(coro) -> Any:
+    # verify_request never actually suspends; drive it without an event loop
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+
+def build_benchmarks(corpus: Dict[str, List[Any]]) -> Dict[str, Callable[[], int]]:
+    """Each callable runs one pass over its corpus and returns the number of ops."""
+    messages, people, states, turns = corpus["messages"], corpus["people"], corpus["states"], corpus["turns"]
+    state_json = [s.model_dump_json() for s in states]
+    requests = [_SignedRequest(b, chatwoot_agentbot.HMAC_SECRET) for b in corpus["bodies"]]
+
+    def step_transition() -> int:
+        ops = 0
+        for script in turns:
+            state = State()
+            for text in script:
+                state, _, _ = step_transition_v2(state, text)
+                ops += 1
+        return ops
+
+    def run_over(fn: Callable[[Any], Any], items: Sequence[Any]) -> Callable[[], int]:
+        def bench() -> int:
+            for item in items:
+                fn(item)
+            return len(items)
+        return bench
+
+    return {
+        "step_transition_v2": step_transition,
+        "classify_intent": run_over(classify_intent, messages),
+        "should_handoff": run_over(should_handoff, messages),
+        "extract_name": run_over(extract_name, messages),
+        "compute_fit_primary": run_over(compute_fit_primary, states),
+        "state_parse": run_over(State.model_validate_json, state_json),
+        "state_dump": run_over(lambda s: s.model_dump(mode="json"), states),
+        "qualify_payload_validate": run_over(QualifyPayload.model_validate, people),
+        "mask_pii": run_over(_mask_pii, messages),
+        "verify_request_hmac": run_over(lambda r: _run_coro(chatwoot_agentbot.verify_request(r)), requests),
+    }
+
+
+def measure(bench: Callable[[], int], repeat: int, min_time: float) -> Dict[str, float]:
+    bench()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        ops, start = 0, time.perf_counter()
+        while True:
+            ops += bench()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        samples.append(elapsed / ops * 1e9)
+    return {
+        "median_ns": round(statistics.median(samples), 1),
+        "min_ns": round(min(samples), 1),
+        "stdev_ns": round(statistics.stdev(samples), 1) if len(samples) > 1 else 0.0,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float
+) -> List[Dict[str, Any]]:
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = current["median_ns"] / base["median_ns"]
+        rows.append({
+            "benchmark": name,
+            "baseline_ns": base["median_ns"],
+            "current_ns": current["median_ns"],
+            "change": round(ratio - 1, 4),
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=500, help="corpus size (people/messages)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per sample")
+    parser.add_argument("--only", default="", help="comma-separated benchmark names")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--save-baseline", help="write results JSON as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed slowdown vs. baseline (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks(build_corpus(args.size))
+    selected = [n for n in args.only.split(",") if n] or list(benchmarks)
+    results = {}
+    for name in selected:
+        results[name] = measure(benchmarks[name], args.repeat, args.min_time)
+        print(f"{name:<28} {results[name]['median_ns']:>12.1f} ns/op", file=sys.stderr)
+
+    report: Dict[str, Any] = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus_size": args.size,
+        "results": results,
+    }
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        report["comparison"] = compare(results, baseline, args.threshold)
+        failed = any(row["regression"] for row in report["comparison"])
+        for row in report["comparison"]:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['benchmark']:<28} {row['change']:+8.1%} {flag}", file=sys.stderr)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    if not args.output and not args.save_baseline:
+        print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Gunicorn config for the production API (``gunicorn api.main:app``).
+
+Gunicorn loads ``./gunicorn.conf.py`` from the working directory; the
+Dockerfile copies this file to ``/app/gunicorn.conf.py``. Every knob can be
+overridden through the environment:
+
+- ``WEB_CONCURRENCY``: number of uvicorn workers (default: CPU count; see
+  ``python -m benchmarks.bench_workers`` for sizing)
+- ``GUNICORN_PRELOAD``: import the app once in the master and fork workers
+  from it (default ``true``; faster boot, shared memory pages). Code is only
+  re-read on a full restart or a USR2 binary upgrade, not on HUP
+- ``GUNICORN_GRACEFUL_TIMEOUT``: seconds a worker gets to finish in-flight
+  requests and run the lifespan shutdown (flush lead writer / state sync)
+- ``PROMETHEUS_MULTIPROC_DIR``: per-worker metric files aggregated by
+  ``/metrics``; wiped when the master starts (not on HUP)
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('APP_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in {"1", "true", "yes"}
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers periodically (0 disables); jitter avoids restarting all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# Application logs are structured JSON already; keep gunicorn's on stderr
+accesslog = None
+errorlog = "-"
+
+# Must exist before the app (and prometheus_client) is imported by preload.
+# Wiped once per master start; HUP re-reads this file in the same process and
+# must keep the live workers' files.
+_metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
+if not os.environ.get("GUNICORN_METRICS_DIR_READY"):
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
+    os.environ["GUNICORN_METRICS_DIR_READY"] = "1"
+os.makedirs(_metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a dead worker from the aggregated /metrics."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)